@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""Throughput benchmark for the batch bandwidth engine.
+
+Builds random sentence mixes, rate plans and baud rates over the full
+catalog and reports how many mix x rate x baud configurations the engine
+evaluates per second.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from nmea_engine import load_lengths, utilization
+
+def main(num_mixes=2000, num_plans=50, bauds=(4800, 9600, 38400, 115200), repeat=5):
+    """Run the benchmark and print configurations per second."""
+    rng = np.random.default_rng(0)
+    ids, lengths = load_lengths()
+    mixes = rng.random((num_mixes, len(ids))) < 0.1
+    rates = rng.choice([0.2, 0.5, 1.0, 2.0, 5.0, 10.0], size=(num_plans, len(ids)))
+    configs = num_mixes * num_plans * len(bauds)
+
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        utilization(lengths, mixes, rates, bauds)
+        best = min(best, time.perf_counter() - start)
+
+    print(f"Sentences:      {len(ids)}")
+    print(f"Configurations: {configs}")
+    print(f"Best time:      {best * 1000:.2f} ms")
+    print(f"Throughput:     {configs / best:,.0f} configurations/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Time GUI startup: first paint against the database being listed.
+
+Starts nmea0183bwcalc_gui.py --startup-time several times per scenario
+and reports the median seconds to the window's first paint and to the
+sentence lists being filled. The database is loaded on a worker thread,
+so the first paint should not grow with the catalog; before, the window
+only appeared after the database had loaded and both tabs had been
+built. The database load alone is timed in this process for comparison.
+
+Scenarios: the standard catalog from its compiled cache, and a large
+generated vendor catalog merged over it, on its first (compiling) load
+and from its cache. Needs a display (or xvfb-run).
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import nmea_database
+
+GUI = ROOT / 'nmea0183bwcalc_gui.py'
+# Sentences in the generated vendor catalog
+CATALOG_SIZE = 8000
+RUNS = 5
+
+def write_catalog(path, size):
+    """Write a vendor catalog of size proprietary sentences copied from the standard ones."""
+    database = nmea_database.load_database(catalogs=[])
+    ids = list(database.ids)
+    sentences = {}
+    for n in range(size):
+        record = dict(database[ids[n % len(ids)]])
+        record['standard'] = 'P'
+        sentences[f"PX{n:05d}"] = record
+    with open(path, 'w') as f:
+        json.dump({'metadata': {'name': 'generated', 'version': '1.0'},
+                   'sentences': sentences}, f)
+
+def start_gui(catalogs):
+    """Return (first paint, database listed) seconds of one GUI start."""
+    env = dict(os.environ, NMEA_CATALOGS=os.pathsep.join(catalogs))
+    result = subprocess.run([sys.executable, str(GUI), '--startup-time'], env=env,
+                            capture_output=True, text=True, timeout=120)
+    if result.returncode or not result.stdout.startswith('first paint'):
+        raise RuntimeError(result.stderr.strip() or result.stdout.strip())
+    words = result.stdout.split()
+    return float(words[2]), float(words[6])
+
+def time_load(catalogs):
+    start = time.perf_counter()
+    nmea_database.load_database(catalogs=catalogs)
+    return time.perf_counter() - start
+
+def report(name, catalogs, runs, cold=False):
+    times = []
+    loads = []
+    for _ in range(runs):
+        if cold:
+            cache = nmea_database.cache_path_for(nmea_database.DEFAULT_PATH, catalogs)
+            cache.unlink(missing_ok=True)
+            loads.append(time_load(catalogs))
+            cache.unlink(missing_ok=True)
+        times.append(start_gui(catalogs))
+    if not cold:
+        loads = [time_load(catalogs) for _ in range(runs)]
+    paint = statistics.median(t[0] for t in times)
+    ready = statistics.median(t[1] for t in times)
+    print(f"{name:34} first paint {paint * 1000:6.0f} ms, listed {ready * 1000:6.0f} ms, "
+          f"database load alone {statistics.median(loads) * 1000:6.1f} ms")
+
+def main():
+    if 'DISPLAY' not in os.environ and sys.platform.startswith('linux'):
+        sys.exit("The GUI needs a display: run under xvfb-run")
+    config = ROOT / 'config.json'
+    if config.exists() and json.loads(config.read_text()).get('catalogs'):
+        print("Note: config.json names catalogs, which replace the generated one")
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog = str(Path(tmp) / 'generated.json')
+        write_catalog(catalog, CATALOG_SIZE)
+        report("standard catalog, cached", [], RUNS)
+        report(f"+{CATALOG_SIZE} sentences, compiling", [catalog], RUNS, cold=True)
+        report(f"+{CATALOG_SIZE} sentences, cached", [catalog], RUNS)
+        nmea_database.cache_path_for(nmea_database.DEFAULT_PATH, [catalog]).unlink(
+            missing_ok=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Throughput benchmark for the streaming NMEA log ingester.
+
+Writes a synthetic capture of checksummed sentences to a temporary file
+and reports how many MB/s nmea_logstats.ingest() processes.
+"""
+
+import os
+import sys
+import tempfile
+import time
+from functools import reduce
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from nmea_logstats import ingest
+
+PAYLOADS = [
+    "GPGGA,{t},4916.45,N,12311.12,W,1,08,0.9,545.4,M,46.9,M,,",
+    "GPRMC,{t},A,4916.45,N,12311.12,W,000.5,054.7,191194,020.3,E",
+    "GPGSV,3,1,11,03,03,111,00,04,15,270,00,06,01,010,00,13,06,292,00",
+    "HCHDT,274.07,T",
+    "IIMWV,214.8,R,0.1,K,A",
+]
+
+def checksum(payload):
+    return reduce(lambda a, b: a ^ b, payload.encode('ascii'), 0)
+
+def write_capture(path, target_mb):
+    """Write about target_mb megabytes of 1 Hz traffic to path."""
+    block = []
+    for second in range(600):
+        t = f"{second // 3600:02d}{second // 60 % 60:02d}{second % 60:02d}.00"
+        for template in PAYLOADS:
+            payload = template.format(t=t)
+            block.append(f"${payload}*{checksum(payload):02X}\r\n")
+    block = ''.join(block).encode('ascii')
+    with open(path, 'wb') as f:
+        for _ in range(max(1, target_mb * 1024 * 1024 // len(block))):
+            f.write(block)
+
+def main(target_mb=200, repeat=3):
+    """Run the benchmark and print MB/s."""
+    fd, path = tempfile.mkstemp(suffix='.nmea')
+    os.close(fd)
+    try:
+        write_capture(path, target_mb)
+        size = os.path.getsize(path)
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            stats = ingest(path)
+            best = min(best, time.perf_counter() - start)
+    finally:
+        os.remove(path)
+
+    print(f"Capture size:   {size / 1e6:.1f} MB")
+    print(f"Sentences:      {stats.lines}")
+    print(f"Best time:      {best:.3f} s")
+    print(f"Throughput:     {size / best / 1e6:.1f} MB/s")
+
+if __name__ == "__main__":
+    main()
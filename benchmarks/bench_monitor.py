@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""PTY loopback test for the live monitor.
+
+Opens a pseudo-terminal pair, writes valid NMEA sentences into one end
+from a thread and runs nmea_monitor on the other, then checks that every
+sentence arrived with a good checksum. The first run paces the writer at
+a saturated 460800 baud 8N1 line (46080 bytes/s); the second writes as
+fast as the PTY accepts to show how much headroom the monitor has.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import tty
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import nmea_database
+import nmea_monitor
+
+BAUD = 460800
+
+def make_sentences(count):
+    """Return count valid sentences cycling through a few IDs and talkers."""
+    bodies = [b"GPGGA,123519.00,4807.0380,N,01131.0000,E,1,08,0.9,545.4,M,46.9,M,,",
+              b"GPRMC,123519.00,A,4807.0380,N,01131.0000,E,022.4,084.4,230394,003.1,W,A",
+              b"HEHDT,274.07,T",
+              b"GPGSV,3,1,11,03,03,111,00,04,15,270,00,06,01,010,00,13,06,292,00",
+              b"AIVDM,1,1,,A,13u?etPv2;0n:dDPwUM1U1Cb069D,0"]
+    lines = [b"$" + body + b"*%02X\r\n" % nmea_monitor.checksum(body) for body in bodies]
+    lines[-1] = b"!" + lines[-1][1:]
+    return [lines[i % len(lines)] for i in range(count)]
+
+def writer(fd, sentences, bytes_per_second, monitor):
+    """Write sentences to fd, paced to bytes_per_second if given."""
+    start = time.perf_counter()
+    sent = 0
+    for line in sentences:
+        view = memoryview(line)
+        while view:
+            view = view[os.write(fd, view):]
+        sent += len(line)
+        if bytes_per_second:
+            delay = start + sent / bytes_per_second - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+    # Linux drops unread PTY data when the master closes, so wait for the
+    # monitor to catch up first
+    while monitor.total_bytes < sent:
+        time.sleep(0.01)
+    os.close(fd)
+
+def loopback(sentences, bytes_per_second):
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    tty.setraw(master)
+    monitor = nmea_monitor.Monitor(nmea_database.load_database(), BAUD, window=60)
+    thread = threading.Thread(target=writer, args=(master, sentences, bytes_per_second, monitor))
+    start = time.perf_counter()
+    thread.start()
+    asyncio.run(nmea_monitor.read_fd(slave, monitor, asyncio.Event()))
+    elapsed = time.perf_counter() - start
+    thread.join()
+    os.close(slave)
+    return monitor, elapsed
+
+def main(seconds=5):
+    capacity = BAUD / 10
+    line = sum(map(len, make_sentences(5))) / 5
+    paced = make_sentences(int(capacity * seconds / line))
+    for label, sentences, rate in (("Saturated 460800 baud", paced, capacity),
+                                   ("Unthrottled", make_sentences(200000), None)):
+        monitor, elapsed = loopback(sentences, rate)
+        snapshot = monitor.snapshot()
+        total = sum(map(len, sentences))
+        ok = (monitor.total_sentences == len(sentences) and not monitor.checksum_errors
+              and monitor.total_bytes == total)
+        print(f"{label}: {monitor.total_sentences}/{len(sentences)} sentences, "
+              f"{monitor.checksum_errors} checksum errors, "
+              f"{total / elapsed / 1024:,.0f} KB/s in {elapsed:.2f}s "
+              f"({'no bytes lost' if ok else 'LOST DATA'})")
+        if rate:
+            print(f"  measured {snapshot.measured:.1f}%, predicted {snapshot.predicted:.1f}%")
+
+if __name__ == '__main__':
+    main()
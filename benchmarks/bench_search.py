@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""Time sentence search lookups against the stored index.
+
+Replays a set of queries as typed one key at a time, searching after
+every key, and reports the mean and 95th percentile lookup time. The word cache is
+cleared before each query, so every lookup scores the word being typed. The catalog is also repeated with
+renamed copies to show how lookups scale with a larger database.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import nmea_database
+import nmea_search
+
+QUERIES = ['GGA', 'GPRMC', 'heading', 'true wind speed', 'gag', 'satellites in view',
+           'waypoint', 'depth below transducer', 'xyzzy']
+
+def time_lookups(index, queries, repeat=5):
+    """Return the mean and p95 seconds per keystroke, and the keystrokes timed."""
+    times = []
+    for _ in range(repeat):
+        for query in queries:
+            index.word_scores.cache_clear()
+            for end in range(1, len(query) + 1):
+                start = time.perf_counter()
+                index.search(query[:end])
+                times.append(time.perf_counter() - start)
+    times.sort()
+    return (sum(times) / len(times), times[int(0.95 * (len(times) - 1))],
+            len(times) // repeat)
+
+def main():
+    database = nmea_database.load_database()
+    start = time.perf_counter()
+    index = database.search_index
+    print(f"Stored index loaded in {(time.perf_counter() - start) * 1000:.2f} ms "
+          f"({len(index.tokens)} words)")
+    for copies in (1, 10, 50):
+        if copies == 1:
+            target = index
+        else:
+            sentences = {f"{ID}{n}": database[ID] for n in range(copies) for ID in database.ids}
+            target = nmea_search.SearchIndex.from_database(sentences)
+        mean, p95, keys = time_lookups(target, QUERIES)
+        print(f"{len(target.rows):6} sentences: {keys} keystrokes, "
+              f"mean {mean * 1e6:.0f} us, p95 {p95 * 1e6:.0f} us per lookup")
+
+if __name__ == '__main__':
+    main()
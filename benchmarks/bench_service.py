@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Load test for the HTTP/JSON bandwidth service.
+
+Starts nmea_service.py in a separate process (or uses --url), opens a
+number of keep-alive connections and sends a stream of bandwidth, detail
+and lookup requests on each, one at a time, then reports requests per
+second and latency percentiles. The bandwidth requests are drawn from a
+pool of random mixes so the LRU cache sees both hits and misses.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import nmea_database
+
+SERVICE = Path(__file__).resolve().parent.parent / 'nmea_service.py'
+
+def build_requests(count, pool_size, seed=0):
+    """Return raw HTTP requests: mostly bandwidth calculations, some lookups."""
+    rng = random.Random(seed)
+    ids = list(nmea_database.load_database().ids)
+    mixes = []
+    for _ in range(pool_size):
+        sentences = [f"{ID}@{rng.choice([0.2, 1, 2, 10])}" for ID in rng.sample(ids, rng.randint(2, 8))]
+        mixes.append(json.dumps({'baud': rng.choice([4800, 38400]), 'sentences': sentences}).encode())
+    requests = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.8:
+            body = rng.choice(mixes)
+            requests.append(b"POST /bandwidth HTTP/1.1\r\nHost: localhost\r\n"
+                            b"Content-Type: application/json\r\n"
+                            b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body)
+        elif kind < 0.95:
+            requests.append(f"GET /sentences/{rng.choice(ids)} HTTP/1.1\r\n"
+                            f"Host: localhost\r\n\r\n".encode())
+        else:
+            requests.append(b"GET /health HTTP/1.1\r\nHost: localhost\r\n\r\n")
+    return requests
+
+async def client(host, port, requests, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    for request in requests:
+        start = time.perf_counter()
+        writer.write(request)
+        head = await reader.readuntil(b'\r\n\r\n')
+        status = int(head.split(b' ', 2)[1])
+        length = int(head.lower().split(b'content-length:')[1].split(b'\r\n')[0])
+        await reader.readexactly(length)
+        latencies.append(time.perf_counter() - start)
+        if status not in (200, 404):
+            raise RuntimeError(f"Unexpected status {status}")
+    writer.close()
+    await writer.wait_closed()
+
+async def run(host, port, connections, total, pool_size):
+    requests = build_requests(total, pool_size)
+    per_client = [requests[i::connections] for i in range(connections)]
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, chunk, latencies) for chunk in per_client))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    print(f"Requests:       {total} on {connections} keep-alive connections")
+    print(f"Throughput:     {total / elapsed:,.0f} requests/s")
+    for label, q in (('p50', 0.5), ('p99', 0.99)):
+        print(f"Latency {label}:    {latencies[int(q * (len(latencies) - 1))] * 1000:.2f} ms")
+
+def start_service(port):
+    """Start nmea_service.py and wait until it accepts connections."""
+    process = subprocess.Popen([sys.executable, str(SERVICE), '--port', str(port)],
+                               stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if not line.startswith('Serving on'):
+        process.kill()
+        raise RuntimeError("Service did not start")
+    return process
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the NMEA bandwidth service")
+    parser.add_argument('--url', help="test a running service instead of starting one")
+    parser.add_argument('-c', '--connections', type=int, default=16)
+    parser.add_argument('-n', '--requests', type=int, default=20000)
+    parser.add_argument('--mixes', type=int, default=500,
+                        help="distinct bandwidth requests to draw from")
+    parser.add_argument('--port', type=int, default=18183)
+    args = parser.parse_args()
+
+    process = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port
+    else:
+        host, port = '127.0.0.1', args.port
+        process = start_service(port)
+    try:
+        asyncio.run(run(host, port, args.connections, args.requests, args.mixes))
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+if __name__ == '__main__':
+    main()
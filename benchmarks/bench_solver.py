@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""Time nmea_solver.solve on the full sentence catalog.
+
+Every sentence is an optional candidate with a priority and a rate range,
+GGA and RMC are required; each baud rate is solved on its own.
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import nmea_database
+import nmea_solver
+
+def main():
+    """Solve the catalog at several baud rates and print the timings."""
+    database = nmea_database.load_database()
+    rng = random.Random(0)
+    candidates = [nmea_solver.Candidate('GGA', min_rate=1, max_rate=10, required=True),
+                  nmea_solver.Candidate('RMC', required=True)]
+    for ID in database.ids:
+        if ID not in ('GGA', 'RMC'):
+            candidates.append(nmea_solver.Candidate(ID, priority=rng.randint(1, 5),
+                                                    min_rate=0.1, max_rate=rng.choice([1, 5, 10])))
+    print(f"{len(candidates)} candidates")
+    for baud in (4800, 9600, 38400, 115200):
+        start = time.perf_counter()
+        schedule = nmea_solver.solve(database, candidates, bauds=[baud])
+        elapsed = time.perf_counter() - start
+        print(f"{baud:>7} baud: {len(schedule.rates):>3} sentences, value {schedule.value:>4}, "
+              f"{schedule.utilization:5.1f}% in {elapsed * 1000:.1f} ms")
+
+if __name__ == '__main__':
+    main()
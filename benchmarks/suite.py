@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""Benchmark suite and performance regression gate for the calculator core.
+
+    python benchmarks/suite.py                      run and print every case
+    python benchmarks/suite.py --save               store the results as the baseline
+    python benchmarks/suite.py --compare            fail when a case is slower than
+                                                    the baseline by more than 25%
+
+Every case times the headless core (nmea_database, nmea_schedule,
+nmea_engine, nmea_jobs, nmea_logstats, nmea_generator, nmea_risk, nmea_lan) on
+fixed, seeded inputs, so no terminal or Tk display is needed and runs are
+comparable.
+Each case is timed with timeit: the iteration count is calibrated once,
+then the best of several repeats is reported as throughput (higher is
+better).
+
+Baselines are only comparable on the machine that saved them; save a new
+one after changing hardware or Python.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import nmea_database
+import nmea_jobs
+import nmea_link
+import nmea_schedule
+
+BASELINE = Path(__file__).resolve().parent / 'baseline.json'
+DEFAULT_THRESHOLD = 0.25
+REPEAT = 5
+
+CASES = {}
+
+def case(name, unit):
+    """Register a case: a function that prepares its inputs and returns
+    (callable to time, units of work per call) and optionally a cleanup."""
+    def register(function):
+        CASES[name] = (function, unit)
+        return function
+    return register
+
+def random_mixes(database, count, size, seed=0):
+    """Return count mixes of size (ID, rate) pairs drawn with a fixed seed."""
+    rng = random.Random(seed)
+    ids = sorted(database.keys())
+    return [[(ID, rng.choice([0.2, 1, 2, 5, 10])) for ID in rng.sample(ids, size)]
+            for _ in range(count)]
+
+@case('db_compile', 'loads/s')
+def db_compile():
+    raw = nmea_database.DEFAULT_PATH.read_bytes()
+
+    def run():
+        data = json.loads(raw)
+        nmea_database.compile_database(data['sentences'], data.get('metadata'))
+    return run, 1
+
+@case('db_load', 'loads/s')
+def db_load():
+    nmea_database.load_database(catalogs=[])
+    return lambda: nmea_database.load_database(catalogs=[]), 1
+
+@case('lookup', 'lookups/s')
+def lookup():
+    database = nmea_database.load_database(catalogs=[])
+    ids = list(database.ids)
+
+    def run():
+        wire_lengths = database.wire_lengths
+        for ID in ids:
+            wire_lengths(ID)
+    return run, len(ids)
+
+@case('record_decode', 'records/s')
+def record_decode():
+    database = nmea_database.load_database(catalogs=[])
+    buffer, ids = database._buffer, database.ids
+
+    def run():
+        table = nmea_database.SentenceTable(buffer)
+        for ID in ids:
+            table[ID]
+    return run, len(ids)
+
+@case('search', 'queries/s')
+def search():
+    index = nmea_database.load_database(catalogs=[]).search_index
+    queries = ['gga', 'GPRMC', 'heading', 'wind speed', 'gag', 'satellites', 'dep', 'xyzzy']
+
+    def run():
+        index.word_scores.cache_clear()
+        for query in queries:
+            index.search(query)
+    return run, len(queries)
+
+@case('single_mix', 'mixes/s')
+def single_mix():
+    database = nmea_database.load_database(catalogs=[])
+    mixes = [[nmea_schedule.Stream(ID, database.wire_lengths(ID)[1], rate) for ID, rate in mix]
+             for mix in random_mixes(database, 100, 8)]
+    link = nmea_link.link_model(4800)
+
+    def run():
+        for streams in mixes:
+            nmea_schedule.mix_usage(streams, database.wire_lengths, link)
+    return run, len(mixes)
+
+@case('running_load', 'updates/s')
+def running_load():
+    database = nmea_database.load_database(catalogs=[])
+    selections = [(database.wire_lengths(ID), rate)
+                  for mix in random_mixes(database, 20, 8) for ID, rate in mix]
+    load = nmea_schedule.RunningLoad()
+    link = nmea_link.link_model(38400)
+
+    def run():
+        # A GUI session: select, redraw after each change, then deselect
+        for lengths, rate in selections:
+            load.add(lengths, rate)
+            load.utilization(1.0, link)
+        for lengths, rate in selections:
+            load.remove(lengths, rate)
+    return run, 2 * len(selections)
+
+@case('batch', 'configs/s')
+def batch():
+    import numpy as np
+    import nmea_engine
+    rng = np.random.default_rng(0)
+    ids, lengths = nmea_engine.load_lengths(nmea_database.load_database(catalogs=[]))
+    mixes = rng.random((500, len(ids))) < 0.1
+    rates = rng.choice([0.2, 0.5, 1.0, 2.0, 5.0, 10.0], size=(20, len(ids)))
+    bauds = (4800, 9600, 38400, 115200)
+    return (lambda: nmea_engine.utilization(lengths, mixes, rates, bauds),
+            len(mixes) * len(rates) * len(bauds))
+
+@case('ais', 'scenarios/s')
+def ais():
+    import nmea_ais
+    # 10k-target harbor populations, as the per-target rates see them
+    populations = [nmea_ais.random_targets(10_000, share, seed=i)
+                   for i, share in enumerate((0.3, 0.5, 0.8))]
+    link = nmea_link.link_model(38400)
+
+    def run():
+        for is_a, intervals in populations:
+            nmea_ais.load(nmea_ais.target_rates(is_a, intervals), link)
+    return run, len(populations)
+
+@case('marginal', 'sentences/s')
+def marginal():
+    import numpy as np
+    import nmea_engine
+    # An 8000-sentence catalog, re-annotated for a new link and default rate
+    rng = np.random.default_rng(0)
+    ids = [f"P{n:05d}" for n in range(8000)]
+    costs = nmea_engine.MarginalCosts(ids, rng.integers(17, 83, len(ids)), 4800)
+    links = [nmea_link.link_model(link) for link in (4800, '38400 7E1', 115200)]
+
+    def run():
+        for i, link in enumerate(links):
+            costs.set_link(link)
+            costs.set_default_rate(i + 1)
+            costs.fits(50.0)
+    return run, len(ids) * len(links)
+
+@case('risk', 'trials/s')
+def risk():
+    import nmea_risk
+    database = nmea_database.load_database(catalogs=[])
+    job = {'sentences': ['GGA@10', 'RMC', 'VTG@5', 'HDT@10', 'GSV', 'GSA', 'ZDA']}
+    streams = nmea_jobs.job_streams(database, job)
+    trials = 200_000
+    return (lambda: nmea_risk.overload_risk(streams, database, 19200, trials, workers=1),
+            trials)
+
+@case('lan', 'devices/s')
+def lan():
+    import nmea_lan
+    database = nmea_database.load_database(catalogs=[])
+    # A whole-ship network: 24 switches, 300 talkers (every third a bridge
+    # batching three serial talkers) and 100 listeners
+    mixes = iter(random_mixes(database, 500, 4))
+    spec = {'switches': [{'name': f"sw{n}"} for n in range(24)],
+            'links': [{'from': 'sw0', 'to': f"sw{n}", 'speed': 1000} for n in range(1, 24)],
+            'devices': []}
+    for n in range(400):
+        device = {'name': f"dev{n}", 'switch': f"sw{n % 24}"}
+        talkers = [device]
+        if n >= 300:
+            device['listen'] = ['NAVD', 'TGTD'] if n % 2 else ['NAVD']
+            talkers = []
+        elif n % 3 == 0:
+            device['batch'] = 0.05
+            device['serial'] = talkers = [{'baud': 38400}, {}, {}]
+        for talker in talkers:
+            talker['sentences'] = [f"{ID}@{rate:g}" for ID, rate in next(mixes)]
+        spec['devices'].append(device)
+    network = nmea_lan.load_network(spec, database)
+
+    def run():
+        # Any change recomputes every port
+        network.set_batch('dev0', 0.05)
+        network.analyze()
+    return run, len(network.devices)
+
+@case('jobs', 'jobs/s')
+def jobs():
+    database = nmea_database.load_database(catalogs=[])
+    job_list = [{'baud': 4800 if i % 2 else 38400,
+                 'sentences': [f"{ID}@{rate:g}" for ID, rate in mix]}
+                for i, mix in enumerate(random_mixes(database, 500, 6))]
+    return (lambda: [nmea_jobs.evaluate_job(database, job, i) for i, job in enumerate(job_list)],
+            len(job_list))
+
+@case('ingest', 'MB/s')
+def ingest():
+    import nmea_logstats
+    from bench_logstats import write_capture
+    fd, path = tempfile.mkstemp(suffix='.nmea')
+    os.close(fd)
+    write_capture(path, 20)
+    size = os.path.getsize(path)
+    return lambda: nmea_logstats.ingest(path), size / 1e6, lambda: os.remove(path)
+
+@case('generate', 'MB/s')
+def generate():
+    import nmea_generator
+    database = nmea_database.load_database(catalogs=[])
+    job = {'sentences': ['GGA@10', 'RMC', 'VTG', 'HDT@10', 'GSV@0.2', 'ZDA'], 'baud': 38400}
+    streams = nmea_jobs.job_streams(database, job)
+    templates = nmea_generator.compile_templates(database, streams)
+    size = 4_000_000
+
+    def run():
+        transmissions = nmea_generator.traffic(streams, templates, 38400)
+        nmea_generator.emit(transmissions, lambda chunks: None, size=size)
+    return run, size / 1e6
+
+def measure(name, repeat=REPEAT):
+    """Return the best throughput of a case in units per second."""
+    function, _ = CASES[name]
+    run, units, *cleanup = function()
+    try:
+        timer = timeit.Timer(run)
+        number, _ = timer.autorange()
+        best = min(timer.repeat(repeat, number)) / number
+    finally:
+        for callback in cleanup:
+            callback()
+    return units / best
+
+def environment():
+    return {'python': platform.python_version(), 'machine': platform.machine(),
+            'system': platform.system(), 'processor': platform.processor()}
+
+def compare(results, baseline, threshold):
+    """Print each case against the baseline; return the names that regressed."""
+    regressed = []
+    print(f"{'case':<15}{'baseline':>14}{'now':>14}{'change':>9}")
+    for name, value in results.items():
+        entry = baseline['results'].get(name)
+        if entry is None:
+            print(f"{name:<15}{'-':>14}{value:>14,.0f}{'new':>9}")
+            continue
+        change = value / entry - 1
+        flag = ''
+        if change < -threshold:
+            regressed.append(name)
+            flag = '  REGRESSED'
+        print(f"{name:<15}{entry:>14,.0f}{value:>14,.0f}{change:>+9.1%}{flag}")
+    return regressed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the calculator core")
+    parser.add_argument('cases', nargs='*', help=f"cases to run (default: all of {', '.join(CASES)})")
+    parser.add_argument('--save', action='store_true', help="store the results as the baseline")
+    parser.add_argument('--compare', action='store_true',
+                        help="compare with the baseline and fail on regressions")
+    parser.add_argument('--baseline', type=Path, default=BASELINE, help="baseline file")
+    parser.add_argument('--threshold', type=float,
+                        help="largest allowed slowdown as a fraction "
+                             "(default: the baseline's, else 0.25)")
+    parser.add_argument('-r', '--repeat', type=int, default=REPEAT, help="timed repeats per case")
+    parser.add_argument('--json', action='store_true', help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    names = args.cases or list(CASES)
+    unknown = [name for name in names if name not in CASES]
+    if unknown:
+        parser.error(f"unknown case: {', '.join(unknown)}")
+
+    results = {}
+    for name in names:
+        results[name] = measure(name, args.repeat)
+        if not args.json and not args.compare:
+            print(f"{name:<15}{results[name]:>14,.0f} {CASES[name][1]}", flush=True)
+    if args.json:
+        print(json.dumps({'environment': environment(), 'results': results}, indent=2))
+
+    if args.save:
+        data = {'environment': environment(),
+                'threshold': args.threshold or DEFAULT_THRESHOLD, 'results': results}
+        if args.cases and args.baseline.exists():
+            # Saving some cases keeps the others
+            old = json.loads(args.baseline.read_text())
+            data['results'] = {**old['results'], **results}
+        args.baseline.write_text(json.dumps(data, indent=2) + '\n')
+        print(f"Saved baseline to {args.baseline}")
+
+    if args.compare:
+        try:
+            baseline = json.loads(args.baseline.read_text())
+        except OSError:
+            print(f"No baseline at {args.baseline}; run with --save first", file=sys.stderr)
+            return 2
+        if baseline.get('environment') != environment():
+            print("Note: the baseline was saved on a different machine or Python")
+        threshold = args.threshold or baseline.get('threshold', DEFAULT_THRESHOLD)
+        regressed = compare(results, baseline, threshold)
+        if regressed:
+            print(f"\nRegressed by more than {threshold:.0%}: {', '.join(regressed)}")
+            return 1
+        print(f"\nNo case regressed by more than {threshold:.0%}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,23 +1,41 @@
 #!/usr/bin/env python3
 
-import json
 import os
+import sys
 from pathlib import Path
 
+import nmea_database
+import nmea_link
+import nmea_metrics
+import nmea_presets
+import nmea_schedule
+import nmea_search
+
 def load_database():
-    """Load NMEA sentence database from JSON"""
+    """Load NMEA sentence database from the compiled cache of the JSON file"""
     try:
         db_path = Path(__file__).parent / 'nmea_sentences.json'
-        with open(db_path, 'r') as f:
-            data = json.load(f)
-        return data['sentences']
+        return nmea_database.load_database(db_path)
     except Exception as e:
         print(f"Error loading database: {str(e)}")
         return {}
 
+def loadCommandDatabase():
+    """Load the database for a subcommand, printing why to stderr and
+    returning None if it cannot be loaded."""
+    try:
+        return nmea_database.load_database(Path(__file__).parent / 'nmea_sentences.json')
+    except (OSError, ValueError) as e:
+        print(f"Error loading database: {str(e)}", file=sys.stderr)
+        return None
+
 def clear():
     """Clear the terminal screen."""
-    os.system('cls' if os.name == 'nt' else 'clear')
+    if os.name == 'nt':
+        os.system('cls')
+    else:
+        # ANSI clear and home; avoids spawning a shell for every redraw
+        print('\033[2J\033[3J\033[H', end='', flush=True)
 
 def printMenu():
     """Print the main menu."""
@@ -28,23 +46,43 @@ def printMenu():
     print("4. Exit")
     print("\nEnter your choice (1-4):", end=" ")
 
-def printSentenceList(database):
-    """Print available sentence IDs in a grid format."""
+@nmea_metrics.instrumented('cli.sentence_list')
+def printSentenceList(database, costs=None, total=0.0, selected=()):
+    """Print available sentence IDs in a grid format.
+
+    With costs (nmea_engine.MarginalCosts) every sentence shows the
+    utilization it adds to a mix at total percent, colored by the status
+    adding it would give; selected ones show what they use already.
+    """
     sentences = sorted(list(database.keys()))
-    num_cols = 8
+    num_cols = 8 if costs is None else 6
     num_rows = (len(sentences) + num_cols - 1) // num_cols
-    col_width = 6
+    col_width = 6 if costs is None else 13
+    colors = {'ok': '', 'high': '\033[93m', 'over': '\033[91m'}
 
-    print("\nAvailable NMEA 0183 Sentences:")
+    if costs is None:
+        print("\nAvailable NMEA 0183 Sentences:")
+    else:
+        print("\nAvailable NMEA 0183 Sentences (utilization each adds):")
     print("-" * (col_width * num_cols))
 
     for row in range(num_rows):
         row_items = []
         for col in range(num_cols):
             idx = row + (col * num_rows)
-            if idx < len(sentences):
-                row_items.append(f"{sentences[idx]:<{col_width}}")
-        print("".join(row_items))
+            if idx >= len(sentences):
+                continue
+            ID = sentences[idx]
+            if costs is None:
+                row_items.append(f"{ID:<{col_width}}")
+            elif ID in selected:
+                row_items.append(f"{ID:<5}{costs.cost(ID):6.1f}%  ")
+            else:
+                cost = costs.cost(ID)
+                color = colors[nmea_schedule.status_of(total + cost)]
+                reset = '\033[0m' if color else ''
+                row_items.append(f"{color}{ID:<5}{cost:+6.1f}%{reset}  ")
+        print("".join(row_items).rstrip())
     print("-" * (col_width * num_cols))
 
 def showSentenceDetails(database):
@@ -52,16 +90,18 @@ def showSentenceDetails(database):
     clear()
     print("\nShow Sentence Details")
     printSentenceList(database)
-    print("\nEnter sentence ID (or 'q' to return to menu):", end=" ")
+    print("\nEnter sentence ID or search words (or 'q' to return to menu):", end=" ")
     
     while True:
-        ID = input().upper()
+        query = input()
+        ID = query.strip().upper()
         if ID == 'Q':
             return
         try:
             sentence = database[ID]
             print(f"\n{'-'*50}")
-            print(f"{ID} is {len(sentence['sentence_structure'])} bytes long")
+            minimum, typical, maximum = database.wire_lengths(ID)
+            print(f"{ID} is {typical} bytes long on the wire ({minimum} to {maximum} bytes)")
             print(f"Description: {sentence['sentence_name']}")
             
             # Sentence structure - moved up after description
@@ -94,12 +134,28 @@ def showSentenceDetails(database):
                     print(f"  Current NMEA Version: {sentence['version']['nmea'][1]}")
                 if sentence['version']['iec']:
                     print(f"  Current IEC Version: {sentence['version']['iec']}")
+            elif sentence['standard'] == 'P':
+                print("  Standard: Proprietary")
+            if len(getattr(database, 'catalogs', ())) > 1:
+                catalog = database.catalog_of(ID)
+                print(f"  Catalog: {catalog['name']} {catalog.get('version', '')}".rstrip())
             
             print(f"\n{'-'*50}")
             print("\nEnter another sentence ID (or 'q' to return to menu):", end=" ")
         except KeyError:
-            print(f"Error: Sentence ID '{ID}' not found in database")
-            print("\nEnter sentence ID (or 'q' to return to menu):", end=" ")
+            printMatches(database, query)
+            print("\nEnter sentence ID or search words (or 'q' to return to menu):", end=" ")
+
+@nmea_metrics.instrumented('cli.search')
+def printMatches(database, query, limit=10):
+    """Print the sentences that best match a search, with their descriptions."""
+    matches = nmea_search.search(database, query, limit)
+    if not matches:
+        print(f"No sentences match '{query.strip()}'")
+        return
+    print(f"\nSentences matching '{query.strip()}':")
+    for match in matches:
+        print(f"  {match.id:<6}{database[match.id]['sentence_name']}")
 
 def showHelp():
     """Display help documentation from markdown file."""
@@ -114,75 +170,108 @@ def showHelp():
         print(f"Error loading help file: {str(e)}")
         input("\nPress Enter to continue...")
 
-def calculateBandwidth(database):
+def calculateBandwidth(database, results):
     """Calculate bandwidth usage for specified sentences."""
+    import nmea_engine
     sentences = []  # Move sentences list outside the rate selection loop
+    sizes = {}  # Measured lengths from a log profile, by sentence ID
+    profile_path = None
+    # What adding each sentence would cost, kept in step with the link,
+    # update rate and measured lengths
+    ids, lengths = nmea_engine.load_lengths(database)
+    costs = nmea_engine.MarginalCosts(ids, lengths, 4800)
     
     while True:
         clear()
         print("\nCalculate Bandwidth")
         
-        # Get baud rate
+        # Get baud rate and framing
         print("\nSelect baud rate:")
         print("1. 4800")
         print("2. 38400")
-        while True:
-            choice = input("Enter choice (1-2): ")
-            if choice == '1':
-                baud = 4800
-                break
-            elif choice == '2':
-                baud = 38400
-                break
-            print("Invalid choice")
-        
-        # Get update rate
-        print("\nSelect update rate:")
-        print("1. 2 seconds (0.5Hz)")
-        print("2. 1 second (1Hz)")
-        print("3. 0.5 seconds (2Hz)")
-        print("4. 0.2 seconds (5Hz)")
-        print("5. 0.1 seconds (10Hz)")
-        print("6. 0.05 seconds (20Hz)")
-        
+        print("3. 9600")
+        print("4. 115200")
+        print("5. Other (baud and framing, e.g. 57600 or 115200 7E1)")
+        print("6. Load a saved preset")
+        loaded = None
         while True:
             choice = input("Enter choice (1-6): ")
-            if choice in ['1','2','3','4','5','6']:
-                periods = [2.0, 1.0, 0.5, 0.2, 0.1, 0.05]
-                period = periods[int(choice)-1]
+            if choice in ['1', '2', '3', '4']:
+                link = nmea_link.make_profile([4800, 38400, 9600, 115200][int(choice)-1])
                 break
+            elif choice == '5':
+                try:
+                    link = nmea_link.parse_link(input("Baud rate and framing: "))
+                    break
+                except ValueError as e:
+                    print(f"Error: {str(e)}")
+                    continue
+            elif choice == '6':
+                loaded = choosePreset(database, sizes)
+                if loaded:
+                    link, period, sentences = loaded
+                    break
+                continue
             print("Invalid choice")
+        baud = nmea_link.link_model(link)
+        
+        # Get update rate (a preset brings its own)
+        if not loaded:
+            print("\nSelect update rate:")
+            print("1. 2 seconds (0.5Hz)")
+            print("2. 1 second (1Hz)")
+            print("3. 0.5 seconds (2Hz)")
+            print("4. 0.2 seconds (5Hz)")
+            print("5. 0.1 seconds (10Hz)")
+            print("6. 0.05 seconds (20Hz)")
+            
+            while True:
+                choice = input("Enter choice (1-6): ")
+                if choice in ['1','2','3','4','5','6']:
+                    periods = [2.0, 1.0, 0.5, 0.2, 0.1, 0.05]
+                    period = periods[int(choice)-1]
+                    break
+                print("Invalid choice")
         
         while True:
             clear()
             print("\nCalculate Bandwidth")
             print(f"\nCurrent Settings:")
-            print(f"  Baud Rate: {baud}")
-            print(f"  Update Rate: {period} seconds ({1/period:.1f}Hz)")
+            print(f"  Baud Rate: {nmea_link.describe(link)}")
+            print(f"  Update Rate: {period:g} seconds ({1/period:.1f}Hz)")
+            print(f"  Sizing: {profile_path or 'sentence templates'}")
+            
+            if costs.model.profile != baud.profile:
+                costs.set_link(baud)
+            if costs.default_rate != 1 / period:
+                costs.set_default_rate(1 / period)
+            for ID, size in sizes.items():
+                if ID in costs.index and costs.lengths[costs.index[ID]] != size:
+                    costs.set_length(ID, size)
+            total = 0.0
+            if sentences:
+                streams = [nmea_schedule.Stream(ID, length, rate or 1 / period)
+                           for ID, length, rate in sentences]
+                usage = results.usage(streams, baud)
+                total = usage.expected
             print("\nAvailable Sentences:")
-            printSentenceList(database)
+            printSentenceList(database, costs, total, {entry[0] for entry in sentences})
             
             # Show current selections and bandwidth first
             if sentences:
-                total_bytes = sum(length for _, length in sentences)
-                transmission_time = (total_bytes * 10) / baud
-                bandwidth_percentage = (transmission_time / period) * 100
-                
                 print("\nSelected Sentences:")
-                for ID, length in sentences:
-                    print(f"  {ID}: {length} bytes")
-                print(f"  Total: {total_bytes} bytes")
-                print("\nBandwidth Usage:")
-                print(create_progress_bar(bandwidth_percentage))
-                if bandwidth_percentage > 100:
-                    print("WARNING: Bandwidth exceeds maximum!")
-                elif bandwidth_percentage > 80:
-                    print("CAUTION: Bandwidth usage is high")
+                printSelectedSentences(streams, baud)
+                printUsage(usage)
             
             print("\nCommands:")
-            print("  Enter sentence ID to add")
+            print("  Enter sentence ID to add (ID@Hz for its own rate, e.g. GGA@10)")
             print("  'r' to reset selections")
             print("  'b' to change baud/update rates")
+            print("  's' to simulate the transmission timeline")
+            print("  'o' to estimate the risk of momentary overload (Monte Carlo)")
+            print("  'p' to size sentences from a measured log profile")
+            print("  'a' to add the AIS traffic (VDM/VDO) of the targets in range")
+            print("  'l' to load a saved preset, 'w' to save this mix as one")
             print("  'c' to calculate final results")
             print("  'q' to return to menu")
             
@@ -194,6 +283,58 @@ def calculateBandwidth(database):
                 continue
             elif cmd == 'B':
                 break  # Go back to baud/update rate selection, keeping sentences
+            elif cmd == 'P':
+                path = input("Profile file (from nmea_logstats.py -o): ").strip()
+                try:
+                    import nmea_logstats
+                    sizes = nmea_logstats.load_profile(path).profile('mean')
+                    profile_path = path
+                    # Only measured sentences change size; AIS fragments keep theirs
+                    sentences = [(ID, sizes[ID] if ID in sizes and ID not in
+                                  nmea_schedule.EXACT_LENGTH_IDS else length, rate)
+                                 for ID, length, rate in sentences]
+                    print(f"Loaded measured lengths for {len(sizes)} sentences")
+                except Exception as e:
+                    print(f"Error loading profile: {str(e)}")
+                input("Press Enter to continue...")
+                continue
+            elif cmd == 'A':
+                ais = askAisTraffic(baud)
+                if ais:
+                    # The model's fragments replace any earlier AIS traffic
+                    sentences = [entry for entry in sentences if entry[0] not in ('VDM', 'VDO')]
+                    sentences += [(stream.id, stream.length, stream.rate) for stream in ais]
+                input("Press Enter to continue...")
+                continue
+            elif cmd == 'L':
+                loaded = choosePreset(database, sizes)
+                if loaded:
+                    link, period, sentences = loaded
+                    baud = nmea_link.link_model(link)
+                else:
+                    input("Press Enter to continue...")
+                continue
+            elif cmd == 'W':
+                if not sentences:
+                    print("No sentences selected")
+                else:
+                    savePreset(sentences, period, link)
+                input("Press Enter to continue...")
+                continue
+            elif cmd == 'S':
+                if not sentences:
+                    print("No sentences selected")
+                else:
+                    showSimulation(streams, baud)
+                input("Press Enter to continue...")
+                continue
+            elif cmd == 'O':
+                if not sentences:
+                    print("No sentences selected")
+                else:
+                    showOverloadRisk(database, streams, baud)
+                input("Press Enter to continue...")
+                continue
             elif cmd == 'C':
                 if not sentences:
                     print("No sentences selected")
@@ -204,55 +345,459 @@ def calculateBandwidth(database):
                 clear()
                 print("\nFinal Results:")
                 print(f"\nCurrent Settings:")
-                print(f"  Baud Rate: {baud}")
-                print(f"  Update Rate: {period} seconds ({1/period:.1f}Hz)")
+                print(f"  Baud Rate: {nmea_link.describe(link)}")
+                print(f"  Update Rate: {period:g} seconds ({1/period:.1f}Hz)")
                 print("\nSelected Sentences:")
-                for ID, length in sentences:
-                    print(f"  {ID}: {length} bytes")
-                print(f"  Total: {total_bytes} bytes")
-                print(f"\nTransmission time: {transmission_time:.6f} seconds")
-                print("\nBandwidth Usage:")
-                print(create_progress_bar(bandwidth_percentage))
-                if bandwidth_percentage > 100:
-                    print("WARNING: Bandwidth exceeds maximum!")
-                elif bandwidth_percentage > 80:
-                    print("CAUTION: Bandwidth usage is high")
+                printSelectedSentences(streams, baud)
+                print(f"\nTransmission time: {usage.load:.6f} seconds per second")
+                printUsage(usage)
                 input("\nPress Enter to continue...")
                 return
             
-            # Process sentence ID
+            # Process sentence ID, optionally with its own rate
             try:
-                structure = database[cmd]['sentence_structure']
-                length = len(structure)
-                sentences.append((cmd, length))
-                print(f"Added {cmd} ({length} bytes)")
+                ID, rate = nmea_schedule.parse_rate(cmd)
+                length = sizes.get(ID) or database.wire_lengths(ID)[1]
+                sentences.append((ID, length, rate))
+                if rate:
+                    print(f"Added {ID} ({length} bytes at {rate:g}Hz)")
+                else:
+                    print(f"Added {ID} ({length} bytes)")
+                input("Press Enter to continue...")
+            except ValueError:
+                print(f"Error: Invalid update rate in '{cmd}'")
                 input("Press Enter to continue...")
             except KeyError:
-                if cmd not in ['Q', 'R', 'B', 'C']:
+                if cmd not in ['Q', 'R', 'B', 'C', 'S', 'O', 'P', 'A', 'L', 'W']:
                     print(f"Error: Sentence ID '{cmd}' not found in database")
+                    matches = nmea_search.search(database, cmd.split('@')[0], 5)
+                    if matches:
+                        print(f"Did you mean: {', '.join(match.id for match in matches)}?")
                     input("Press Enter to continue...")
 
+def askAisTraffic(baud):
+    """Ask for the AIS targets in range and return the VDM/VDO streams they send."""
+    import nmea_ais
+    def ask(prompt, default=None):
+        text = input(prompt).strip()
+        return default if not text else float(text)
+    try:
+        targets = ask("AIS targets in range: ")
+        if targets is None:
+            return None
+        class_a = ask("Class A share in percent (Enter for 100): ", 100.0) / 100
+        interval_a = ask(f"Class A reporting interval in seconds "
+                         f"(Enter for {nmea_ais.CLASS_A_INTERVAL:g}): ", nmea_ais.CLASS_A_INTERVAL)
+        interval_b = ask(f"Class B reporting interval in seconds "
+                         f"(Enter for {nmea_ais.CLASS_B_INTERVAL:g}): ", nmea_ais.CLASS_B_INTERVAL)
+        own_ship = ask("Own-ship VDO interval in seconds (Enter for none): ")
+        rates = nmea_ais.scenario_rates(targets, class_a, interval_a, interval_b)
+    except ValueError as e:
+        print(f"Error: {str(e)}")
+        return None
+    load = nmea_ais.load(rates, baud)
+    print(f"AIS: {load.messages:.1f} messages/s in {load.sentences:.1f} sentences/s, "
+          f"{load.bytes_per_second:.0f} bytes/s ({load.utilization:.1f}% of the link)")
+    return nmea_ais.streams(rates, own_ship_interval=own_ship)
+
+def choosePreset(database, sizes):
+    """List the saved presets and return (link, period, sentences) of the chosen one."""
+    try:
+        presets = nmea_presets.load_presets()
+    except Exception as e:
+        print(f"Error loading presets: {str(e)}")
+        return None
+    if not presets:
+        print("No saved presets yet (save a mix with 'w')")
+        return None
+    print("\nSaved presets:")
+    for name, preset in presets.items():
+        print(f"  {name:<16}{preset.get('link', preset.get('baud', 4800))}: "
+              f"{', '.join(map(str, preset.get('sentences', [])))}")
+    name = input("Preset name (Enter to cancel): ").strip()
+    if not name:
+        return None
+    if name not in presets:
+        print(f"Error: No preset named '{name}'")
+        return None
+    try:
+        link, rate, mix = nmea_presets.preset_mix(presets[name])
+        sentences = [(ID, sizes.get(ID) or database.wire_lengths(ID)[1], own_rate)
+                     for ID, own_rate in mix]
+    except KeyError as e:
+        print(f"Error: Sentence ID '{e.args[0]}' not found in database")
+        return None
+    except (ValueError, TypeError) as e:
+        print(f"Error: {str(e)}")
+        return None
+    return link, 1 / rate, sentences
+
+def savePreset(sentences, period, link):
+    """Save the current mix, rates and link under a name."""
+    name = input("Preset name: ").strip()
+    if not name:
+        return
+    preset = nmea_presets.make_preset([(ID, rate) for ID, _, rate in sentences], 1 / period, link)
+    try:
+        nmea_presets.save_preset(name, preset)
+        print(f"Saved preset '{name}'")
+    except Exception as e:
+        print(f"Error saving preset: {str(e)}")
+
+def printSelectedSentences(streams, link):
+    """Print the selected sentences, the most expensive first, and the total load."""
+    for cost in nmea_schedule.rank_mix(streams, link):
+        print(f"  {cost.id}: {cost.length} bytes @ {cost.rate:g}Hz, "
+              f"{cost.utilization:.1f}% ({cost.share:.0f}% of the mix)")
+    print(f"  Total: {sum(stream.length for stream in streams)} bytes, "
+          f"{nmea_schedule.bytes_per_second(streams):.1f} bytes/s")
+
+@nmea_metrics.instrumented('cli.usage')
+def printUsage(usage):
+    """Print the bandwidth bar, the usage range and any warning for a mix."""
+    print("\nBandwidth Usage:")
+    print(create_progress_bar(usage.expected))
+    printUsageRange(usage.best, usage.expected, usage.worst)
+    if usage.status == 'over':
+        print("WARNING: Bandwidth exceeds maximum!")
+    elif usage.status == 'high':
+        print("CAUTION: Bandwidth usage is high")
+
+def printUsageRange(best, expected, worst):
+    """Print best, expected and worst-case utilization side by side."""
+    print(f"  Best case: {best:.1f}%   Expected: {expected:.1f}%   "
+          f"Worst case: {worst:.1f}%")
+    if worst > 100 and expected <= 100:
+        print("CAUTION: Worst-case sentence lengths exceed maximum")
+
+@nmea_metrics.instrumented('cli.simulation')
+def showSimulation(streams, baud):
+    """Simulate the selected mix on the serial line and print the timeline summary."""
+    try:
+        result = nmea_schedule.simulate(streams, baud)
+    except ValueError as e:
+        print(f"Error: {str(e)}")
+        return
+    print(f"\nTimeline Simulation ({result.hyperperiod:g} second hyperperiod):")
+    print(f"  Transmissions: {result.transmissions}")
+    print(f"  Line utilization: {result.utilization:.1f}%")
+    print(f"  Peak burst: {result.peak_backlog_bytes:.0f} bytes queued at "
+          f"{result.peak_backlog_time:.3f}s")
+    print(f"  Idle gaps: {result.idle_gaps} "
+          f"(shortest {result.shortest_idle * 1000:.1f}ms, "
+          f"longest {result.longest_idle * 1000:.1f}ms)")
+    if result.carry_over:
+        print(f"  WARNING: {result.carry_over:.3f}s of data still queued at the end "
+              f"of the hyperperiod")
+    print("\n  Worst-case latency per sentence:")
+    for stats in result.sentences:
+        print(f"    {stats.id}: queued {stats.worst_queueing * 1000:.1f}ms, "
+              f"delivered {stats.worst_latency * 1000:.1f}ms")
+
+@nmea_metrics.instrumented('cli.risk')
+def showOverloadRisk(database, streams, baud):
+    """Sample a million windows of the selected mix and print the overload risk."""
+    import nmea_risk
+    print("\nSampling sentence lengths and phases...")
+    try:
+        risk = nmea_risk.overload_risk(streams, database, baud)
+    except ValueError as e:
+        print(f"Error: {str(e)}")
+        return
+    printRisk(risk)
+
+def printRisk(risk):
+    """Print the distribution of window utilization and the chance of overload."""
+    import nmea_risk
+    print(f"\nOverload Risk ({risk.trials:,} windows of {risk.window:g} s):")
+    print(f"  Long-run utilization: {risk.expected:.1f}%")
+    print(f"  Window utilization: mean {risk.mean:.1f}%, std {risk.std:.2f}%, "
+          f"peak {risk.peak:.1f}%")
+    print("  Percentiles: " + "  ".join(f"p{q:g} {value:.1f}%"
+                                        for q, value in risk.percentiles.items()))
+    if risk.overloads:
+        print(f"  Overloaded windows: {risk.overloads:,} ({risk.overload_probability:.3g}, "
+              f"up to {risk.overload_upper:.3g} at 95% confidence), "
+              f"about {nmea_risk.overloads_per_hour(risk):.3g} per hour")
+    else:
+        print(f"  Overloaded windows: none (below {risk.overload_upper:.3g} at 95% confidence)")
+
 def create_progress_bar(percentage, width=50):
     """Create a console-friendly progress bar."""
     filled = int(width * percentage / 100)
     bar = '█' * filled + '░' * (width - filled)
     color = ''
     reset = '\033[0m'
-    if percentage > 100:
+    status = nmea_schedule.status_of(percentage)
+    if status == 'over':
         color = '\033[91m'  # Red
         filled = width  # Ensure bar is completely filled when over 100%
-    elif percentage > 80:
+    elif status == 'high':
         color = '\033[93m'  # Yellow
     else:
         color = '\033[92m'  # Green
     return f"{color}[{bar}] {percentage:.1f}%{reset}"
 
-def main():
-    """Main program loop."""
+def runJobs(args):
+    """Evaluate a job file without the interactive menu."""
+    import nmea_jobs
+    try:
+        jobs = nmea_jobs.load_jobs(args.jobfile)
+    except Exception as e:
+        print(f"Error loading job file: {str(e)}", file=sys.stderr)
+        return 2
+    try:
+        results = nmea_jobs.run_jobs(jobs, workers=args.workers)
+    except (OSError, ValueError) as e:
+        print(f"Error loading database: {str(e)}", file=sys.stderr)
+        return 2
+    if args.output:
+        with open(args.output, 'w', newline='') as f:
+            nmea_jobs.write_results(results, f, args.format)
+    else:
+        nmea_jobs.write_results(results, sys.stdout, args.format)
+    return 1 if any('error' in result for result in results) else 0
+
+def solveMix(args):
+    """Find the most valuable sentence mix that fits under a utilization ceiling."""
+    import json
+    import nmea_jobs
+    import nmea_solver
+    try:
+        spec = nmea_jobs.read_document(args.specfile)
+        candidates = nmea_solver.load_candidates(spec)
+    except Exception as e:
+        print(f"Error loading problem file: {str(e)}", file=sys.stderr)
+        return 2
+    database = loadCommandDatabase()
+    if database is None:
+        return 2
+    try:
+        schedule = nmea_solver.solve(database, candidates,
+                                     bauds=spec.get('bauds', [4800, 38400]),
+                                     ceiling=spec.get('ceiling', 80),
+                                     bound=spec.get('bound', 'typical'))
+    except KeyError as e:
+        print(f"Error: Sentence ID {e} not found in database", file=sys.stderr)
+        return 2
+    if schedule is None:
+        print(json.dumps({'feasible': False}))
+        return 1
+    print(json.dumps({'feasible': True, **schedule._asdict()}, indent=2))
+    return 0
+
+def analyzeNetwork(args):
+    """Report the load of every port in a network of talkers and multiplexers."""
+    import json
+    import nmea_jobs
+    import nmea_topology
+    database = loadCommandDatabase()
+    if database is None:
+        return 2
+    try:
+        spec = nmea_jobs.read_document(args.topologyfile)
+        topology = nmea_topology.load_topology(spec, database)
+        ports = topology.ports()
+    except KeyError as e:
+        print(f"Error loading topology: {e.args[0]}", file=sys.stderr)
+        return 2
+    except Exception as e:
+        print(f"Error loading topology: {str(e)}", file=sys.stderr)
+        return 2
+    print(json.dumps([port._asdict() for port in ports], indent=2))
+    return 1 if any(port.drop_risk != 'none' for port in ports) else 0
+
+def analyzeLan(args):
+    """Report the traffic of an IEC 61162-450 network and optionally capture it."""
+    import json
+    import nmea_jobs
+    import nmea_lan
+    database = loadCommandDatabase()
+    if database is None:
+        return 2
+    try:
+        spec = nmea_jobs.read_document(args.networkfile)
+        network = nmea_lan.load_network(spec, database)
+        devices, groups, ports = network.analyze()
+    except KeyError as e:
+        print(f"Error loading network: {e.args[0]}", file=sys.stderr)
+        return 2
+    except Exception as e:
+        print(f"Error loading network: {str(e)}", file=sys.stderr)
+        return 2
+    print(json.dumps({'devices': [device._asdict() for device in devices],
+                      'groups': [group._asdict() for group in groups],
+                      'ports': [port._asdict() for port in ports]}, indent=2))
+    if args.pcap:
+        packets = nmea_lan.capture(network, database, args.duration, args.seed)
+        try:
+            nmea_lan.write_pcap(packets, args.pcap, network)
+        except OSError as e:
+            print(f"Error writing capture: {str(e)}", file=sys.stderr)
+            return 2
+        print(f"{len(packets)} datagrams in {args.duration:g} s written to {args.pcap}",
+              file=sys.stderr)
+    return 1 if any(port.status == 'over' for port in ports) else 0
+
+def runSweep(args):
+    """Sweep mixes, update rates and links, print saturation rates and export the surface."""
+    import nmea_jobs
+    import nmea_sweep
+    database = loadCommandDatabase()
+    if database is None:
+        return 2
+    try:
+        spec = nmea_jobs.read_document(args.specfile)
+        sweep = nmea_sweep.Sweep(database, spec)
+    except KeyError as e:
+        print(f"Error loading sweep file: {e.args[0]}", file=sys.stderr)
+        return 2
+    except Exception as e:
+        print(f"Error loading sweep file: {str(e)}", file=sys.stderr)
+        return 2
+
+    thresholds = sweep.thresholds(args.limit)
+    pairs = sweep.num_mixes * len(sweep.models)
+    print(f"{sweep.num_mixes} mixes x {len(sweep.plans)} rate plans x "
+          f"{len(sweep.models)} links = {sweep.num_points} points")
+    print(f"\nDefault update rate reaching {sweep.ceiling:g}% and 100%:")
+    for entry in thresholds:
+        rates = [('over' if rate is None else 'any' if rate == float('inf') else f"{rate:.3g}Hz")
+                 for rate in (entry.ceiling_rate, entry.saturation_rate)]
+        print(f"  {entry.link:<14} {rates[0]:>9} {rates[1]:>9}  {','.join(entry.members)}")
+    if pairs > len(thresholds):
+        print(f"  ... {pairs - len(thresholds)} more")
+
+    if args.output:
+        try:
+            count = nmea_sweep.write_sweep(sweep, args.output, args.format, args.workers)
+        except (OSError, ValueError) as e:
+            print(f"Error writing sweep: {str(e)}", file=sys.stderr)
+            return 2
+        print(f"\n{count} points written to {args.output}")
+    return 0
+
+def estimateRisk(args):
+    """Print the Monte Carlo overload risk of every job in a job file."""
+    import nmea_jobs
+    import nmea_risk
+    try:
+        jobs = nmea_jobs.load_jobs(args.jobfile)
+    except Exception as e:
+        print(f"Error loading job file: {str(e)}", file=sys.stderr)
+        return 2
+    database = loadCommandDatabase()
+    if database is None:
+        return 2
+    status = 0
+    for index, job in enumerate(jobs):
+        name = job.get('name', f"job-{index + 1}")
+        try:
+            profile = nmea_link.profile_from_dict(job)
+            risk = nmea_risk.overload_risk(nmea_jobs.job_streams(database, job), database,
+                                           profile, int(args.trials), args.window,
+                                           args.null_rate, args.drift, args.shared_clock,
+                                           args.seed, args.workers)
+        except KeyError as e:
+            print(f"Error in {name}: {e.args[0]}", file=sys.stderr)
+            return 2
+        except (TypeError, ValueError) as e:
+            print(f"Error in {name}: {str(e)}", file=sys.stderr)
+            return 2
+        print(f"\n{name}: {nmea_link.describe(profile)}")
+        printRisk(risk)
+        if risk.overloads:
+            status = 1
+    return status
+
+def parseArgs(argv):
+    """Parse command line arguments for the non-interactive subcommands."""
+    import argparse
+    parser = argparse.ArgumentParser(
+        description="NMEA 0183 Bandwidth Calculator. Run without arguments for the interactive menu.")
+    # Handled by parseGlobalArgs; listed here for --help
+    nmea_metrics.add_arguments(parser)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help="evaluate a JSON/YAML job file of link configurations")
+    run.add_argument('jobfile', help="job file ('-' for stdin)")
+    run.add_argument('-o', '--output', help="write results to a file instead of stdout")
+    run.add_argument('-f', '--format', choices=['json', 'jsonl', 'csv'], default='json')
+    run.add_argument('-j', '--workers', type=int,
+                     help="worker processes (default: one per CPU)")
+    run.set_defaults(handler=runJobs)
+
+    solve = commands.add_parser('solve', help="pick the most valuable mix that fits a link")
+    solve.add_argument('specfile', help="JSON/YAML file with required/optional sentences")
+    solve.set_defaults(handler=solveMix)
+
+    network = commands.add_parser('network', help="port loads of a multiplexer network")
+    network.add_argument('topologyfile', help="JSON/YAML file with talkers, multiplexers, listeners and links")
+    network.set_defaults(handler=analyzeNetwork)
+
+    lan = commands.add_parser('lan', help="IEC 61162-450 UDP multicast network loads")
+    lan.add_argument('networkfile', help="JSON/YAML file with switches, links and devices")
+    lan.add_argument('--pcap', help="also write the traffic the model describes to a pcap file")
+    lan.add_argument('-d', '--duration', type=float, default=10.0,
+                     help="seconds of traffic to capture (default: 10)")
+    lan.add_argument('--seed', type=int, default=0, help="seed for the talkers' phases")
+    lan.set_defaults(handler=analyzeLan)
+
+    sweep = commands.add_parser('sweep', help="utilization over grids of mixes, rates and links")
+    sweep.add_argument('specfile', help="JSON/YAML sweep spec")
+    sweep.add_argument('-o', '--output', help="export every point to a .csv or .parquet file")
+    sweep.add_argument('-f', '--format', choices=['csv', 'parquet'],
+                       help="export format (default: from the file name)")
+    sweep.add_argument('-j', '--workers', type=int,
+                       help="worker processes for large sweeps (default: one per CPU)")
+    sweep.add_argument('-n', '--limit', type=int, default=40,
+                       help="mix and link pairs to print, lowest ceiling rate first (default: 40)")
+    sweep.set_defaults(handler=runSweep)
+
+    risk = commands.add_parser('risk', help="Monte Carlo chance of momentary overload of a job file's links")
+    risk.add_argument('jobfile', help="job file ('-' for stdin)")
+    risk.add_argument('-n', '--trials', type=float, default=1_000_000,
+                      help="windows to sample (default: 1e6)")
+    risk.add_argument('-w', '--window', type=float, default=1.0,
+                      help="window length in seconds (default: 1)")
+    risk.add_argument('--null-rate', type=float, default=0.05,
+                      help="chance that a field is null (default: 0.05)")
+    risk.add_argument('--drift', type=float, default=100.0,
+                      help="largest transmit clock error in ppm (default: 100)")
+    risk.add_argument('--shared-clock', action='store_true',
+                      help="all sentences come from one talker keeping their offsets")
+    risk.add_argument('--seed', type=int, default=0, help="seed for reproducible runs")
+    risk.add_argument('-j', '--workers', type=int,
+                      help="worker processes for large runs (default: one per CPU)")
+    risk.set_defaults(handler=estimateRisk)
+    return parser.parse_args(argv)
+
+def parseGlobalArgs(argv):
+    """Split off the options that apply with or without a subcommand."""
+    import argparse
+    parser = argparse.ArgumentParser(add_help=False)
+    nmea_metrics.add_arguments(parser)
+    return parser.parse_known_args(argv)
+
+def main(argv=None):
+    """Main program loop, or a single subcommand when arguments are given."""
+    if argv is None:
+        argv = sys.argv[1:]
+    options, argv = parseGlobalArgs(argv)
+    with nmea_metrics.session(options.profile, options.metrics):
+        if argv:
+            args = parseArgs(argv)
+            return args.handler(args)
+        return runMenu()
+
+def runMenu():
+    """Run the interactive menu until the user exits."""
     database = load_database()
     if not database:
         print("Error: Could not load NMEA sentence database")
         return
+    # Results of earlier sessions, for this database only
+    results = nmea_presets.ResultCache(database)
         
     while True:
         clear()
@@ -261,7 +806,8 @@ def main():
         if choice == '1':
             showSentenceDetails(database)
         elif choice == '2':
-            calculateBandwidth(database)
+            calculateBandwidth(database, results)
+            results.save()
         elif choice == '3':
             showHelp()
         elif choice == '4':
@@ -270,4 +816,4 @@ def main():
             input("Invalid choice. Press Enter to continue...")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -1,10 +1,195 @@
 #!/usr/bin/env python3
 
+import time
+# Startup is timed from here (--startup-time)
+STARTED = time.perf_counter()
+
 import tkinter as tk
 from tkinter import ttk
+from tkinter import font as tkfont
 import json
+import queue
+import threading
 from pathlib import Path
-from tkinter import colorchooser
+from tkinter import messagebox
+
+import nmea_database
+import nmea_link
+import nmea_metrics
+import nmea_presets
+import nmea_schedule
+import nmea_search
+
+# Rows moved per mouse wheel step
+WHEEL_ROWS = 3
+# Bandwidth label color for each nmea_schedule.status_of
+STATUS_COLORS = {'ok': 'green', 'high': 'orange', 'over': 'red'}
+# Milliseconds between checks for the database from the loader thread
+LOAD_POLL_MS = 20
+
+class VirtualList:
+    """A Listbox that only holds the rows in view.
+
+    The items and the selection live here; the Listbox shows a window of
+    them that moves with the scrollbar, the mouse wheel and the arrow keys,
+    so filling or filtering the list costs the same for 80 sentences as
+    for 8000. Answers the Listbox calls the tabs use (curselection, get,
+    selection_set, selection_clear, activate, see) with indexes into the
+    whole list. A label function, given an index, returns the text and
+    color (or None) to show for a row instead of the item itself; it is
+    only called for the rows in view.
+    """
+
+    def __init__(self, parent, selectmode='single', height=15, label=None, **options):
+        self.items = []
+        self.label = label
+        self.selected = set()
+        self.active = 0
+        self.top = 0
+        self.rows = height
+        self.selectmode = selectmode
+        self.callbacks = []
+        self.listbox = tk.Listbox(parent, height=height, selectmode=selectmode,
+                                  exportselection=False, **options)
+        self.scrollbar = ttk.Scrollbar(parent, orient="vertical", command=self.yview)
+        self.listbox.bind('<<ListboxSelect>>', self.on_select)
+        self.listbox.bind('<Configure>', self.on_resize)
+        self.listbox.bind('<MouseWheel>', self.on_wheel)
+        self.listbox.bind('<Button-4>', lambda event: self.scroll(-WHEEL_ROWS))
+        self.listbox.bind('<Button-5>', lambda event: self.scroll(WHEEL_ROWS))
+        self.listbox.bind('<Up>', lambda event: self.move_active(-1))
+        self.listbox.bind('<Down>', lambda event: self.move_active(1))
+        self.listbox.bind('<Prior>', lambda event: self.move_active(-self.rows))
+        self.listbox.bind('<Next>', lambda event: self.move_active(self.rows))
+
+    def pack(self):
+        self.listbox.pack(side='left', fill='both')
+        self.scrollbar.pack(side='right', fill='y')
+
+    def bind(self, sequence, callback):
+        """Call callback after the selection changes (<<ListboxSelect>>)"""
+        if sequence == '<<ListboxSelect>>':
+            self.callbacks.append(callback)
+        else:
+            self.listbox.bind(sequence, callback)
+
+    def set_items(self, items):
+        """Replace the items, clearing the selection"""
+        self.items = list(items)
+        self.selected = set()
+        self.active = 0
+        self.top = 0
+        self.render()
+
+    def size(self):
+        return len(self.items)
+
+    def get(self, index):
+        if index == tk.ACTIVE:
+            index = self.active
+        return self.items[index] if 0 <= index < len(self.items) else ''
+
+    def curselection(self):
+        return tuple(sorted(self.selected))
+
+    def selection_set(self, index):
+        if self.selectmode in ('single', 'browse'):
+            self.selected = {index}
+        else:
+            self.selected.add(index)
+        self.render()
+
+    def selection_clear(self, first=0, last=tk.END):
+        self.selected = set()
+        self.render()
+
+    def activate(self, index):
+        self.active = index
+        self.render()
+
+    def see(self, index):
+        if index < self.top:
+            self.scroll_to(index)
+        elif index >= self.top + self.rows:
+            self.scroll_to(index - self.rows + 1)
+
+    def yview(self, *args):
+        """Scrollbar command: ('moveto', fraction) or ('scroll', n, 'units'/'pages')"""
+        if args[0] == 'moveto':
+            self.scroll_to(int(round(float(args[1]) * len(self.items))))
+        elif args[0] == 'scroll':
+            count = int(args[1])
+            self.scroll(count * self.rows if args[2] == 'pages' else count)
+
+    def scroll(self, count):
+        self.scroll_to(self.top + count)
+        return 'break'
+
+    def scroll_to(self, top):
+        top = max(0, min(top, len(self.items) - self.rows))
+        if top != self.top:
+            self.top = top
+            self.render()
+
+    def move_active(self, count):
+        if self.items:
+            self.active = max(0, min(self.active + count, len(self.items) - 1))
+            self.see(self.active)
+            self.render()
+        return 'break'
+
+    @nmea_metrics.instrumented('gui.list_render')
+    def render(self):
+        """Show the rows in view with their selection and the scrollbar position"""
+        visible = self.items[self.top:self.top + self.rows]
+        self.listbox.delete(0, tk.END)
+        if visible and self.label:
+            labels = [self.label(index) for index in range(self.top, self.top + len(visible))]
+            self.listbox.insert(tk.END, *(text for text, _ in labels))
+            for row, (_, color) in enumerate(labels):
+                if color:
+                    self.listbox.itemconfig(row, foreground=color)
+        elif visible:
+            self.listbox.insert(tk.END, *visible)
+        for row in range(len(visible)):
+            if self.top + row in self.selected:
+                self.listbox.selection_set(row)
+        if self.top <= self.active < self.top + len(visible):
+            self.listbox.activate(self.active - self.top)
+        if self.items:
+            self.scrollbar.set(self.top / len(self.items),
+                               min(1.0, (self.top + self.rows) / len(self.items)))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def on_select(self, event=None):
+        """Carry a click in the window over to the whole selection"""
+        shown = {self.top + row for row in self.listbox.curselection()}
+        if self.selectmode in ('single', 'browse'):
+            if shown:
+                self.selected = shown
+        else:
+            window = range(self.top, self.top + self.rows)
+            self.selected = {index for index in self.selected if index not in window} | shown
+        active = self.listbox.index(tk.ACTIVE)
+        if active < len(self.items) - self.top:
+            self.active = self.top + active
+        for callback in self.callbacks:
+            callback(event)
+
+    def on_resize(self, event):
+        """Show as many rows as fit in the new height"""
+        line = (tkfont.Font(font=self.listbox['font']).metrics('linespace') + 1
+                + 2 * int(self.listbox['selectborderwidth']))
+        border = 2 * (int(self.listbox['borderwidth']) + int(self.listbox['highlightthickness']))
+        rows = max(1, (event.height - border) // line)
+        if rows != self.rows:
+            self.rows = rows
+            self.top = max(0, min(self.top, len(self.items) - rows))
+            self.render()
+
+    def on_wheel(self, event):
+        return self.scroll(-WHEEL_ROWS if event.delta > 0 else WHEEL_ROWS)
 
 class NMEA0183Toolkit:
     def __init__(self, master):
@@ -22,40 +207,109 @@ class NMEA0183Toolkit:
         # Create File menu
         self.file_menu = tk.Menu(self.menubar, tearoff=0)
         self.menubar.add_cascade(label="File", menu=self.file_menu)
+        self.file_menu.add_command(label="Load Measured Profile...",
+                                   command=self.load_length_profile)
+        self.file_menu.add_command(label="Use Template Lengths",
+                                   command=self.clear_length_profile)
+        self.file_menu.add_separator()
         self.file_menu.add_command(label="Exit", command=self.master.quit)
         
+        # Create Presets menu, listing the saved mixes once the tabs exist
+        self.presets_menu = tk.Menu(self.menubar, tearoff=0)
+        self.menubar.add_cascade(label="Presets", menu=self.presets_menu)
+        
         # Create Help menu
         self.help_menu = tk.Menu(self.menubar, tearoff=0)
         self.menubar.add_cascade(label="Help", menu=self.help_menu)
         self.help_menu.add_command(label="Show Help", command=self.show_help)
         
-        # Load the database
-        self.load_database()
+        # Load the database on a worker thread while the window is built;
+        # it is handed back through a queue and picked up by poll_database
+        self.database = {}
+        self.database_ready = False
+        self.ready_callbacks = []  # Called once the database is in the lists
+        self.loaded = queue.Queue()
+        threading.Thread(target=self.load_database, daemon=True).start()
+        self.length_profile = {}  # Measured lengths from a log profile
         
         # Create notebook for tabs
         self.notebook = ttk.Notebook(master)
         self.notebook.pack(expand=True, fill='both', padx=5, pady=5)
         
-        # Create tabs
+        # Create tabs; the calculator is only built when first opened
         self.info_frame = ttk.Frame(self.notebook)
         self.calc_frame = ttk.Frame(self.notebook)
+        self.calc_built = False
         
         self.notebook.add(self.info_frame, text="Sentence Information")
         self.notebook.add(self.calc_frame, text="Bandwidth Calculator")
+        self.notebook.bind('<<NotebookTabChanged>>', self.on_tab_changed)
         
         self.create_info_tab()
-        self.create_calc_tab()
+        self.build_presets_menu()
+        self.master.after(LOAD_POLL_MS, self.poll_database)
         
     def load_database(self):
-        """Load NMEA sentence database from JSON"""
+        """Load NMEA sentence database from the compiled cache of the JSON file.
+        Runs on the loader thread, so it only touches the queue, never Tk."""
         try:
             db_path = Path(__file__).parent / 'nmea_sentences.json'
-            with open(db_path, 'r') as f:
-                data = json.load(f)
-            self.database = data['sentences']
+            # Vendor and project catalogs from the config, else NMEA_CATALOGS
+            database = nmea_database.load_database(db_path, self.config.get('catalogs'))
         except Exception as e:
             print(f"Error loading database: {str(e)}")
-            self.database = {}
+            database = {}
+        self.loaded.put(database)
+
+    def poll_database(self):
+        """Fill the lists once the loader thread has queued the database"""
+        try:
+            database = self.loaded.get_nowait()
+        except queue.Empty:
+            self.master.after(LOAD_POLL_MS, self.poll_database)
+            return
+        self.database = database
+        self.database_ready = True
+        self.info_text.delete('1.0', tk.END)
+        # Shows the whole list, or the matches of a search typed while loading
+        self.filter_info_list()
+        if self.calc_built:
+            self.fill_calc_list()
+        for callback in self.ready_callbacks:
+            callback()
+
+    def on_tab_changed(self, event=None):
+        """Build the calculator tab the first time it is opened"""
+        if self.notebook.select() == str(self.calc_frame):
+            self.ensure_calc_tab()
+
+    def ensure_calc_tab(self):
+        if not self.calc_built:
+            self.calc_built = True
+            self.create_calc_tab()
+
+    def load_length_profile(self):
+        """Size sentences from a profile written by nmea_logstats.py"""
+        from tkinter import filedialog
+        path = filedialog.askopenfilename(title="Load Measured Profile",
+                                          filetypes=[("JSON files", "*.json"),
+                                                     ("All files", "*")])
+        if not path:
+            return
+        try:
+            import nmea_logstats
+            self.length_profile = nmea_logstats.load_profile(path).profile('mean')
+        except Exception as e:
+            tk.messagebox.showerror("Error", f"Could not load profile: {str(e)}")
+            return
+        if self.calc_built:
+            self.rebuild_load()
+
+    def clear_length_profile(self):
+        """Go back to sizing sentences from their templates"""
+        self.length_profile = {}
+        if self.calc_built:
+            self.rebuild_load()
 
     def load_config(self):
         """Load configuration from JSON file"""
@@ -111,19 +365,19 @@ class NMEA0183Toolkit:
         ttk.Button(control_frame, text="Background",
                    command=self.change_bg_color).pack(side='left', padx=2)
         
-        # Create sentence listbox
-        self.info_list = tk.Listbox(left_frame, width=10, height=15,
-                                   font=('Verdana', 18),
-                                   bg='black', fg='yellow',
-                                   selectmode='single',
-                                   selectbackground='yellow',
-                                   selectforeground='black')
-        scrollbar = ttk.Scrollbar(left_frame, orient="vertical",
-                                command=self.info_list.yview)
-        self.info_list.configure(yscrollcommand=scrollbar.set)
+        # Search box; the list shows the ranked matches as you type
+        self.info_search = tk.StringVar()
+        ttk.Entry(left_frame, textvariable=self.info_search, width=10,
+                  font=('Verdana', 14)).pack(side='top', fill='x', pady=(0, 5))
         
-        self.info_list.pack(side='left', fill='both')
-        scrollbar.pack(side='right', fill='y')
+        # Create sentence list, rendering only the rows in view
+        self.info_list = VirtualList(left_frame, width=10, height=15,
+                                     font=('Verdana', 18),
+                                     bg='black', fg='yellow',
+                                     selectmode='single',
+                                     selectbackground='yellow',
+                                     selectforeground='black')
+        self.info_list.pack()
         
         # Create info display with configured settings
         self.info_text = tk.Text(right_frame, wrap=tk.WORD,
@@ -132,18 +386,34 @@ class NMEA0183Toolkit:
                                 fg=self.config['text_color'])
         self.info_text.pack(fill='both', expand=True)
         
-        # Populate listbox
-        for sentence in sorted(self.database.keys()):
-            self.info_list.insert(tk.END, sentence)
+        # The list is filled when the database arrives; details are
+        # rendered once per sentence and kept
+        self.info_blocks = {}
+        self.info_shown = None
+        self.info_text.insert('1.0', "Loading sentence database...")
         
-        # Bind selection event
+        # Bind selection and search events
         self.info_list.bind('<<ListboxSelect>>', self.show_sentence_info)
+        self.info_search.trace_add('write', self.filter_info_list)
 
     def create_calc_tab(self):
         """Create the Bandwidth Calculator tab"""
         # Initialize calculator variables
         self.baud_rate = tk.StringVar(value="4800")
+        self.framing = tk.StringVar(value=nmea_link.DEFAULT_FRAMING)
         self.update_rate = tk.StringVar(value="1")
+        self.sentence_rate = tk.StringVar(value="Default")
+        self.sentence_rates = {}  # Per-sentence rate overrides in Hz
+        
+        # Running totals of the selection, updated per changed sentence
+        self.load = nmea_schedule.RunningLoad()
+        self.calc_selected = set()
+        self.redraw_pending = None
+        self.displayed = None
+        # What each sentence would add at the current link and rates, and the
+        # selection's expected utilization the annotations are shown against
+        self.costs = None
+        self.costs_total = 0.0
         
         # Create frames
         left_frame = ttk.Frame(self.calc_frame)
@@ -152,19 +422,21 @@ class NMEA0183Toolkit:
         right_frame = ttk.Frame(self.calc_frame)
         right_frame.pack(side='left', fill='both', expand=True, padx=5, pady=5)
         
-        # Create sentence listbox
-        self.calc_list = tk.Listbox(left_frame, width=10, height=15,
-                                   font=('Verdana', 18),
-                                   bg='black', fg='yellow',
-                                   selectmode='multiple',
-                                   selectbackground='yellow',
-                                   selectforeground='black')
-        scrollbar = ttk.Scrollbar(left_frame, orient="vertical",
-                                command=self.calc_list.yview)
-        self.calc_list.configure(yscrollcommand=scrollbar.set)
-        
-        self.calc_list.pack(side='left', fill='both')
-        scrollbar.pack(side='right', fill='y')
+        # Search box: jumps to the best match, Return selects it
+        self.calc_search = tk.StringVar()
+        search_entry = ttk.Entry(left_frame, textvariable=self.calc_search, width=10,
+                                 font=('Verdana', 14))
+        search_entry.pack(side='top', fill='x', pady=(0, 5))
+        
+        # Create sentence listbox, each row showing what the sentence costs
+        self.calc_list = VirtualList(left_frame, width=14, height=15,
+                                     label=self.calc_label,
+                                     font=('Verdana', 18),
+                                     bg='black', fg='yellow',
+                                     selectmode='multiple',
+                                     selectbackground='yellow',
+                                     selectforeground='black')
+        self.calc_list.pack()
         
         # Create controls
         controls_frame = ttk.Frame(right_frame)
@@ -173,11 +445,17 @@ class NMEA0183Toolkit:
         # Baud rate selection
         ttk.Label(controls_frame, text="Baud Rate:",
                  font=('Verdana', 16)).pack(side='left', padx=10)
+        # Editable so any baud rate can be typed in
         baud_combo = ttk.Combobox(controls_frame, textvariable=self.baud_rate,
-                                 values=["4800", "38400"],
-                                 state='readonly', width=10,
+                                 values=[str(baud) for baud in nmea_link.COMMON_BAUDS],
+                                 width=10,
                                  font=('Verdana', 16))
         baud_combo.pack(side='left', padx=10)
+        framing_combo = ttk.Combobox(controls_frame, textvariable=self.framing,
+                                    values=list(nmea_link.COMMON_FRAMINGS),
+                                    state='readonly', width=5,
+                                    font=('Verdana', 16))
+        framing_combo.pack(side='left', padx=10)
         
         # Update rate selection
         ttk.Label(controls_frame, text="Update Rate:",
@@ -193,6 +471,24 @@ class NMEA0183Toolkit:
                                  command=self.reset_calculator)
         reset_button.pack(side='left', padx=20)
         
+        # Per-sentence update rate, applied to the active list entry
+        rate_frame = ttk.Frame(right_frame)
+        rate_frame.pack(fill='x')
+        
+        ttk.Label(rate_frame, text="Sentence Rate:",
+                 font=('Verdana', 16)).pack(side='left', padx=10)
+        rate_combo = ttk.Combobox(rate_frame, textvariable=self.sentence_rate,
+                                 values=["Default", "5", "2", "1", "0.5",
+                                         "0.2", "0.1", "0.05"],
+                                 state='readonly', width=10,
+                                 font=('Verdana', 16))
+        rate_combo.pack(side='left', padx=10)
+        ttk.Button(rate_frame, text="Apply to Active",
+                  command=self.apply_sentence_rate).pack(side='left', padx=20)
+        
+        self.rates_label = ttk.Label(rate_frame, text="", font=('Verdana', 12))
+        self.rates_label.pack(side='left', padx=10)
+        
         # Progress bar and labels
         progress_frame = ttk.Frame(right_frame)
         progress_frame.pack(fill='x', pady=20)
@@ -205,15 +501,101 @@ class NMEA0183Toolkit:
                                       mode='determinate')
         self.progress.pack(fill='x', padx=5, pady=10)
         
-        # Populate listbox
-        for sentence in sorted(self.database.keys()):
-            self.calc_list.insert(tk.END, sentence)
+        self.range_label = ttk.Label(progress_frame, text="",
+                                    font=('Verdana', 14))
+        self.range_label.pack()
+        
+        # Populate listbox (empty until the database has loaded)
+        self.fill_calc_list()
         
         # Bind events
-        self.calc_list.bind('<<ListboxSelect>>', self.update_bandwidth)
+        self.calc_list.bind('<<ListboxSelect>>', self.on_calc_select)
+        self.calc_search.trace_add('write', self.find_calc_sentence)
+        search_entry.bind('<Return>', self.select_found_sentence)
         baud_combo.bind('<<ComboboxSelected>>', self.update_bandwidth)
+        baud_combo.bind('<Return>', self.update_bandwidth)
+        baud_combo.bind('<FocusOut>', self.update_bandwidth)
+        framing_combo.bind('<<ComboboxSelected>>', self.update_bandwidth)
         update_combo.bind('<<ComboboxSelected>>', self.update_bandwidth)
 
+    def fill_calc_list(self):
+        """List the database's sentences in the calculator"""
+        self.calc_ids = sorted(self.database.keys())
+        self.calc_index = {ID: i for i, ID in enumerate(self.calc_ids)}
+        self.costs = None
+        if self.calc_ids:
+            import nmea_engine
+            lengths = [self.sentence_lengths(ID)[1] for ID in self.calc_ids]
+            self.costs = nmea_engine.MarginalCosts(self.calc_ids, lengths, 4800)
+            for ID, rate in self.sentence_rates.items():
+                self.costs.set_rate(ID, rate)
+            self.sync_costs()
+        self.calc_list.set_items(self.calc_ids)
+
+    def calc_label(self, index):
+        """Show a sentence with the utilization it adds, or adds already when
+        selected, in the color of the status adding it would give"""
+        sentence_id = self.calc_list.items[index]
+        if self.costs is None:
+            return sentence_id, None
+        cost = self.costs.costs[index]
+        if index in self.calc_selected:
+            return f"{sentence_id:<6}{cost:6.1f}%", None
+        status = nmea_schedule.status_of(self.costs_total + cost)
+        return f"{sentence_id:<6}{cost:+6.1f}%", (None if status == 'ok'
+                                                  else STATUS_COLORS[status])
+
+    def sync_costs(self):
+        """Bring the costs up to the link and default rate on screen; returns
+        False when the baud rate cannot be read"""
+        try:
+            link = nmea_link.make_profile(self.baud_rate.get(), self.framing.get())
+        except ValueError:
+            return False
+        if self.costs.model.profile != link:
+            self.costs.set_link(link)
+        default_rate = 1 / float(self.update_rate.get())
+        if self.costs.default_rate != default_rate:
+            self.costs.set_default_rate(default_rate)
+        return True
+
+    @nmea_metrics.instrumented('gui.filter')
+    def filter_info_list(self, *args):
+        """Show the sentences matching the search box, best first"""
+        if not self.database_ready:
+            return
+        query = self.info_search.get().strip()
+        if query:
+            matches = nmea_search.search(self.database, query, limit=None)
+            ids = [match.id for match in matches]
+        else:
+            ids = sorted(self.database.keys())
+        self.info_list.set_items(ids)
+        if ids and query:
+            self.info_list.selection_set(0)
+            self.show_sentence_info()
+
+    def find_calc_sentence(self, *args):
+        """Activate and scroll to the best match for the search box"""
+        if not self.database_ready:
+            return
+        matches = nmea_search.search(self.database, self.calc_search.get(), limit=1)
+        if matches:
+            index = self.calc_index[matches[0].id]
+            self.calc_list.activate(index)
+            self.calc_list.see(index)
+
+    def select_found_sentence(self, event=None):
+        """Add the best match for the search box to the selection"""
+        if not self.database_ready:
+            return
+        matches = nmea_search.search(self.database, self.calc_search.get(), limit=1)
+        if matches:
+            self.calc_list.selection_set(self.calc_index[matches[0].id])
+            self.on_calc_select()
+            self.calc_search.set("")
+
+    @nmea_metrics.instrumented('gui.sentence_info')
     def show_sentence_info(self, event=None):
         """Display information about the selected sentence"""
         selection = self.info_list.curselection()
@@ -221,95 +603,272 @@ class NMEA0183Toolkit:
             return
         
         sentence_id = self.info_list.get(selection[0])
+        if sentence_id == self.info_shown:
+            return
         try:
-            sentence = self.database[sentence_id]
-            
-            # Clear previous info
-            self.info_text.delete('1.0', tk.END)
-            
-            # Build and display sentence information
-            info = []
-            info.append(f"{sentence_id} is {len(sentence['sentence_structure'])} bytes long")
-            info.append(f"\nDescription: {sentence['sentence_name']}")
-            
-            # Sentence structure - moved up after description
-            info.append("\nSentence Structure:")
-            info.append(f"  {sentence['sentence_structure']}")
-            
-            # Field information
-            info.append(f"\nNumber of Fields: {sentence['num_fields']}")
-            info.append("\nField Details:")
-            for i, (name, length) in enumerate(zip(sentence['field_names'], 
-                                                 sentence['chars_per_field'])):
-                info.append(f"  Field {i+1}: {name}, {length}")
-            
-            # Standard and version information - moved to bottom
-            info.append("\nStandard Information:")
-            if sentence['standard'] == 'N':
-                info.append("  Standard: NMEA 0183")
-                if sentence['version']['nmea']:
-                    info.append(f"  First Version: {sentence['version']['nmea'][0]}")
-                    if sentence['version']['nmea'][1]:
-                        info.append(f"  Current Version: {sentence['version']['nmea'][1]}")
-            elif sentence['standard'] == 'I':
-                info.append("  Standard: IEC 61162-1")
-                if sentence['version']['iec']:
-                    info.append(f"  Current Version: {sentence['version']['iec']}")
-            elif sentence['standard'] == 'B':
-                info.append("  Standards: NMEA 0183 and IEC 61162-1")
-                if sentence['version']['nmea']:
-                    info.append(f"  First NMEA Version: {sentence['version']['nmea'][0]}")
-                    info.append(f"  Current NMEA Version: {sentence['version']['nmea'][1]}")
-                if sentence['version']['iec']:
-                    info.append(f"  Current IEC Version: {sentence['version']['iec']}")
-            
-            self.info_text.insert('1.0', "\n".join(info))
-            
+            text = self.info_blocks.get(sentence_id)
+            if text is None:
+                text = self.info_blocks[sentence_id] = self.sentence_info(sentence_id)
         except Exception as e:
-            self.info_text.delete('1.0', tk.END)
-            self.info_text.insert('1.0', f"Error displaying information for {sentence_id}: {str(e)}")
+            text = f"Error displaying information for {sentence_id}: {str(e)}"
+        self.info_text.delete('1.0', tk.END)
+        self.info_text.insert('1.0', text)
+        self.info_shown = sentence_id
+
+    @nmea_metrics.instrumented('gui.sentence_render')
+    def sentence_info(self, sentence_id):
+        """Render the details text of a sentence"""
+        sentence = self.database[sentence_id]
+        info = []
+        minimum, typical, maximum = self.database.wire_lengths(sentence_id)
+        info.append(f"{sentence_id} is {typical} bytes long on the wire "
+                    f"({minimum} to {maximum} bytes)")
+        info.append(f"\nDescription: {sentence['sentence_name']}")
+
+        # Sentence structure - moved up after description
+        info.append("\nSentence Structure:")
+        info.append(f"  {sentence['sentence_structure']}")
+
+        # Field information
+        info.append(f"\nNumber of Fields: {sentence['num_fields']}")
+        info.append("\nField Details:")
+        for i, (name, length) in enumerate(zip(sentence['field_names'], 
+                                             sentence['chars_per_field'])):
+            info.append(f"  Field {i+1}: {name}, {length}")
+
+        # Standard and version information - moved to bottom
+        info.append("\nStandard Information:")
+        if sentence['standard'] == 'N':
+            info.append("  Standard: NMEA 0183")
+            if sentence['version']['nmea']:
+                info.append(f"  First Version: {sentence['version']['nmea'][0]}")
+                if sentence['version']['nmea'][1]:
+                    info.append(f"  Current Version: {sentence['version']['nmea'][1]}")
+        elif sentence['standard'] == 'I':
+            info.append("  Standard: IEC 61162-1")
+            if sentence['version']['iec']:
+                info.append(f"  Current Version: {sentence['version']['iec']}")
+        elif sentence['standard'] == 'B':
+            info.append("  Standards: NMEA 0183 and IEC 61162-1")
+            if sentence['version']['nmea']:
+                info.append(f"  First NMEA Version: {sentence['version']['nmea'][0]}")
+                info.append(f"  Current NMEA Version: {sentence['version']['nmea'][1]}")
+            if sentence['version']['iec']:
+                info.append(f"  Current IEC Version: {sentence['version']['iec']}")
+        elif sentence['standard'] == 'P':
+            info.append("  Standard: Proprietary")
+        if len(getattr(self.database, 'catalogs', ())) > 1:
+            catalog = self.database.catalog_of(sentence_id)
+            info.append(f"  Catalog: {catalog['name']} {catalog.get('version', '')}".rstrip())
+
+        return "\n".join(info)
+
+    def sentence_lengths(self, sentence_id):
+        """Return (min, typical, max) bytes, with measured lengths as typical"""
+        minimum, typical, maximum = self.database.wire_lengths(sentence_id)
+        return minimum, self.length_profile.get(sentence_id) or typical, maximum
+
+    @nmea_metrics.instrumented('gui.select')
+    def on_calc_select(self, event=None):
+        """Apply only the selection changes to the running totals"""
+        current = set(self.calc_list.curselection())
+        for index in current - self.calc_selected:
+            sentence_id = self.calc_ids[index]
+            self.load.add(self.sentence_lengths(sentence_id),
+                          self.sentence_rates.get(sentence_id))
+        for index in self.calc_selected - current:
+            sentence_id = self.calc_ids[index]
+            self.load.remove(self.sentence_lengths(sentence_id),
+                             self.sentence_rates.get(sentence_id))
+        self.calc_selected = current
+        self.update_bandwidth()
+
+    def rebuild_load(self):
+        """Recompute the running totals from scratch, e.g. after new lengths"""
+        if self.costs is not None:
+            for index, sentence_id in enumerate(self.calc_ids):
+                length = self.sentence_lengths(sentence_id)[1]
+                if self.costs.lengths[index] != length:
+                    self.costs.set_length(sentence_id, length)
+        self.load.clear()
+        for index in self.calc_selected:
+            sentence_id = self.calc_ids[index]
+            self.load.add(self.sentence_lengths(sentence_id),
+                          self.sentence_rates.get(sentence_id))
+        self.update_bandwidth()
 
     def update_bandwidth(self, event=None):
-        """Calculate and display bandwidth usage"""
-        selections = self.calc_list.curselection()
-        if not selections:
+        """Schedule a redraw of the bandwidth display, coalescing bursts of events"""
+        if self.redraw_pending is None:
+            self.redraw_pending = self.master.after_idle(self.redraw_bandwidth)
+
+    @nmea_metrics.instrumented('gui.redraw')
+    def redraw_bandwidth(self):
+        """Display bandwidth usage from the running totals"""
+        self.redraw_pending = None
+        if not self.load.count:
+            state = None
+        else:
+            try:
+                link = nmea_link.make_profile(self.baud_rate.get(), self.framing.get())
+            except ValueError:
+                self.displayed = None
+                self.usage_label['text'] = "Invalid baud rate"
+                self.usage_label.configure(foreground='red')
+                return
+            default_rate = 1 / float(self.update_rate.get())
+            state = self.load.utilization(default_rate, link)
+        self.refresh_costs(state[1] if state else 0.0)
+        if state == self.displayed:
+            return
+        self.displayed = state
+        
+        if state is None:
             self.progress['value'] = 0
             self.usage_label['text'] = "Bandwidth Usage: 0%"
+            self.range_label['text'] = ""
             return
         
-        total_bytes = 0
-        for index in selections:
-            sentence_id = self.calc_list.get(index)
-            try:
-                structure = self.database[sentence_id]['sentence_structure']
-                total_bytes += len(structure)
-            except (KeyError, IndexError):
-                print(f"Error processing sentence {sentence_id}")
-        
-        baud = float(self.baud_rate.get())
-        update = float(self.update_rate.get())
-        
-        transmission_time = (total_bytes * 10) / baud
-        bandwidth = (transmission_time / update) * 100
-        
+        best, bandwidth, worst = state
         self.progress['value'] = min(bandwidth, 100)
         self.usage_label['text'] = f"Bandwidth Usage: {bandwidth:.1f}%"
+        self.range_label['text'] = f"Best case: {best:.1f}%   Worst case: {worst:.1f}%"
         
-        if bandwidth > 100:
-            self.usage_label.configure(foreground='red')
-        elif bandwidth > 80:
-            self.usage_label.configure(foreground='orange')
+        status = nmea_schedule.status_of(bandwidth)
+        self.usage_label.configure(foreground=STATUS_COLORS[status])
+
+    def refresh_costs(self, total):
+        """Re-annotate the rows in view for the current link, rates and
+        selection total"""
+        if self.costs is None or not self.sync_costs():
+            return
+        self.costs_total = total
+        self.calc_list.render()
+
+    def apply_sentence_rate(self):
+        """Give the active sentence its own update period, or clear it"""
+        sentence_id = self.calc_list.get(tk.ACTIVE)
+        if not sentence_id:
+            return
+        selected = self.calc_index[sentence_id] in self.calc_selected
+        if selected:
+            self.load.remove(self.sentence_lengths(sentence_id),
+                             self.sentence_rates.get(sentence_id))
+        period = self.sentence_rate.get()
+        if period == "Default":
+            self.sentence_rates.pop(sentence_id, None)
         else:
-            self.usage_label.configure(foreground='green')
+            self.sentence_rates[sentence_id] = 1 / float(period)
+        if self.costs is not None:
+            self.costs.set_rate(sentence_id, self.sentence_rates.get(sentence_id))
+        if selected:
+            self.load.add(self.sentence_lengths(sentence_id),
+                          self.sentence_rates.get(sentence_id))
+        self.show_sentence_rates()
+        self.update_bandwidth()
+
+    def show_sentence_rates(self):
+        self.rates_label['text'] = ", ".join(
+            f"{ID} {rate:g}Hz" for ID, rate in sorted(self.sentence_rates.items()))
 
     def reset_calculator(self):
         """Reset the bandwidth calculator to initial state"""
         self.calc_list.selection_clear(0, tk.END)
+        self.calc_selected = set()
+        self.load.clear()
+        self.displayed = None
         self.progress['value'] = 0
         self.usage_label['text'] = "Bandwidth Usage: 0%"
         self.usage_label.configure(foreground='black')  # Reset color
+        self.range_label['text'] = ""
         self.baud_rate.set("4800")  # Reset to default baud rate
+        self.framing.set(nmea_link.DEFAULT_FRAMING)
         self.update_rate.set("1")   # Reset to default update rate
+        self.sentence_rate.set("Default")
+        if self.costs is not None:
+            for sentence_id in self.sentence_rates:
+                self.costs.set_rate(sentence_id)
+        self.sentence_rates.clear()
+        self.rates_label['text'] = ""
+        self.update_bandwidth()
+
+    def build_presets_menu(self):
+        """List the saved presets under the Presets menu"""
+        self.presets_menu.delete(0, tk.END)
+        self.presets_menu.add_command(label="Save Mix as Preset...", command=self.save_preset)
+        self.presets_menu.add_command(label="Delete Preset...", command=self.delete_preset)
+        try:
+            presets = nmea_presets.load_presets()
+        except Exception as e:
+            print(f"Error loading presets: {str(e)}")
+            presets = {}
+        if presets:
+            self.presets_menu.add_separator()
+        for name in presets:
+            self.presets_menu.add_command(label=name,
+                                          command=lambda name=name: self.load_preset(name))
+
+    def save_preset(self):
+        """Save the selected sentences, their rates and the link under a name"""
+        from tkinter import simpledialog
+        if not self.calc_built or not self.calc_selected:
+            messagebox.showinfo("Save Preset", "Select the sentences of the mix first")
+            return
+        name = simpledialog.askstring("Save Preset", "Preset name:", parent=self.master)
+        if not name or not name.strip():
+            return
+        mix = [(self.calc_ids[index], self.sentence_rates.get(self.calc_ids[index]))
+               for index in sorted(self.calc_selected)]
+        try:
+            link = nmea_link.make_profile(self.baud_rate.get(), self.framing.get())
+            preset = nmea_presets.make_preset(mix, 1 / float(self.update_rate.get()), link)
+            nmea_presets.save_preset(name.strip(), preset)
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not save preset: {str(e)}")
+            return
+        self.build_presets_menu()
+
+    def delete_preset(self):
+        """Remove a saved preset by name"""
+        from tkinter import simpledialog
+        name = simpledialog.askstring("Delete Preset", "Preset name:", parent=self.master)
+        if not name:
+            return
+        try:
+            if not nmea_presets.delete_preset(name.strip()):
+                messagebox.showerror("Error", f"No preset named '{name.strip()}'")
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not delete preset: {str(e)}")
+        self.build_presets_menu()
+
+    def load_preset(self, name):
+        """Select a saved mix and set its rates and link in the calculator"""
+        if not self.database_ready:
+            messagebox.showinfo("Load Preset", "The sentence database is still loading")
+            return
+        self.ensure_calc_tab()
+        try:
+            link, rate, mix = nmea_presets.preset_mix(nmea_presets.load_presets()[name])
+            for ID, _ in mix:
+                if ID not in self.calc_index:
+                    raise ValueError(f"Sentence ID '{ID}' not found in database")
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not load preset: {str(e)}")
+            return
+        self.reset_calculator()
+        self.baud_rate.set(str(link.baud))
+        self.framing.set(nmea_link.framing_of(link))
+        self.update_rate.set(f"{1 / rate:g}")
+        for ID, own_rate in mix:
+            if own_rate:
+                self.sentence_rates[ID] = own_rate
+                if self.costs is not None:
+                    self.costs.set_rate(ID, own_rate)
+            self.calc_list.selection_set(self.calc_index[ID])
+        self.calc_selected = set(self.calc_list.curselection())
+        self.show_sentence_rates()
+        self.rebuild_load()
+        self.notebook.select(self.calc_frame)
 
     def increase_font(self):
         """Increase the font size of the info display"""
@@ -335,6 +894,7 @@ class NMEA0183Toolkit:
 
     def change_text_color(self):
         """Change the text color of the info display"""
+        from tkinter import colorchooser
         color = colorchooser.askcolor(title="Choose Text Color")
         if color[1]:  # color is ((r,g,b), hex_code)
             self.info_text.configure(fg=color[1])
@@ -343,6 +903,7 @@ class NMEA0183Toolkit:
 
     def change_bg_color(self):
         """Change the background color of the info display"""
+        from tkinter import colorchooser
         color = colorchooser.askcolor(title="Choose Background Color")
         if color[1]:  # color is ((r,g,b), hex_code)
             self.info_text.configure(bg=color[1])
@@ -387,9 +948,42 @@ class NMEA0183Toolkit:
         except Exception as e:
             tk.messagebox.showerror("Error", f"Could not load help file: {str(e)}")
 
-def main():
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="NMEA 0183 Bandwidth Calculator (GUI)")
+    nmea_metrics.add_arguments(parser)
+    parser.add_argument('--startup-time', action='store_true',
+                        help="print the time to the first paint and to the loaded database, then exit")
+    args = parser.parse_args(argv)
+    with nmea_metrics.session(args.profile, args.metrics):
+        run_gui(args.startup_time)
+
+def report_startup(root, app):
+    """Print seconds from the start of this module to the window's first
+    paint and to the database being listed, then close the window"""
+    times = {}
+
+    def record(name):
+        if name not in times:
+            times[name] = time.perf_counter() - STARTED
+        if len(times) == 2:
+            print(f"first paint {times['paint']:.3f} s, database listed {times['ready']:.3f} s "
+                  f"({len(app.database)} sentences)", flush=True)
+            root.after_idle(root.destroy)
+
+    def painted(event):
+        if event.widget is root:
+            root.update_idletasks()
+            record('paint')
+
+    root.bind('<Map>', painted)
+    app.ready_callbacks.append(lambda: record('ready'))
+
+def run_gui(startup_time=False):
     root = tk.Tk()
     app = NMEA0183Toolkit(root)
+    if startup_time:
+        report_startup(root, app)
     
     # Center the window on screen
     # Get screen width and height
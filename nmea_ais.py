@@ -0,0 +1,189 @@
+"""AIS load model: !AIVDM/!AIVDO traffic from the targets in range.
+
+An AIS transponder's interface carries every message received over VHF as
+one or more !AIVDM sentences (own-ship reports as !AIVDO). The load
+therefore depends on how many targets are in range, their class, and how
+often each reports, not on a sentence template:
+
+    class A    position report (message 1/2/3, 168 bits) every 2 s to 3 min
+               by speed and course change; static and voyage data
+               (message 5, 424 bits) every 6 min
+    class B    position report (message 18, 168 bits) every 30 s moving,
+               3 min stationary; static data (message 24 parts A and B,
+               160 and 168 bits) every 6 min
+    stations   base station report (message 4, 168 bits) every 10 s, aid to
+               navigation report (message 21, 272 bits) every 3 min
+
+A message's bits are armoured six to a character and split into
+fragments of at most MAX_PAYLOAD characters, so message 1 is one 49 byte
+sentence and message 5 two, of 82 and 33 bytes.
+
+Rates are computed with NumPy and broadcast: scenario_rates() takes
+target counts, class A shares and intervals as scalars or arrays (a grid
+of harbor scenarios in one call), target_rates() takes one class and
+interval per target (random_targets() draws a harbor population), and
+load() turns either into sentences and bytes per second and link
+utilization. streams() gives the VDM/VDO streams of a scenario for the
+calculators, and an "ais" entry in a job adds them to its mix (see
+nmea_jobs).
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+import nmea_link
+import nmea_metrics
+import nmea_schedule
+
+# Armoured payload characters per fragment that keep a sentence within 82 bytes
+MAX_PAYLOAD = 60
+# !AIVDM,1,1,,A,<payload>,0*hh<CR><LF>; fragments of longer messages add a sequential message ID
+SINGLE_OVERHEAD = 21
+MULTI_OVERHEAD = 22
+
+# Reporting intervals in seconds (ITU-R M.1371)
+CLASS_A_INTERVAL = 10.0
+CLASS_B_INTERVAL = 30.0
+STATIC_INTERVAL = 360.0
+BASE_STATION_INTERVAL = 10.0
+ATON_INTERVAL = 180.0
+OWN_SHIP_INTERVAL = 1.0
+
+# Navigational states in a harbor: (share of the class, position reporting interval)
+HARBOR_STATES = {
+    'A': [(0.55, 180.0),      # at anchor or moored
+          (0.30, 10.0),       # 0-14 knots
+          (0.07, 10.0 / 3),   # 0-14 knots, changing course
+          (0.06, 6.0),        # 14-23 knots
+          (0.02, 2.0)],       # over 23 knots
+    'B': [(0.70, 180.0),      # under 2 knots
+          (0.30, 30.0)],      # moving
+}
+
+Message = namedtuple('Message', ['type', 'name', 'bits'])
+Message.__doc__ = """An AIS message: its number, a description and its length in bits."""
+
+POSITION_A = Message(1, 'Class A position report', 168)
+STATIC_A = Message(5, 'Class A static and voyage data', 424)
+POSITION_B = Message(18, 'Class B position report', 168)
+STATIC_B_PART_A = Message(24, 'Class B static data, part A', 160)
+STATIC_B_PART_B = Message(24, 'Class B static data, part B', 168)
+BASE_STATION = Message(4, 'Base station report', 168)
+ATON = Message(21, 'Aid to navigation report', 272)
+
+AisLoad = namedtuple('AisLoad', ['messages', 'sentences', 'bytes_per_second', 'utilization'])
+AisLoad.__doc__ = """AIS traffic per second: messages, sentences (fragments) and bytes, and
+utilization of the link in percent (None without a link). Each is a float,
+or an array shaped like the scenario arguments."""
+
+def fragment_lengths(bits, max_payload=MAX_PAYLOAD):
+    """Return the on-the-wire lengths of the sentences carrying a message of bits."""
+    chars = -(-bits // 6)
+    count = -(-chars // max_payload)
+    if count == 1:
+        return [SINGLE_OVERHEAD + chars]
+    last = chars - max_payload * (count - 1)
+    return [MULTI_OVERHEAD + max_payload] * (count - 1) + [MULTI_OVERHEAD + last]
+
+def scenario_rates(targets, class_a=1.0, class_a_interval=CLASS_A_INTERVAL,
+                   class_b_interval=CLASS_B_INTERVAL, static_interval=STATIC_INTERVAL,
+                   base_stations=0, aids=0):
+    """Return {Message: rate in Hz} for targets in range, class_a of them class A.
+
+    Every argument may be an array; the rates broadcast over them.
+    """
+    targets = np.asarray(targets, dtype=np.float64)
+    class_a = np.asarray(class_a, dtype=np.float64)
+    if np.any(targets < 0) or np.any((class_a < 0) | (class_a > 1)):
+        raise ValueError("Target counts cannot be negative and class_a is a share from 0 to 1")
+    for interval in (class_a_interval, class_b_interval, static_interval):
+        if np.any(np.asarray(interval) <= 0):
+            raise ValueError("Reporting intervals must be positive")
+    a = targets * class_a
+    b = targets - a
+    return {POSITION_A: a / class_a_interval, STATIC_A: a / static_interval,
+            POSITION_B: b / class_b_interval, STATIC_B_PART_A: b / static_interval,
+            STATIC_B_PART_B: b / static_interval,
+            BASE_STATION: np.asarray(base_stations, dtype=np.float64) / BASE_STATION_INTERVAL,
+            ATON: np.asarray(aids, dtype=np.float64) / ATON_INTERVAL}
+
+def target_rates(class_a, intervals, static_interval=STATIC_INTERVAL):
+    """Return {Message: rate in Hz} for one class (True for A) and position
+    reporting interval in seconds per target."""
+    class_a = np.asarray(class_a, dtype=bool)
+    rates = 1.0 / np.asarray(intervals, dtype=np.float64)
+    count_a = np.count_nonzero(class_a)
+    count_b = class_a.size - count_a
+    total = rates.sum()
+    rate_a = rates @ class_a
+    return {POSITION_A: rate_a, STATIC_A: count_a / static_interval,
+            POSITION_B: total - rate_a, STATIC_B_PART_A: count_b / static_interval,
+            STATIC_B_PART_B: count_b / static_interval}
+
+def random_targets(count, class_a=0.5, states=HARBOR_STATES, seed=0):
+    """Draw (class A flags, position reporting intervals) for count targets."""
+    rng = np.random.default_rng(seed)
+    is_a = rng.random(count) < class_a
+    intervals = np.empty(count)
+    for flag, name in ((True, 'A'), (False, 'B')):
+        shares, values = zip(*states[name])
+        chosen = is_a == flag
+        intervals[chosen] = rng.choice(values, size=np.count_nonzero(chosen),
+                                       p=np.asarray(shares) / sum(shares))
+    return is_a, intervals
+
+@nmea_metrics.instrumented('ais.load')
+def load(rates, link=None):
+    """Return the AisLoad of {Message: rate}, with utilization when a link is given."""
+    model = None if link is None else nmea_link.link_model(link)
+    messages = sentences = size = busy = 0.0
+    for message, rate in rates.items():
+        lengths = fragment_lengths(message.bits)
+        messages = messages + rate
+        sentences = sentences + rate * len(lengths)
+        size = size + rate * sum(lengths)
+        if model is not None:
+            busy = busy + rate * sum(model.airtime(length) for length in lengths)
+    if model is None:
+        return AisLoad(_plain(messages), _plain(sentences), _plain(size), None)
+    return AisLoad(_plain(messages), _plain(sentences), _plain(size), _plain(busy * 100))
+
+def _plain(value):
+    """Return a float for a single scenario, the array otherwise."""
+    return float(value) if np.ndim(value) == 0 else value
+
+def streams(rates, ID='VDM', own_ship_interval=None):
+    """Return the streams of a scenario's rates, one per sentence length.
+
+    own_ship_interval adds the own vessel's class A reports as VDO.
+    """
+    totals = {}
+    sources = [(ID, rates)]
+    if own_ship_interval:
+        sources.append(('VDO', {POSITION_A: 1.0 / own_ship_interval,
+                                STATIC_A: 1.0 / STATIC_INTERVAL}))
+    for sentence, table in sources:
+        for message, rate in table.items():
+            rate = float(np.sum(rate))
+            for length in fragment_lengths(message.bits):
+                totals[sentence, length] = totals.get((sentence, length), 0.0) + rate
+    return [nmea_schedule.Stream(sentence, length, rate)
+            for (sentence, length), rate in sorted(totals.items()) if rate > 0]
+
+def job_streams(spec):
+    """Return the streams of a job's "ais" entry:
+
+        {"targets": 400, "class_a": 0.6, "class_a_interval": 10, "class_b_interval": 30,
+         "static_interval": 360, "base_stations": 1, "aids": 5, "own_ship": 1}
+
+    Only targets is required; own_ship is the VDO reporting interval.
+    """
+    if not isinstance(spec, dict) or 'targets' not in spec:
+        raise ValueError("An AIS entry needs a target count")
+    rates = scenario_rates(float(spec['targets']), float(spec.get('class_a', 1.0)),
+                           float(spec.get('class_a_interval', CLASS_A_INTERVAL)),
+                           float(spec.get('class_b_interval', CLASS_B_INTERVAL)),
+                           float(spec.get('static_interval', STATIC_INTERVAL)),
+                           float(spec.get('base_stations', 0)), float(spec.get('aids', 0)))
+    return streams(rates, own_ship_interval=spec.get('own_ship'))
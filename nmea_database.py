@@ -0,0 +1,385 @@
+"""Compiled, memory-mapped form of the NMEA sentence database.
+
+The first load of nmea_sentences.json writes a binary cache next to it (in
+__pycache__) holding fixed-width columns for the numbers the calculators
+need on every lookup, a string-interned ID index and the raw JSON of each
+record. Later loads only map that file and read a small header, so startup
+does not pay for json.load of the whole catalog. Full records are decoded
+on first access. The search index over IDs, descriptions and field names
+(nmea_search) is built at the same time and stored after the records.
+
+The cache is rebuilt automatically when the JSON's mtime or size changes
+and its SHA-256 no longer matches the one recorded in the cache.
+
+Catalogs can be layered on top of the standard one: vendor files with
+proprietary $P... sentences and per-project overrides, in the same
+{"metadata": ..., "sentences": ...} format. Each layer adds sentences and
+patches earlier ones key by key (a null record removes a sentence); the
+result is compiled into one cache per combination of files, so a cached
+combination is only mapped, and a stale one only re-reads its files. A
+catalog is named by path, or by name for catalogs/NAME.json, in the
+catalogs argument or the NMEA_CATALOGS environment variable (separated by
+os.pathsep). Each row records the catalog that defined it and the first and
+current NMEA release of its sentence, so select() filters by catalog,
+standard or release from the columns alone.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from collections.abc import Mapping
+from pathlib import Path
+
+import nmea_fields
+import nmea_metrics
+import nmea_search
+
+DEFAULT_PATH = Path(__file__).parent / 'nmea_sentences.json'
+CATALOG_DIR = Path(__file__).parent / 'catalogs'
+CATALOGS_ENV = 'NMEA_CATALOGS'
+
+MAGIC = b'NMEADB\x00\x01'
+FORMAT_VERSION = 4
+# magic, format version, byte order, source file count, record count,
+# metadata JSON length
+HEADER = struct.Struct('=8sHcHII')
+# Per source file, after the header: mtime_ns, size, sha256
+SOURCE = struct.Struct('=qQ32s')
+BYTE_ORDER = b'L' if sys.byteorder == 'little' else b'B'
+
+# Fixed-width uint32 columns, stored in this order after the metadata.
+# catalog is the layer that defined a sentence; nmea_first and nmea_current
+# are its NMEA releases times 100 (2.30 -> 230), 0 when unknown.
+COLUMNS = ('lengths', 'total_chars', 'num_fields',
+           'min_lengths', 'typical_lengths', 'max_lengths',
+           'catalog', 'nmea_first', 'nmea_current')
+
+# Keys a sentence must have when a catalog first defines it
+REQUIRED_KEYS = ('sentence_name', 'sentence_structure', 'field_names', 'chars_per_field')
+
+STANDARDS = {'nmea': 'NB', 'iec': 'IB'}
+
+def cache_path_for(json_path, catalogs=()):
+    """Return the cache file used for a JSON database and its catalog layers."""
+    json_path = Path(json_path)
+    name = json_path.name
+    if catalogs:
+        key = '\0'.join(str(Path(path).resolve()) for path in catalogs)
+        name += '+' + hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+    return json_path.parent / '__pycache__' / (name + '.nmeadb')
+
+def resolve_catalog(name):
+    """Return the path of a catalog given by path or by name (catalogs/NAME.json)."""
+    path = Path(name)
+    if path.suffix or len(path.parts) > 1:
+        return path
+    return CATALOG_DIR / f"{name}.json"
+
+def env_catalogs():
+    """Return the catalogs named in NMEA_CATALOGS."""
+    value = os.environ.get(CATALOGS_ENV, '')
+    return [name for name in value.split(os.pathsep) if name]
+
+def release_number(version):
+    """Return an NMEA release as an integer: '2.30' -> 230, None or junk -> 0."""
+    try:
+        return int(round(float(version) * 100))
+    except (TypeError, ValueError):
+        return 0
+
+def _digest(data):
+    return hashlib.sha256(data).digest()
+
+def database_digest(database):
+    """Return a digest identifying the contents of a database: the
+    SentenceTable's own, or the SHA-256 of a plain dict's JSON."""
+    digest = getattr(database, 'digest', None)
+    if digest:
+        return digest
+    text = json.dumps(dict(database), sort_keys=True)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+class SentenceTable(Mapping):
+    """Read-only mapping of sentence ID to record backed by a compiled cache.
+
+    Behaves like the dict that json.load used to return (so existing
+    database[ID]['field'] code keeps working) but also exposes per-column
+    arrays indexed by row: lengths (len of sentence_structure),
+    total_chars, num_fields, standard and the min/typical/max on-the-wire
+    lengths from nmea_fields, the catalog each row came from and its
+    NMEA releases. ids is sorted and index maps each ID to its row.
+    search() ranks IDs for a free-text query using the stored index.
+    """
+
+    def __init__(self, buffer, source=None):
+        self.source = source
+        self._buffer = buffer
+        view = memoryview(buffer)
+        _, _, _, num_sources, count, meta_len = HEADER.unpack_from(view, 0)
+        offset = HEADER.size
+        self.sources = [SOURCE.unpack_from(view, offset + i * SOURCE.size)
+                        for i in range(num_sources)]
+        offset += num_sources * SOURCE.size
+        self.metadata = json.loads(bytes(view[offset:offset + meta_len]))
+        offset += meta_len + (-(offset + meta_len) % 4)
+
+        for name in COLUMNS:
+            setattr(self, name, view[offset:offset + 4 * count].cast('I'))
+            offset += 4 * count
+        self._id_offsets = view[offset:offset + 4 * (count + 1)].cast('I')
+        offset += 4 * (count + 1)
+        self._record_offsets = view[offset:offset + 4 * (count + 1)].cast('I')
+        offset += 4 * (count + 1)
+        self.standard = bytes(view[offset:offset + count]).decode('ascii')
+        offset += count
+
+        ids_end = offset + self._id_offsets[count]
+        id_blob = bytes(view[offset:ids_end]).decode('ascii')
+        self.ids = tuple(sys.intern(id_blob[self._id_offsets[i]:self._id_offsets[i + 1]])
+                         for i in range(count))
+        self.index = {ID: i for i, ID in enumerate(self.ids)}
+        self._records_start = ids_end
+        self._view = view
+        self._records = {}
+        self._search_index = None
+        self.catalogs = self.metadata.get('catalogs', [])
+
+    def __getitem__(self, ID):
+        try:
+            return self._records[ID]
+        except KeyError:
+            pass
+        row = self.index[ID]
+        start = self._records_start + self._record_offsets[row]
+        end = self._records_start + self._record_offsets[row + 1]
+        record = json.loads(bytes(self._view[start:end]))
+        self._records[ID] = record
+        return record
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, ID):
+        return ID in self.index
+
+    def length(self, ID):
+        """Return the byte length of a sentence without decoding its record."""
+        return self.lengths[self.index[ID]]
+
+    @nmea_metrics.instrumented('database.lookup')
+    def wire_lengths(self, ID):
+        """Return (min, typical, max) bytes on the wire for a sentence."""
+        row = self.index[ID]
+        return self.min_lengths[row], self.typical_lengths[row], self.max_lengths[row]
+
+    @property
+    def digest(self):
+        """Hex SHA-256 of the source files' digests: changes with any of their contents."""
+        combined = hashlib.sha256()
+        for _, _, digest in self.sources:
+            combined.update(digest)
+        return combined.hexdigest()
+
+    def catalog_of(self, ID):
+        """Return the metadata of the catalog that defined a sentence."""
+        return self.catalogs[self.catalog[self.index[ID]]]
+
+    @nmea_metrics.instrumented('database.select')
+    def select(self, standard=None, release=None, catalog=None):
+        """Return the IDs in a standard ('nmea' or 'iec'), defined by an NMEA
+        release (first release at or before it) or from a catalog (by name),
+        reading only the columns."""
+        rows = range(len(self.ids))
+        if standard is not None:
+            letters = STANDARDS[standard.lower()]
+            rows = [row for row in rows if self.standard[row] in letters]
+        if release is not None:
+            number = release_number(release)
+            first = self.nmea_first
+            rows = [row for row in rows if 0 < first[row] <= number]
+        if catalog is not None:
+            layers = {i for i, entry in enumerate(self.catalogs) if entry['name'] == catalog}
+            rows = [row for row in rows if self.catalog[row] in layers]
+        return [self.ids[row] for row in rows]
+
+    @property
+    def search_index(self):
+        """The nmea_search.SearchIndex stored after the records, loaded on first use."""
+        if self._search_index is None:
+            start = self._records_start + self._record_offsets[len(self.ids)]
+            data = json.loads(bytes(self._view[start:]))
+            self._search_index = nmea_search.SearchIndex(data)
+        return self._search_index
+
+    def search(self, query, limit=nmea_search.DEFAULT_LIMIT):
+        """Return up to limit nmea_search.Matches for a query, best first."""
+        return self.search_index.search(query, limit)
+
+@nmea_metrics.instrumented('database.compile')
+def compile_database(sentences, metadata=None, sources=(), origins=None):
+    """Serialize a sentences dict into the compiled cache format.
+
+    sources are the (mtime_ns, size, sha256) of the files it was read from,
+    and origins maps IDs to the catalog layer that defined them (default 0).
+    """
+    ids = sorted(sentences.keys())
+    count = len(ids)
+    meta_blob = json.dumps(metadata or {}).encode('utf-8')
+
+    columns = {name: [] for name in COLUMNS}
+    standard = bytearray()
+    id_blob = bytearray()
+    id_offsets = [0]
+    record_blob = bytearray()
+    record_offsets = [0]
+    for ID in ids:
+        sentence = sentences[ID]
+        columns['lengths'].append(len(sentence['sentence_structure']))
+        columns['total_chars'].append(sentence.get('total_chars', 0))
+        columns['num_fields'].append(sentence.get('num_fields', 0))
+        for name, value in zip(('min_lengths', 'typical_lengths', 'max_lengths'),
+                               nmea_fields.wire_lengths(sentence)):
+            columns[name].append(value)
+        columns['catalog'].append(origins.get(ID, 0) if origins else 0)
+        nmea = (sentence.get('version') or {}).get('nmea') or []
+        columns['nmea_first'].append(release_number(nmea[0] if nmea else None))
+        columns['nmea_current'].append(release_number(nmea[-1] if nmea else None))
+        standard += (sentence.get('standard') or '-')[:1].encode('ascii')
+        id_blob += ID.encode('ascii')
+        id_offsets.append(len(id_blob))
+        record_blob += json.dumps(sentence, separators=(',', ':')).encode('utf-8')
+        record_offsets.append(len(record_blob))
+
+    start = HEADER.size + SOURCE.size * len(sources)
+    parts = [HEADER.pack(MAGIC, FORMAT_VERSION, BYTE_ORDER, len(sources), count,
+                         len(meta_blob))]
+    parts += [SOURCE.pack(*source) for source in sources]
+    parts += [meta_blob,
+              # Keep the uint32 columns 4-byte aligned
+              b'\x00' * (-(start + len(meta_blob)) % 4)]
+    for name in COLUMNS:
+        parts.append(struct.pack(f'={count}I', *columns[name]))
+    parts.append(struct.pack(f'={count + 1}I', *id_offsets))
+    parts.append(struct.pack(f'={count + 1}I', *record_offsets))
+    parts.append(bytes(standard))
+    parts.append(bytes(id_blob))
+    parts.append(bytes(record_blob))
+    parts.append(json.dumps(nmea_search.build_index(sentences),
+                            separators=(',', ':')).encode('ascii'))
+    return b''.join(parts)
+
+def merge_catalogs(documents, names=None):
+    """Layer catalog documents, the first being the base.
+
+    Returns (sentences, metadata, origins), origins being the layer that
+    defined each sentence. A later layer adds sentences and overrides
+    earlier ones key by key; a null record removes one.
+    metadata is the base's, with a 'catalogs' list of each layer's
+    metadata, name and file.
+    """
+    sentences = {}
+    origins = {}
+    catalogs = []
+    names = names or [f"layer{i}" for i in range(len(documents))]
+    for layer, (name, document) in enumerate(zip(names, documents)):
+        info = dict(document.get('metadata') or {})
+        info.setdefault('name', Path(str(name)).stem)
+        info['file'] = str(name)
+        catalogs.append(info)
+        for ID, record in (document.get('sentences') or {}).items():
+            if record is None:
+                sentences.pop(ID, None)
+                origins.pop(ID, None)
+                continue
+            if ID in sentences:
+                record = {**sentences[ID], **record}
+            else:
+                missing = [key for key in REQUIRED_KEYS if key not in record]
+                if missing:
+                    raise ValueError(f"{name}: sentence {ID} is missing {', '.join(missing)}")
+                origins[ID] = layer
+            sentences[ID] = record
+    metadata = dict(documents[0].get('metadata') or {}) if documents else {}
+    metadata['catalogs'] = catalogs
+    return sentences, metadata, origins
+
+def _read_sources(buffer):
+    """Return the recorded (mtime_ns, size, sha256) of each source, or None."""
+    if len(buffer) < HEADER.size:
+        return None
+    header = HEADER.unpack_from(buffer, 0)
+    if header[0] != MAGIC or header[1] != FORMAT_VERSION or header[2] != BYTE_ORDER:
+        return None
+    if len(buffer) < HEADER.size + header[3] * SOURCE.size:
+        return None
+    return [SOURCE.unpack_from(buffer, HEADER.size + i * SOURCE.size)
+            for i in range(header[3])]
+
+def _write_cache(cache_path, data):
+    """Atomically replace the cache file; failures leave the old one alone."""
+    try:
+        cache_path.parent.mkdir(exist_ok=True)
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass
+
+def _map(cache_path):
+    with open(cache_path, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+@nmea_metrics.instrumented('database.load')
+def load_database(path=DEFAULT_PATH, catalogs=None):
+    """Return a SentenceTable for a JSON database and its catalog layers,
+    compiling them if needed. catalogs defaults to NMEA_CATALOGS."""
+    if catalogs is None:
+        catalogs = env_catalogs()
+    paths = [Path(path)] + [resolve_catalog(name) for name in catalogs]
+    cache_path = cache_path_for(path, paths[1:])
+    stamps = []
+    for source in paths:
+        st = os.stat(source)
+        stamps.append((st.st_mtime_ns, st.st_size))
+
+    try:
+        buffer = _map(cache_path)
+    except (OSError, ValueError):
+        buffer = None
+
+    raws = {}
+    if buffer is not None:
+        recorded = _read_sources(buffer)
+        if recorded and len(recorded) == len(paths):
+            changed = [i for i, stamp in enumerate(stamps) if recorded[i][:2] != stamp]
+            if not changed:
+                return SentenceTable(buffer, source=path)
+            # Touched but possibly unchanged (checkout, copy): compare content
+            for i in changed:
+                raws[i] = paths[i].read_bytes()
+            if all(_digest(raws[i]) == recorded[i][2] for i in changed):
+                data = bytearray(buffer)
+                for i in changed:
+                    SOURCE.pack_into(data, HEADER.size + i * SOURCE.size,
+                                     *stamps[i], recorded[i][2])
+                buffer.close()
+                _write_cache(cache_path, bytes(data))
+                return SentenceTable(bytes(data), source=path)
+        buffer.close()
+
+    for i, source in enumerate(paths):
+        if i not in raws:
+            raws[i] = source.read_bytes()
+    documents = [json.loads(raws[i]) for i in range(len(paths))]
+    sentences, metadata, origins = merge_catalogs(documents, [str(p) for p in paths])
+    sources = [(*stamps[i], _digest(raws[i])) for i in range(len(paths))]
+    compiled = compile_database(sentences, metadata, sources, origins)
+    _write_cache(cache_path, compiled)
+    return SentenceTable(compiled, source=path)
@@ -0,0 +1,209 @@
+"""Headless batch bandwidth engine for NMEA 0183 links.
+
+Evaluates many sentence mixes at many per-sentence rates and baud rates in
+a single NumPy pass instead of one Python loop per mix:
+
+    from nmea_engine import load_lengths, utilization
+
+    ids, lengths = load_lengths()
+    mixes = np.zeros((2, len(ids)), dtype=bool)
+    mixes[0, ids.index('GGA')] = True
+    mixes[1, [ids.index('GGA'), ids.index('RMC')]] = True
+    rates = np.ones((1, len(ids)))          # 1 Hz for every sentence
+    usage = utilization(lengths, mixes, rates, [4800, 38400])
+    usage.shape                              # (2 mixes, 1 rate plan, 2 bauds)
+
+Utilization is returned as a percentage of link capacity, using the same
+link model as the calculators (nmea_link): a plain baud rate means 8N1,
+bytes * 10 bits / baud, per second, and a link profile such as '115200 7E1'
+adds its framing and overheads. Sentence lengths default to the typical
+on-the-wire size; load_lengths(bound='max') gives the worst case.
+
+MarginalCosts keeps what adding each sentence of a catalog would cost a
+link, and whether it still fits, for the calculators' candidate lists.
+"""
+
+import numpy as np
+
+import nmea_database
+import nmea_fields
+import nmea_link
+import nmea_metrics
+import nmea_schedule
+
+BITS_PER_BYTE = 10  # 8N1: start + 8 data + stop
+
+# Length bounds in the order nmea_fields.wire_lengths returns them
+BOUNDS = ('min', 'typical', 'max', 'template')
+
+def load_lengths(database=None, profile=None, bound='typical'):
+    """Return (ids, lengths) for every sentence in the database.
+
+    ids is a sorted list of sentence IDs and lengths a float64 array of the
+    byte length of each sentence, in the same order. When no database is
+    given, the compiled nmea_sentences.json next to this file is used.
+    bound picks the on-the-wire length from nmea_fields ('min', 'typical'
+    or 'max'), or 'template' for len(sentence_structure).
+    profile is an optional {ID: bytes} mapping, such as
+    LogStats.profile() from nmea_logstats, that overrides those lengths.
+    """
+    if bound not in BOUNDS:
+        raise ValueError(f"Unknown length bound: {bound}")
+    if database is None:
+        database = nmea_database.load_database()
+    if isinstance(database, nmea_database.SentenceTable):
+        ids = list(database.ids)
+        column = 'lengths' if bound == 'template' else f'{bound}_lengths'
+        lengths = np.array(getattr(database, column), dtype=np.float64)
+    else:
+        ids = sorted(database.keys())
+        if bound == 'template':
+            values = (len(database[ID]['sentence_structure']) for ID in ids)
+        else:
+            position = BOUNDS.index(bound)
+            values = (nmea_fields.wire_lengths(database[ID])[position] for ID in ids)
+        lengths = np.fromiter(values, dtype=np.float64, count=len(ids))
+    if profile:
+        for i, ID in enumerate(ids):
+            if ID in profile:
+                lengths[i] = profile[ID]
+    return ids, lengths
+
+def mix_matrix(ids, mixes):
+    """Build a (M, S) membership matrix from a list of sentence ID lists.
+
+    Repeating an ID in a mix counts it once per occurrence, the same way
+    adding it twice at the console prompt does.
+    """
+    index = {ID: i for i, ID in enumerate(ids)}
+    matrix = np.zeros((len(mixes), len(ids)), dtype=np.float64)
+    for row, mix in enumerate(mixes):
+        for ID in mix:
+            try:
+                matrix[row, index[ID]] += 1
+            except KeyError:
+                raise KeyError(f"Sentence ID '{ID}' not found in database") from None
+    return matrix
+
+@nmea_metrics.instrumented('engine.utilization')
+def utilization(lengths, mixes, rates, bauds, bits_per_byte=BITS_PER_BYTE):
+    """Return link utilization in percent for every mix x rate plan x baud.
+
+    lengths -- (S,) bytes per sentence
+    mixes   -- (M, S) count of each sentence in each mix (bool or numeric)
+    rates   -- (R, S) per-sentence update rate in Hz, (S,) for a single
+               plan, or a scalar rate applied to every sentence
+    bauds   -- (B,) baud rates or links (see nmea_link.link_model), or one
+
+    The result has shape (M, R, B). A scalar or 1-D rates argument still
+    yields an R axis of length 1 so callers can index uniformly.
+    """
+    lengths = np.asarray(lengths, dtype=np.float64)
+    mixes = np.atleast_2d(np.asarray(mixes, dtype=np.float64))
+    rates = np.asarray(rates, dtype=np.float64)
+    if rates.ndim == 0:
+        rates = np.full((1, lengths.shape[0]), float(rates))
+    rates = np.atleast_2d(rates)
+    if isinstance(bauds, nmea_link.LinkProfile) or not isinstance(bauds, (list, tuple, np.ndarray)):
+        bauds = [bauds]
+    models = [nmea_link.link_model(link, bits_per_byte) for link in bauds]
+
+    if mixes.shape[1] != lengths.shape[0] or rates.shape[1] != lengths.shape[0]:
+        raise ValueError("mixes and rates must have one column per sentence")
+
+    # Bytes per second for every (mix, rate plan) pair in one matrix product
+    bytes_per_second = (mixes * lengths) @ rates.T
+    if all(model.linear for model in models):
+        seconds_per_byte = np.array([model.seconds_per_byte for model in models])
+        return bytes_per_second[:, :, None] * seconds_per_byte[None, None, :] * 100
+
+    # Per-sentence overheads: one product per link with its airtime per sentence
+    usage = np.empty((mixes.shape[0], rates.shape[0], len(models)))
+    for b, model in enumerate(models):
+        if model.linear:
+            usage[:, :, b] = bytes_per_second * model.seconds_per_byte * 100
+        else:
+            usage[:, :, b] = (mixes * airtimes(lengths, model)) @ rates.T * 100
+    return usage
+
+def airtimes(lengths, link, bits_per_byte=BITS_PER_BYTE):
+    """Return the seconds sentences of lengths bytes keep a link busy, as
+    LinkModel.airtime does for one."""
+    model = nmea_link.link_model(link, bits_per_byte)
+    lengths = np.asarray(lengths, dtype=np.float64)
+    times = lengths * model.seconds_per_byte + model.profile.sentence_gap
+    depth = model.profile.fifo_depth
+    if depth and model.profile.refill_latency:
+        refills = np.maximum(0.0, np.ceil(lengths / depth) - 1)
+        times += refills * model.profile.refill_latency
+    return times
+
+class MarginalCosts:
+    """The utilization in percent each sentence of a catalog adds to a link.
+
+    costs[i] is what sentence ids[i] costs at its own rate, else the
+    default rate; the whole catalog is computed in one pass. A new link or
+    default rate recomputes the array, a sentence's own rate or length
+    updates its entry, and a change of selection only moves the total that
+    fits() and status() compare against.
+    """
+
+    def __init__(self, ids, lengths, link, default_rate=1.0):
+        self.ids = list(ids)
+        self.index = {ID: i for i, ID in enumerate(self.ids)}
+        self.lengths = np.array(lengths, dtype=np.float64)
+        self.own_rates = np.full(len(self.ids), np.nan)  # NaN: the default rate
+        self.default_rate = float(default_rate)
+        self.set_link(link)
+
+    @nmea_metrics.instrumented('engine.marginal')
+    def set_link(self, link):
+        self.model = nmea_link.link_model(link)
+        self.per_hz = airtimes(self.lengths, self.model) * 100
+        self.costs = self.per_hz * self.rates()
+
+    def rates(self):
+        """Return the update rate of every sentence in Hz."""
+        return np.where(np.isnan(self.own_rates), self.default_rate, self.own_rates)
+
+    def set_default_rate(self, rate):
+        self.default_rate = float(rate)
+        default = np.isnan(self.own_rates)
+        self.costs[default] = self.per_hz[default] * self.default_rate
+
+    def set_rate(self, ID, rate=None):
+        """Give a sentence its own rate in Hz, or None for the default."""
+        i = self.index[ID]
+        self.own_rates[i] = np.nan if rate is None else rate
+        self.costs[i] = self.per_hz[i] * (self.default_rate if rate is None else rate)
+
+    def set_length(self, ID, length):
+        i = self.index[ID]
+        self.lengths[i] = length
+        self.per_hz[i] = airtimes(self.lengths[i:i + 1], self.model)[0] * 100
+        self.costs[i] = self.per_hz[i] * self.rates()[i]
+
+    def cost(self, ID):
+        return float(self.costs[self.index[ID]])
+
+    def fits(self, total, limit=100.0):
+        """Return, per sentence, whether adding it to a mix at total percent
+        stays within limit."""
+        return total + self.costs <= limit
+
+    def status(self, ID, total):
+        """Return the nmea_schedule status of a mix at total percent with ID added."""
+        return nmea_schedule.status_of(total + self.cost(ID))
+
+@nmea_metrics.instrumented('engine.evaluate')
+def evaluate(database, mixes, rates, bauds, bits_per_byte=BITS_PER_BYTE, profile=None,
+             bound='typical'):
+    """Convenience wrapper taking sentence ID lists instead of matrices.
+
+    mixes is a list of sentence ID lists; rates, bauds, profile and bound
+    are as for utilization() and load_lengths(). Returns the (M, R, B)
+    array.
+    """
+    ids, lengths = load_lengths(database, profile, bound)
+    return utilization(lengths, mix_matrix(ids, mixes), rates, bauds,
+                       bits_per_byte=bits_per_byte)
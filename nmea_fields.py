@@ -0,0 +1,111 @@
+"""On-the-wire length model for NMEA 0183 sentences.
+
+Works out the smallest, typical and largest number of bytes a sentence can
+occupy on the wire from its sentence_structure and chars_per_field:
+
+    $ tt III , f1 , f2 ... * hh <CR> <LF>
+
+The frame (start character, two-letter talker ID, three-letter sentence ID,
+checksum and a real CR/LF) is always present. Every field can be null, so
+the minimum is the frame plus one comma per field. The typical length uses
+the database's chars_per_field. The maximum widens variable numbers (x.x)
+and fills variable text (c--c) and repeated groups (...) up to the 82
+character limit of NMEA 0183. length_distribution() gives the probability
+of every length in between, for sampling (see nmea_risk).
+"""
+
+import re
+
+# '$' through <CR><LF>
+MAX_SENTENCE_LENGTH = 82
+# '$', talker ID (2), sentence ID (3), '*hh', <CR><LF>
+FRAME_OVERHEAD = 1 + 2 + 3 + 3 + 2
+# Extra integer digits allowed in a variable-width number such as x.x
+VARIABLE_DIGITS = 5
+# Characters a variable-width number varies by around its typical width
+NUMBER_SPREAD = 1
+
+FIXED, NUMBER, TEXT, REPEAT = 'fixed', 'number', 'text', 'repeat'
+
+_NUMBER = re.compile(r'^-?[a-z]\.[a-z]+$')
+
+def field_formats(structure):
+    """Return the field format tokens of a sentence_structure string."""
+    body = structure.split('*')[0]
+    return [token.strip() for token in body.split(',')[1:]]
+
+def classify(token):
+    """Return FIXED, NUMBER, TEXT or REPEAT for a field format token."""
+    if '..' in token:
+        return REPEAT
+    if '--' in token:
+        return TEXT
+    if _NUMBER.match(token):
+        return NUMBER
+    return FIXED
+
+def wire_lengths(sentence):
+    """Return (min, typical, max) bytes on the wire for a database record."""
+    formats = field_formats(sentence['sentence_structure'])
+    widths = sentence.get('chars_per_field', [])
+    num_fields = max(len(formats), len(widths))
+    frame = FRAME_OVERHEAD + num_fields  # one comma before each field
+
+    typical = frame
+    largest = frame
+    fills = False
+    for i in range(num_fields):
+        token = formats[i] if i < len(formats) else ''
+        width = widths[i] if i < len(widths) else len(token)
+        typical += width
+        kind = classify(token)
+        if kind == NUMBER:
+            largest += max(width, len(token) + VARIABLE_DIGITS)
+        elif kind in (TEXT, REPEAT):
+            largest += width
+            fills = True
+        else:
+            largest += max(width, len(token))
+
+    if fills:
+        largest = MAX_SENTENCE_LENGTH
+    largest = max(typical, min(largest, MAX_SENTENCE_LENGTH))
+    return frame, typical, largest
+
+def _field_widths(kind, width):
+    """Return the equally likely widths of a non-null field."""
+    if kind == NUMBER:
+        return range(max(1, width - NUMBER_SPREAD), width + NUMBER_SPREAD + 1)
+    if kind in (TEXT, REPEAT):
+        return range(0, 2 * width + 1)
+    return (width,)
+
+def length_distribution(sentence, null_rate=0.0):
+    """Return [P(length = n) for n in 0..82] for a database record.
+
+    Each field is null with probability null_rate. Otherwise a fixed field
+    has its typical width, a variable number any width within NUMBER_SPREAD
+    of it and text or a repeated group any width from empty to twice the
+    typical one, all equally likely. Longer sentences count as 82 bytes.
+    """
+    formats = field_formats(sentence['sentence_structure'])
+    widths = sentence.get('chars_per_field', [])
+    num_fields = max(len(formats), len(widths))
+    top = MAX_SENTENCE_LENGTH
+    pmf = [0.0] * (top + 1)
+    pmf[min(top, FRAME_OVERHEAD + num_fields)] = 1.0
+    for i in range(num_fields):
+        token = formats[i] if i < len(formats) else ''
+        width = widths[i] if i < len(widths) else len(token)
+        choices = _field_widths(classify(token), width)
+        weights = {}
+        for choice in choices:
+            weights[choice] = weights.get(choice, 0.0) + (1 - null_rate) / len(choices)
+        weights[0] = weights.get(0, 0.0) + null_rate
+        step = [0.0] * (top + 1)
+        for length, p in enumerate(pmf):
+            if p:
+                for choice, weight in weights.items():
+                    step[min(top, length + choice)] += p * weight
+        pmf = step
+    return pmf
@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+"""Synthetic NMEA 0183 traffic for load testing listeners.
+
+    python nmea_generator.py GGA@10 RMC GSV@0.2 -b 4800 -o pty      paced, on a new PTY
+    python nmea_generator.py --job jobs.json -o udp:127.0.0.1:10110
+    python nmea_generator.py GGA@10 RMC -n 2G -o traffic.nmea        as fast as possible
+
+The mix is given like a batch job (see nmea_jobs): sentences with
+optional per-sentence rates, a default rate, and the link. Every sentence
+is built from its database record: each field is filled to its
+chars_per_field width in the shape of its sentence_structure token
+(digits, decimals, N/S and E/W, text), so the traffic has exactly the
+typical lengths the calculators assume and the monitor's measured and
+predicted utilization agree. Values a listener may range-check stay in
+range: positions have minutes below 60, dates are real dates, and fix
+quality, satellite counts and IDs and message numbers are plausible
+(FIELD_RANGES).
+
+Templates are compiled once per ID: a few pre-rendered variants, each
+split around the UTC time field (when the sentence has one) with the XOR
+of its fixed bytes worked out in advance. Emitting a sentence is then a
+join of three byte strings and one XOR, and sentences without a time
+field are copied whole, so offline generation runs orders of magnitude
+faster than real time.
+
+Transmissions are laid out on the line as nmea_schedule.simulate() does:
+released at their rates, in mix order at the same instant, and queued
+while the line is busy. Paced output writes each sentence when its last
+bit would leave the line at the link's baud rate and framing; unpaced
+output (the default for regular files) writes as fast as it can.
+"""
+
+import argparse
+import heapq
+import os
+import random
+import socket
+import stat
+import sys
+import time
+from datetime import datetime, timezone
+
+import nmea_database
+import nmea_fields
+import nmea_jobs
+import nmea_link
+import nmea_metrics
+
+DEFAULT_TALKER = 'GP'
+# Sentences only ever sent by one kind of talker
+TALKERS = {'VDM': 'AI', 'VDO': 'AI'}
+# Pre-rendered field contents per sentence ID
+VARIANTS = 8
+# Bytes gathered before each write when not paced
+WRITE_SIZE = 1 << 20
+
+_DIGITS = '0123456789'
+_HEX_DIGITS = '0123456789ABCDEF'
+_LETTERS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+_TRAILERS = [b'*%02X\r\n' % value for value in range(256)]
+
+def xor_of(data):
+    """Return the XOR of a byte string (the NMEA checksum of a body)."""
+    value = 0
+    for byte in data:
+        value ^= byte
+    return value
+
+def parse_size(text):
+    """Parse a byte count with an optional K, M or G suffix (powers of 1024)."""
+    text = str(text).strip().upper().rstrip('B')
+    scale = 1
+    if text[-1:] in ('K', 'M', 'G'):
+        scale = 1024 ** ('KMG'.index(text[-1]) + 1)
+        text = text[:-1]
+    size = int(float(text) * scale)
+    if size <= 0:
+        raise ValueError(f"Size must be positive: {text}")
+    return size
+
+# Integer fields whose values a listener may range-check: words of the
+# field name (lowercase) and the (low, high) values drawn. Sequence and
+# fragment numbers are 1 and totals at least 1, so a number never exceeds
+# its total. Checked in order, so "satellite id" comes before the counts.
+FIELD_RANGES = (
+    (('satellite id',), (1, 32)), (('prn',), (1, 32)),
+    (('used for fix',), (1, 32)),
+    (('quality',), (1, 2)),
+    (('satellites',), (4, 12)),
+    (('sentence number',), (1, 1)), (('message number',), (1, 1)),
+    (('seq',), (1, 1)), (('fragment number',), (1, 1)),
+    (('total',), (1, 3)),
+    (('elevation',), (5, 90)), (('azimuth',), (0, 359)),
+    (('day',), (1, 28)), (('month',), (1, 12)), (('year',), (2000, 2099)),
+)
+# Latitude and longitude tokens: digits of whole degrees and their limit
+POSITIONS = {'llll.ll': (2, 89), 'ddmm.mm': (2, 89), 'yyyyy.yy': (3, 179), 'dddmm.mm': (3, 179)}
+
+def _digits(rng, count):
+    return ''.join(rng.choice(_DIGITS) for _ in range(count))
+
+def _integer(rng, low, high, width):
+    """Return a value in low..high (as far as width allows), zero-padded to width."""
+    high = min(high, 10 ** width - 1)
+    return f"{rng.randint(min(low, high), high):0{width}d}"
+
+def _field_range(token, name):
+    """Return the (low, high) of an integer field, or None."""
+    if '.' in token or not token or set(token) - set('xn'):
+        return None
+    name = name.lower()
+    for words, limits in FIELD_RANGES:
+        if any(word in name for word in words):
+            return limits
+    return None
+
+def _fill(token, width, name, rng):
+    """Return a field value of width characters in the shape of its format
+    token, within a realistic range where a listener would check one."""
+    if width <= 0:
+        return ''
+    if token.isalpha() and token.isupper() and len(token) == width:
+        return token  # A fixed unit or status letter such as M, T or A
+    if token == 'a' and width == 1:
+        for pair in ('N/S', 'E/W'):
+            if pair in name:
+                return rng.choice(pair.split('/'))
+        return 'A'
+    kind = nmea_fields.classify(token)
+    if kind in (nmea_fields.TEXT, nmea_fields.REPEAT) or token[:1] in ('a', 'c'):
+        return ''.join(rng.choice(_LETTERS) for _ in range(width))
+    if token and set(token) == {'h'}:
+        return ''.join(rng.choice(_HEX_DIGITS) for _ in range(width))
+    position = POSITIONS.get(token)
+    if position and width >= position[0] + 2:
+        # Degrees, minutes below 60, then any fraction of a minute
+        degrees, limit = position
+        text = _integer(rng, 0, limit, degrees) + _integer(rng, 0, 59, 2)
+        if width >= degrees + 4:
+            text += '.' + _digits(rng, width - degrees - 3)
+        return text.ljust(width, '0')
+    if width == 6 and name.lower().startswith('date'):
+        # ddmmyy
+        return _integer(rng, 1, 28, 2) + _integer(rng, 1, 12, 2) + _integer(rng, 0, 99, 2)
+    limits = _field_range(token, name)
+    if limits:
+        return _integer(rng, limits[0], limits[1], width)
+    if '.' in token and width >= 3:
+        decimals = min(len(token.rsplit('.', 1)[1]) or 1, width - 2)
+        whole = width - decimals - 1
+        return _digits(rng, whole) + '.' + _digits(rng, decimals)
+    return _digits(rng, width)
+
+def clock_text(seconds, width):
+    """Return a UTC time of day as hhmmss.ss cut or extended to width characters."""
+    hundredths = int(round(seconds * 100)) % 8_640_000
+    whole, fraction = divmod(hundredths, 100)
+    hours, rest = divmod(whole, 3600)
+    text = f"{hours:02d}{rest // 60:02d}{rest % 60:02d}"
+    if width >= 8:
+        text += '.' + f"{fraction:02d}".ljust(width - 7, '0')
+    return text[:width]
+
+class Template:
+    """Pre-rendered variants of one sentence.
+
+    A sentence without a time field is kept whole in sentences. Otherwise
+    parts holds (head, tail, xor) per variant: the bytes before and after
+    the time field, and the XOR of both without the start character.
+    A length other than the typical one (a measured size, an AIS fragment)
+    is reached by widening or narrowing the last text field, else the last
+    field.
+    """
+
+    def __init__(self, ID, sentence, talker=DEFAULT_TALKER, variants=VARIANTS, rng=None,
+                 length=None):
+        rng = rng or random.Random(0)
+        structure = sentence['sentence_structure']
+        formats = nmea_fields.field_formats(structure)
+        widths = sentence.get('chars_per_field', [])
+        names = sentence.get('field_names', [])
+        count = max(len(formats), len(widths))
+        formats = formats + [''] * (count - len(formats))
+        widths = [widths[i] if i < len(widths) else len(formats[i]) for i in range(count)]
+        names = names + [''] * (count - len(names))
+
+        self.id = ID
+        start = structure[:1] if structure[:1] in ('$', '!') else '$'
+        address = structure[1:].split(',', 1)[0].replace('--', TALKERS.get(ID, talker))
+        if length is not None and count:
+            typical = 1 + len(address) + count + sum(widths) + 5
+            texts = [i for i, token in enumerate(formats)
+                     if nmea_fields.classify(token) in (nmea_fields.TEXT, nmea_fields.REPEAT)]
+            field = texts[-1] if texts else count - 1
+            widths[field] = max(0, widths[field] + length - typical)
+        self.time_field = next((i for i, token in enumerate(formats)
+                                if token.startswith('hhmmss') and widths[i]), None)
+        self.time_width = widths[self.time_field] if self.time_field is not None else 0
+        self.sentences = []
+        self.parts = []
+        for _ in range(variants):
+            values = [_fill(token, width, name, rng)
+                      for token, width, name in zip(formats, widths, names)]
+            if self.time_field is None:
+                body = ','.join([address] + values).encode('ascii')
+                self.sentences.append(start.encode('ascii') + body + _TRAILERS[xor_of(body)])
+            else:
+                head = ','.join([address] + values[:self.time_field]) + ','
+                tail = ''.join(',' + value for value in values[self.time_field + 1:])
+                head, tail = head.encode('ascii'), tail.encode('ascii')
+                self.parts.append((start.encode('ascii') + head, tail, xor_of(head + tail)))
+        # '$', the fields and their commas, '*hh' and CR/LF
+        self.length = 1 + len(address) + count + sum(widths) + 5
+
+    def render(self, variant, seconds):
+        """Return one sentence with its time field set to a UTC time of day."""
+        if self.time_field is None:
+            return self.sentences[variant % len(self.sentences)]
+        head, tail, xor = self.parts[variant % len(self.parts)]
+        stamp = clock_text(seconds, self.time_width).encode('ascii')
+        return head + stamp + tail + _TRAILERS[xor ^ xor_of(stamp)]
+
+def compile_templates(database, streams, talker=DEFAULT_TALKER, variants=VARIANTS, seed=0):
+    """Return {(ID, length): Template} for the streams of a mix."""
+    rng = random.Random(seed)
+    templates = {}
+    for stream in streams:
+        key = (stream.id, stream.length)
+        if key not in templates:
+            templates[key] = Template(stream.id, database[stream.id], talker, variants, rng,
+                                      stream.length)
+    return templates
+
+def traffic(streams, templates, link, clock=0.0):
+    """Yield (release, end, sentence bytes) for every transmission, forever.
+
+    release and end are seconds from the start: when the sentence was due
+    and when its last bit leaves the line. clock is the UTC time of day,
+    in seconds, that the time fields start from.
+    """
+    model = nmea_link.link_model(link)
+    entries = [(templates[stream.id, stream.length],
+                model.airtime(templates[stream.id, stream.length].length),
+                1.0 / stream.rate, stream.offset % (1.0 / stream.rate))
+               for stream in streams]
+    # (release time, mix order, transmission number)
+    heap = [(offset, index, 0) for index, (_, _, _, offset) in enumerate(entries)]
+    heapq.heapify(heap)
+    stamps = {}
+    stamp_key = None
+    free = 0.0
+    while heap:
+        release, index, number = heap[0]
+        template, airtime, period, offset = entries[index]
+        heapq.heapreplace(heap, (offset + (number + 1) * period, index, number + 1))
+        free = max(free, release) + airtime
+        if template.time_field is None:
+            data = template.sentences[number % len(template.sentences)]
+        else:
+            # Sentences released together share their time stamp
+            key = round(release * 100)
+            if key != stamp_key:
+                stamps.clear()
+                stamp_key = key
+            width = template.time_width
+            stamp = stamps.get(width)
+            if stamp is None:
+                text = clock_text(clock + release, width).encode('ascii')
+                stamp = stamps[width] = (text, xor_of(text))
+            head, tail, xor = template.parts[number % len(template.parts)]
+            data = head + stamp[0] + tail + _TRAILERS[xor ^ stamp[1]]
+        yield release, free, data
+
+@nmea_metrics.instrumented('generator.emit')
+def emit(transmissions, write, duration=None, size=None, pace=False):
+    """Write transmissions until duration seconds of traffic or size bytes.
+
+    write takes a list of sentences. Paced output writes each sentence
+    when it would finish on the line, counting from the call.
+    Returns (bytes, sentences, seconds of line time).
+    """
+    total = count = 0
+    finished = 0.0
+    batch = []
+    pending = 0
+    origin = time.perf_counter()
+    clock = time.perf_counter
+    for release, end, data in transmissions:
+        if duration is not None and release >= duration:
+            break
+        if pace:
+            delay = origin + end - clock()
+            if delay > 0:
+                if batch:
+                    write(batch)
+                    batch = []
+                time.sleep(delay)
+            # Sentences already due wait for the next sleep and go out together
+            batch.append(data)
+        else:
+            batch.append(data)
+            pending += len(data)
+            if pending >= WRITE_SIZE:
+                write(batch)
+                batch = []
+                pending = 0
+        total += len(data)
+        count += 1
+        finished = end
+        if size is not None and total >= size:
+            break
+    if batch:
+        write(batch)
+    return total, count, finished
+
+def _write_fd(fd, chunks):
+    view = memoryview(b''.join(chunks))
+    while view:
+        view = view[os.write(fd, view):]
+
+def is_live(target):
+    """Return whether an output is read as it is written (paced by default)."""
+    if target in ('-', 'pty') or target.startswith('udp:'):
+        return True
+    try:
+        return stat.S_ISCHR(os.stat(target).st_mode)
+    except OSError:
+        return False
+
+def open_sink(target, link=None):
+    """Open an output: '-', 'pty', 'udp:HOST:PORT', a serial device or a file.
+
+    A serial device is set to the link's baud rate and framing.
+
+    Returns (write, close), write taking a list of sentences.
+    """
+    if target == '-':
+        out = sys.stdout.buffer
+
+        def write(chunks):
+            out.write(b''.join(chunks))
+            out.flush()
+        return write, lambda: None
+    if target == 'pty':
+        import tty
+        master, slave = os.openpty()
+        tty.setraw(master)
+        tty.setraw(slave)
+        print(f"Writing to {os.ttyname(slave)}", file=sys.stderr, flush=True)
+
+        def close():
+            os.close(master)
+            os.close(slave)
+        return lambda chunks: _write_fd(master, chunks), close
+    if target.startswith('udp:'):
+        host, _, port = target[4:].rpartition(':')
+        address = (host or '127.0.0.1', int(port))
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+        def write(chunks):
+            # One sentence per datagram, as talkers on a network send them
+            for data in chunks:
+                sock.sendto(data, address)
+        return write, sock.close
+    fd = os.open(target, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_NOCTTY', 0),
+                 0o644)
+    if os.isatty(fd) and link:
+        from nmea_monitor import configure_serial
+        try:
+            configure_serial(fd, link)
+        except Exception:
+            os.close(fd)
+            raise
+    return lambda chunks: _write_fd(fd, chunks), lambda: os.close(fd)
+
+def utc_seconds():
+    """Return the current UTC time of day in seconds."""
+    now = datetime.now(timezone.utc)
+    return now.hour * 3600 + now.minute * 60 + now.second + now.microsecond / 1e6
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Generate checksummed synthetic NMEA traffic for a sentence mix")
+    parser.add_argument('sentences', nargs='*', help="sentence IDs with optional rates, e.g. GGA@10")
+    parser.add_argument('--job', metavar='FILE', help="take the mix and link from a job file")
+    parser.add_argument('--name', help="job to use from the job file (default: the first)")
+    parser.add_argument('-r', '--rate', type=float, default=1.0,
+                        help="update rate in Hz of sentences without their own")
+    parser.add_argument('-b', '--baud', type=int, default=4800, help="line baud rate")
+    parser.add_argument('-f', '--framing', default=nmea_link.DEFAULT_FRAMING,
+                        help="character framing, e.g. 8N1 or 7E1")
+    parser.add_argument('-t', '--talker', default=DEFAULT_TALKER, help="talker ID of the sentences")
+    parser.add_argument('-o', '--output', default='-',
+                        help="file, serial device, 'pty', 'udp:HOST:PORT' or '-' for stdout")
+    parser.add_argument('-d', '--duration', type=float, help="seconds of traffic to generate")
+    parser.add_argument('-n', '--size', type=parse_size,
+                        help="bytes to generate, e.g. 500M or 2G")
+    parser.add_argument('--pace', action=argparse.BooleanOptionalAction,
+                        help="write at the line rate (default: except for regular files)")
+    parser.add_argument('--seed', type=int, default=0, help="seed for the field contents")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.job:
+            jobs = nmea_jobs.load_jobs(args.job)
+            if args.name:
+                jobs = [job for job in jobs if job.get('name') == args.name]
+            if not jobs:
+                raise ValueError(f"No job {args.name or ''} in {args.job}".replace('  ', ' '))
+            job = jobs[0]
+        elif args.sentences:
+            job = {'sentences': args.sentences, 'rate': args.rate, 'baud': args.baud,
+                   'framing': args.framing}
+        else:
+            parser.error("give sentence IDs or --job")
+        database = nmea_database.load_database()
+        profile = nmea_link.profile_from_dict(job)
+        streams = nmea_jobs.job_streams(database, job)
+        if not streams:
+            raise ValueError("No sentences to generate")
+        templates = compile_templates(database, streams, args.talker,
+                                      seed=args.seed)
+
+        pace = is_live(args.output) if args.pace is None else args.pace
+        if not pace and args.duration is None and args.size is None:
+            raise ValueError("Unpaced output needs --duration or --size")
+        write, close = open_sink(args.output, profile)
+        model = nmea_link.link_model(profile)
+        print(f"Link: {nmea_link.describe(profile)}, utilization "
+              f"{model.utilization(streams):.1f}%", file=sys.stderr)
+        start = time.perf_counter()
+        try:
+            total, count, seconds = emit(traffic(streams, templates, model, utc_seconds()),
+                                         write, args.duration, args.size, pace)
+        finally:
+            close()
+        elapsed = time.perf_counter() - start
+        print(f"Wrote {total:,} bytes, {count:,} sentences, {seconds:,.1f}s of line time "
+              f"in {elapsed:.2f}s ({seconds / max(elapsed, 1e-9):,.0f}x real time)",
+              file=sys.stderr)
+    except KeyboardInterrupt:
+        pass
+    except KeyError as e:
+        print(f"Error: {e.args[0]}", file=sys.stderr)
+        return 1
+    except (OSError, ValueError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""Non-interactive batch evaluation of link configurations.
+
+A job file is a JSON (or YAML, if PyYAML is installed) list of links, or an
+object with a "jobs" list (a single job object also works):
+
+    [
+        {"name": "bridge", "baud": 4800, "rate": 1,
+         "sentences": ["GGA@10", "RMC", {"id": "GSV", "rate": 0.2}]}
+    ]
+
+baud defaults to 4800 and rate (the default update rate in Hz for every
+sentence without its own) to 1. A job may also give the link's framing
+("framing": "7E1") and overheads, or "link": "115200 8N2"; see
+nmea_link.profile_from_dict, and the AIS targets in range, whose !AIVDM
+traffic joins the mix ("ais": {"targets": 400}; see nmea_ais.job_streams). Each job produces one result record with
+the best, expected and worst-case utilization; a job with an unknown
+sentence or a bad rate gets an "error" entry instead of stopping the run.
+
+Large files are split into chunks and evaluated on a process pool; every
+worker loads the compiled database once.
+"""
+
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import nmea_database
+import nmea_link
+import nmea_metrics
+import nmea_schedule
+
+# Below this many jobs a process pool costs more than it saves
+PARALLEL_THRESHOLD = 2000
+CHUNK_SIZE = 1000
+
+CSV_FIELDS = ['name', 'baud', 'link', 'sentences', 'bytes_per_second',
+              'best', 'expected', 'worst', 'status', 'error']
+
+_database = None
+
+def read_document(path):
+    """Parse a JSON or YAML (by .yaml/.yml suffix) file, '-' for stdin."""
+    if path == '-':
+        text = sys.stdin.read()
+        suffix = ''
+    else:
+        text = Path(path).read_text()
+        suffix = Path(path).suffix.lower()
+    if suffix in ('.yaml', '.yml'):
+        import yaml
+        return yaml.safe_load(text)
+    return json.loads(text)
+
+@nmea_metrics.instrumented('jobs.load')
+def load_jobs(path):
+    """Read a job file ('-' for stdin) and return the list of jobs."""
+    data = read_document(path)
+    if isinstance(data, dict):
+        if 'jobs' in data:
+            data = data['jobs']
+        elif 'sentences' in data or 'ais' in data:
+            # A single job on its own
+            data = [data]
+    if not isinstance(data, list):
+        raise ValueError("Job file must contain a list of jobs")
+    return data
+
+def job_streams(database, job):
+    """Return the nmea_schedule streams of a job at typical lengths."""
+    default_rate = nmea_schedule.check_rate(job.get('rate', 1))
+    streams = []
+    for entry in job.get('sentences', []):
+        if isinstance(entry, dict):
+            ID, rate = entry['id'], entry.get('rate')
+            if rate is not None:
+                rate = nmea_schedule.check_rate(rate, f"{ID}@{rate}")
+        else:
+            ID, rate = nmea_schedule.parse_rate(str(entry))
+        ID = ID.upper()
+        try:
+            length = database.wire_lengths(ID)[1]
+        except KeyError:
+            raise KeyError(f"Sentence ID '{ID}' not found in database") from None
+        streams.append(nmea_schedule.Stream(ID, length, rate if rate is not None else default_rate))
+    if job.get('ais'):
+        import nmea_ais
+        streams.extend(nmea_ais.job_streams(job['ais']))
+    return streams
+
+def summarize(database, streams, profile):
+    """Return the result fields of a list of streams on a link profile."""
+    usage = nmea_schedule.mix_usage(streams, database.wire_lengths, profile)
+    return {
+        'baud': profile.baud,
+        'link': nmea_link.describe(profile),
+        'sentences': len(streams),
+        'bytes_per_second': round(usage.bytes_per_second, 3),
+        'best': round(usage.best, 3),
+        'expected': round(usage.expected, 3),
+        'worst': round(usage.worst, 3),
+        'status': usage.status,
+    }
+
+@nmea_metrics.instrumented('jobs.evaluate')
+def evaluate_job(database, job, index=0):
+    """Evaluate one job and return its result record."""
+    result = {'name': job.get('name', f"job-{index + 1}")}
+    try:
+        profile = nmea_link.profile_from_dict(job)
+        streams = job_streams(database, job)
+        result.update(summarize(database, streams, profile))
+    except (KeyError, ValueError, TypeError) as e:
+        result['error'] = str(e.args[0] if isinstance(e, KeyError) else e)
+    return result
+
+def _init_worker(db_path):
+    global _database
+    _database = nmea_database.load_database(db_path)
+
+def _evaluate_chunk(args):
+    start, jobs = args
+    return [evaluate_job(_database, job, start + i) for i, job in enumerate(jobs)]
+
+@nmea_metrics.instrumented('jobs.run')
+def run_jobs(jobs, db_path=nmea_database.DEFAULT_PATH, workers=None):
+    """Evaluate a list of jobs, in parallel when there are many, keeping order.
+
+    Raises OSError or ValueError if the database cannot be loaded.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(jobs) < PARALLEL_THRESHOLD:
+        database = nmea_database.load_database(db_path)
+        return [evaluate_job(database, job, i) for i, job in enumerate(jobs)]
+
+    # Load once here so a bad database or catalog fails before the pool starts
+    nmea_database.load_database(db_path)
+    chunks = [(i, jobs[i:i + CHUNK_SIZE]) for i in range(0, len(jobs), CHUNK_SIZE)]
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(str(db_path),)) as pool:
+        for chunk in pool.map(_evaluate_chunk, chunks):
+            results.extend(chunk)
+    return results
+
+@nmea_metrics.instrumented('jobs.write')
+def write_results(results, out, fmt='json'):
+    """Write result records to a text stream as json, jsonl or csv."""
+    if fmt == 'json':
+        json.dump(results, out, indent=2)
+        out.write('\n')
+    elif fmt == 'jsonl':
+        for result in results:
+            out.write(json.dumps(result))
+            out.write('\n')
+    elif fmt == 'csv':
+        writer = csv.DictWriter(out, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+    else:
+        raise ValueError(f"Unknown output format: {fmt}")
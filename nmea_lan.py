@@ -0,0 +1,648 @@
+"""IEC 61162-450 networks: sentences as UDP multicast over Ethernet.
+
+On an IEC 61162-450 network every talker sends its sentences as UDP
+datagrams to the multicast address of a transmission group (NAVD for
+navigation data, TGTD for targets, PROP for proprietary sentences ...),
+and every listener joins the groups it needs. A datagram is the header
+"UdPbC" and a NUL, then one or more sentences, each behind a TAG block
+naming its source and counting its lines:
+
+    UdPbC\\0\\s:GP0001,n:123*hh\\$GPGGA,...*hh<CR><LF>\\s:GP0001,n:124*hh\\$GPRMC,...
+
+Every datagram also pays the UDP, IPv4 and Ethernet headers, the frame
+check sequence, the preamble and the gap between frames (66 bytes, 70
+with a VLAN tag), padded up to Ethernet's 64 byte minimum frame. A source
+sending each sentence on its own therefore puts about twice its serial
+bytes on the wire. Batching, collecting the sentences of each window of
+batch seconds into one datagram, saves the per-datagram overhead for up
+to batch seconds of delay; serial-to-network bridges usually batch, and
+merge several serial talkers into one source.
+
+The datagrams per second of a batching source are the windows holding at
+least one of its sentences. A talker releases its sentences together at
+their offsets (as nmea_schedule does), so its share of occupied windows
+is worked out exactly over its hyperperiod; the talkers behind a bridge
+run on their own clocks and combine as independent ones. Windows holding
+more than max_sentences sentences or a full datagram of bytes add
+datagrams.
+
+A Network is switches linked into a tree and devices on switch ports
+that send and join groups. Switches forward a group only toward ports
+with members behind them (IGMP snooping), or flood every group to every
+port without snooping. All ports are computed at once: traffic is a
+devices x groups matrix, and a link carries in each direction a masked
+sum of it over the devices on one side, so a whole-ship network with
+hundreds of talkers is analyzed in milliseconds.
+
+capture() lays out the datagrams a network sends over a period, built
+from nmea_generator's sentence templates with real TAG blocks, and
+write_pcap() saves them as a capture file for Wireshark or tcpdump, so
+the model can be checked against its own traffic without a network.
+"""
+
+import heapq
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+import nmea_fields
+import nmea_generator
+import nmea_link
+import nmea_metrics
+import nmea_schedule
+
+HEADER = b'UdPbC\x00'
+# Transmission groups: multicast address 239.192.0.n and UDP port 60000 + n
+GROUPS = {'MISC': 1, 'TGTD': 2, 'SATD': 3, 'NAVD': 4, 'VDRD': 5, 'RCOM': 6, 'TIME': 7,
+          'PROP': 8, **{f"USR{n}": 8 + n for n in range(1, 9)}}
+DEFAULT_GROUP = 'NAVD'
+# Sentences about other vessels and radar targets
+TARGET_SENTENCES = frozenset({'VDM', 'VDO', 'TTM', 'TLL', 'TLB'})
+
+# Bytes per datagram on the wire
+UDP_HEADER = 8
+IP_HEADER = 20
+ETHERNET_HEADER = 14
+VLAN_TAG = 4
+FCS = 4
+# Preamble and start of frame delimiter, and the gap after every frame
+PREAMBLE = 8
+INTERFRAME_GAP = 12
+MIN_FRAME = 64
+MTU = 1500
+
+# Port speed in Mbit/s when none is given
+DEFAULT_SPEED = 100
+# Sources are a talker and four digits; devices without one get II0001, II0002 ...
+DEFAULT_TALKER = 'II'
+# Line counts run from 1 to LINE_COUNT_LIMIT and start over
+LINE_COUNT_LIMIT = 999
+# '\s:GP0001,n:' and '*hh\' around the line count, with its mean number of digits
+TAG_BLOCK = 16 + sum(len(str(n)) for n in range(1, LINE_COUNT_LIMIT + 1)) / LINE_COUNT_LIMIT
+# Releases in a talker's hyperperiod beyond which its phases count as independent
+MAX_RELEASES = 100_000
+
+LanLoad = namedtuple('LanLoad', ['sentences', 'datagrams', 'payload_bytes', 'wire_bytes'])
+LanLoad.__doc__ = """Traffic per second of one source to one group: sentences, datagrams,
+UDP payload bytes and bytes on the wire."""
+
+DeviceReport = namedtuple('DeviceReport', [
+    'name', 'switch', 'source', 'groups', 'sentences', 'datagrams', 'payload_bytes',
+    'wire_bytes', 'unbatched_wire_bytes', 'received_packets', 'received_bytes', 'serial'])
+DeviceReport.__doc__ = """Traffic of one device per second.
+
+groups lists the groups it sends to. unbatched_wire_bytes is what it
+would send with one sentence per datagram; received_packets and
+received_bytes arrive on its port. serial maps each serial talker behind
+a bridge to the utilization of its port in percent.
+"""
+
+GroupReport = namedtuple('GroupReport', [
+    'group', 'address', 'port', 'senders', 'members', 'sentences', 'datagrams', 'wire_bytes'])
+GroupReport.__doc__ = """Traffic per second sent to one transmission group."""
+
+PortReport = namedtuple('PortReport', [
+    'switch', 'neighbor', 'speed', 'out_packets', 'out_bytes', 'out_utilization',
+    'in_packets', 'in_bytes', 'in_utilization', 'status'])
+PortReport.__doc__ = """Load of one switch port toward a device or another switch.
+
+out is what the switch sends on the port and in what it receives, per
+second; bytes include the preamble and the gap between frames, and
+utilization is in percent of the port's speed in Mbit/s. status is that
+of the busier direction, as nmea_schedule.status_of() gives it.
+"""
+
+Packet = namedtuple('Packet', ['time', 'device', 'group', 'payload'])
+Packet.__doc__ = """One datagram of a capture: seconds from the start, sender and group."""
+
+def group_address(group):
+    """Return the (multicast address, UDP port) of a transmission group."""
+    try:
+        number = GROUPS[group]
+    except KeyError:
+        raise ValueError(f"Unknown transmission group: {group}") from None
+    return f"239.192.0.{number}", 60000 + number
+
+def default_group(ID, sentence=None):
+    """Return the group a sentence is sent to unless one is given."""
+    if ID in TARGET_SENTENCES:
+        return 'TGTD'
+    if sentence is not None and sentence.get('standard') == 'P':
+        return 'PROP'
+    return DEFAULT_GROUP
+
+def tag_block(source, line):
+    """Return the TAG block of a sentence from source with its line count."""
+    body = f"s:{source},n:{line}".encode('ascii')
+    return b'\\' + body + b'*%02X\\' % nmea_generator.xor_of(body)
+
+def encode_datagram(sentences, source, line=1):
+    """Return a datagram of sentences (with their CR/LF) from source whose
+    first line count is line, and the line count that follows it."""
+    parts = [HEADER]
+    for sentence in sentences:
+        parts.append(tag_block(source, line))
+        parts.append(sentence)
+        line = line % LINE_COUNT_LIMIT + 1
+    return b''.join(parts), line
+
+def frame_overhead(vlan=False):
+    """Return the bytes on the wire a datagram adds to its payload."""
+    return (UDP_HEADER + IP_HEADER + ETHERNET_HEADER + FCS + PREAMBLE + INTERFRAME_GAP
+            + (VLAN_TAG if vlan else 0))
+
+def min_payload(vlan=False):
+    """Return the UDP payload below which a frame is padded to the minimum."""
+    return MIN_FRAME - ETHERNET_HEADER - FCS - IP_HEADER - UDP_HEADER - (VLAN_TAG if vlan else 0)
+
+def max_payload(mtu=MTU):
+    """Return the largest UDP payload of one frame."""
+    return mtu - IP_HEADER - UDP_HEADER
+
+def wire_bytes(payload, vlan=False):
+    """Return the bytes on the wire of a datagram of payload bytes."""
+    return max(payload, min_payload(vlan)) + frame_overhead(vlan)
+
+def window_share(streams, batch):
+    """Return the share of batch second windows, at a random phase, in which
+    a talker releases at least one of its streams."""
+    streams = [stream for stream in streams if stream.rate > 0]
+    if not streams:
+        return 0.0
+    horizon = nmea_schedule.hyperperiod(stream.rate for stream in streams)
+    horizon = float(horizon)
+    if horizon * sum(stream.rate for stream in streams) > MAX_RELEASES:
+        return 1.0 - float(np.prod([1.0 - min(1.0, stream.rate * batch) for stream in streams]))
+    times = []
+    for stream in streams:
+        period = 1.0 / stream.rate
+        count = int(round(horizon * stream.rate))
+        times.append(stream.offset % period + np.arange(count) * period)
+    times = np.sort(np.mod(np.concatenate(times), horizon))
+    # A release at t occupies the windows starting in (t - batch, t], cut
+    # short by the release before it
+    gaps = np.diff(times, append=times[0] + horizon)
+    return min(1.0, float(np.minimum(gaps, batch).sum()) / horizon)
+
+def group_load(talkers, batch=0.0, max_sentences=0, mtu=MTU, vlan=False):
+    """Return the LanLoad of one source sending to one group.
+
+    talkers holds a list of streams per transmit clock: the source's own
+    sentences, or each serial talker behind a bridge. Without batching
+    every sentence is a datagram of its own.
+    """
+    streams = [stream for talker in talkers for stream in talker]
+    sentences = sum(stream.rate for stream in streams)
+    if not sentences:
+        return LanLoad(0.0, 0.0, 0.0, 0.0)
+    data = sum(stream.rate * (stream.length + TAG_BLOCK) for stream in streams)
+    if batch <= 0:
+        payload = data + sentences * len(HEADER)
+        wire = sum(stream.rate * wire_bytes(len(HEADER) + TAG_BLOCK + stream.length, vlan)
+                   for stream in streams)
+        return LanLoad(sentences, sentences, payload, wire)
+    idle = 1.0
+    for talker in talkers:
+        idle *= 1.0 - window_share(talker, batch)
+    datagrams = (1.0 - idle) / batch
+    if max_sentences:
+        datagrams = max(datagrams, sentences / max_sentences)
+    datagrams = min(sentences, max(datagrams, data / (max_payload(mtu) - len(HEADER))))
+    payload = data + datagrams * len(HEADER)
+    return LanLoad(sentences, datagrams, payload,
+                   datagrams * wire_bytes(payload / datagrams, vlan))
+
+def group_streams(database, streams, group=None):
+    """Return {group: streams} for a list of streams, all in group if given."""
+    sends = {}
+    for stream in streams:
+        name = group or default_group(stream.id, database[stream.id])
+        group_address(name)
+        sends.setdefault(name, []).append(stream)
+    return sends
+
+class Device:
+    """A device on a switch port: a source of sentences, a listener or both."""
+
+    def __init__(self, name, switch, speed, sends, listen, batch, max_sentences, source,
+                 serial):
+        self.name = name
+        self.switch = switch
+        self.speed = speed
+        self.sends = sends
+        self.listen = listen
+        self.batch = batch
+        self.max_sentences = max_sentences
+        self.source = source
+        self.serial = serial
+        # Batch window: {group: LanLoad}, until the batching changes
+        self.loads = {}
+
+class Network:
+    """An IEC 61162-450 network: switches in a tree and the devices on them."""
+
+    def __init__(self, vlan=False, mtu=MTU, snooping=True):
+        if max_payload(mtu) < len(HEADER) + TAG_BLOCK + nmea_fields.MAX_SENTENCE_LENGTH:
+            raise ValueError(f"MTU too small for a sentence: {mtu}")
+        self.vlan = vlan
+        self.mtu = mtu
+        self.snooping = snooping
+        # Switch name: names of the devices on it
+        self.switches = {}
+        self.devices = {}
+        # Node name: {neighbor: port speed in Mbit/s}
+        self.adjacent = {}
+        self._result = None
+
+    # Building the network
+
+    def add_switch(self, name):
+        """Add a switch."""
+        self._add_node(name)
+        self.switches[name] = []
+        return name
+
+    def add_device(self, name, switch, sends=(), listen=(), speed=DEFAULT_SPEED, batch=0.0,
+                   max_sentences=0, source=None, serial=None):
+        """Add a device on a port of switch.
+
+        sends holds (group, streams) pairs, one per transmit clock and
+        group; listen names the groups it joins. Batching sources collect
+        the sentences of batch seconds into each datagram, up to
+        max_sentences (0 for no limit) and the MTU.
+        """
+        if switch not in self.switches:
+            raise KeyError(f"Unknown switch: {switch}")
+        sends = [(group, list(streams)) for group, streams in sends]
+        for group in [group for group, _ in sends] + list(listen):
+            group_address(group)
+        if source is None:
+            source = f"{DEFAULT_TALKER}{len(self.devices) + 1:04d}"
+        if len(source) != 6 or not source[:2].isalpha() or not source[2:].isdigit():
+            raise ValueError(f"Source must be a talker and four digits: {source}")
+        self._check_port(speed)
+        self._check_batch(batch, max_sentences)
+        self._add_node(name)
+        self.devices[name] = Device(name, switch, speed, sends, frozenset(listen), batch,
+                                    max_sentences, source.upper(), serial or {})
+        self.switches[switch].append(name)
+        self.adjacent[name][switch] = speed
+        self.adjacent[switch][name] = speed
+        return self.devices[name]
+
+    def connect(self, source, target, speed=DEFAULT_SPEED):
+        """Link two switches; switches must form a tree, as spanning tree leaves them."""
+        for name in (source, target):
+            if name not in self.switches:
+                raise KeyError(f"Unknown switch: {name}")
+        self._check_port(speed)
+        if source == target or self._reaches(source, target):
+            raise ValueError(f"Linking '{source}' to '{target}' would create a loop")
+        self.adjacent[source][target] = speed
+        self.adjacent[target][source] = speed
+        self._result = None
+
+    def set_batch(self, name, batch, max_sentences=0):
+        """Change how a device batches its sentences."""
+        device = self._device(name)
+        self._check_batch(batch, max_sentences)
+        device.batch = batch
+        device.max_sentences = max_sentences
+        device.loads = {}
+        self._result = None
+
+    def _add_node(self, name):
+        if name in self.adjacent:
+            raise ValueError(f"Duplicate node name: {name}")
+        self.adjacent[name] = {}
+        self._result = None
+
+    def _device(self, name):
+        try:
+            return self.devices[name]
+        except KeyError:
+            raise KeyError(f"Unknown device: {name}") from None
+
+    @staticmethod
+    def _check_port(speed):
+        if speed <= 0:
+            raise ValueError(f"Port speed must be positive: {speed:g}")
+
+    @staticmethod
+    def _check_batch(batch, max_sentences):
+        if batch < 0 or max_sentences < 0:
+            raise ValueError("Batch window and sentences per datagram cannot be negative")
+
+    def _reaches(self, start, goal):
+        stack, seen = [start], {start}
+        while stack:
+            for name in self.adjacent[stack.pop()]:
+                if name == goal:
+                    return True
+                if name not in seen and name in self.switches:
+                    seen.add(name)
+                    stack.append(name)
+        return False
+
+    # Analysis
+
+    def loads(self, device, batch=None):
+        """Return {group: LanLoad} of a device, at another batch window if given."""
+        if batch is None:
+            batch = device.batch
+        if batch not in device.loads:
+            talkers = {}
+            for group, streams in device.sends:
+                talkers.setdefault(group, []).append(streams)
+            device.loads[batch] = {
+                group: group_load(members, batch, device.max_sentences, self.mtu, self.vlan)
+                for group, members in talkers.items()}
+        return device.loads[batch]
+
+    @nmea_metrics.instrumented('lan.analyze')
+    def analyze(self):
+        """Return (device reports, group reports, port reports), computed once
+        per change to the network."""
+        if self._result is not None:
+            return self._result
+        names = list(self.devices)
+        groups = list(GROUPS)
+        column = {group: i for i, group in enumerate(groups)}
+        nodes = list(self.adjacent)
+        row = {name: i for i, name in enumerate(nodes)}
+        # Per node: datagrams and wire bytes sent to each group, and members of each group
+        packets = np.zeros((len(nodes), len(groups)))
+        traffic = np.zeros((len(nodes), len(groups)))
+        members = np.zeros((len(nodes), len(groups)))
+        device_loads = {}
+        for name in names:
+            device = self.devices[name]
+            loads = device_loads[name] = self.loads(device)
+            for group, load in loads.items():
+                packets[row[name], column[group]] = load.datagrams
+                traffic[row[name], column[group]] = load.wire_bytes
+            for group in device.listen:
+                members[row[name], column[group]] = 1
+        sent_packets = packets.sum(axis=1)
+        sent_bytes = traffic.sum(axis=1)
+
+        # Root every tree at a switch and list its nodes parents first
+        parent = {}
+        root = {}
+        order = []
+        for start in self.switches:
+            if start in root:
+                continue
+            root[start] = start
+            stack = [start]
+            while stack:
+                name = stack.pop()
+                order.append(name)
+                for neighbor in self.adjacent[name]:
+                    if neighbor not in root:
+                        root[neighbor] = start
+                        parent[neighbor] = name
+                        stack.append(neighbor)
+        # Sums over each node's subtree
+        for name in reversed(order):
+            if name in parent:
+                up = row[parent[name]]
+                packets[up] += packets[row[name]]
+                traffic[up] += traffic[row[name]]
+                members[up] += members[row[name]]
+
+        children = np.array([row[name] for name in order if name in parent], dtype=np.int64)
+        roots = np.array([row[root[nodes[i]]] for i in children], dtype=np.int64)
+        leaf = np.array([nodes[i] in self.devices for i in children], dtype=bool)
+        if self.snooping:
+            wanted_below = members[children] > 0
+            wanted_above = (members[roots] - members[children]) > 0
+        else:
+            wanted_below = wanted_above = np.ones((len(children), len(groups)), dtype=bool)
+        # Down a link: traffic from outside the subtree for groups with members in it
+        down_packets = ((packets[roots] - packets[children]) * wanted_below).sum(axis=1)
+        down_bytes = ((traffic[roots] - traffic[children]) * wanted_below).sum(axis=1)
+        # Up a link: traffic from the subtree for groups with members outside it;
+        # a device's own port carries everything it sends
+        up_packets = (packets[children] * wanted_above).sum(axis=1)
+        up_bytes = (traffic[children] * wanted_above).sum(axis=1)
+        up_packets[leaf] = sent_packets[children[leaf]]
+        up_bytes[leaf] = sent_bytes[children[leaf]]
+
+        ports = []
+        received = {}
+        for k, i in enumerate(children):
+            name = nodes[i]
+            switch = parent[name]
+            speed = self.adjacent[switch][name]
+            down = (down_packets[k], down_bytes[k])
+            up = (up_packets[k], up_bytes[k])
+            ports.append(self._port(switch, name, speed, down, up))
+            if leaf[k]:
+                received[name] = down
+            else:
+                ports.append(self._port(name, switch, speed, up, down))
+
+        devices = []
+        for name in names:
+            device = self.devices[name]
+            loads = device_loads[name].values()
+            unbatched = self.loads(device, 0.0).values() if device.batch else loads
+            devices.append(DeviceReport(
+                name=name, switch=device.switch, source=device.source,
+                groups=sorted(device_loads[name]),
+                sentences=sum(load.sentences for load in loads),
+                datagrams=sum(load.datagrams for load in loads),
+                payload_bytes=sum(load.payload_bytes for load in loads),
+                wire_bytes=sum(load.wire_bytes for load in loads),
+                unbatched_wire_bytes=sum(load.wire_bytes for load in unbatched),
+                received_packets=float(received[name][0]),
+                received_bytes=float(received[name][1]),
+                serial=dict(device.serial)))
+
+        reports = []
+        for group in groups:
+            senders = [name for name in names if group in device_loads[name]]
+            listeners = [name for name in names if group in self.devices[name].listen]
+            if not senders and not listeners:
+                continue
+            loads = [device_loads[name][group] for name in senders]
+            address, port = group_address(group)
+            reports.append(GroupReport(
+                group=group, address=address, port=port, senders=senders, members=listeners,
+                sentences=sum(load.sentences for load in loads),
+                datagrams=sum(load.datagrams for load in loads),
+                wire_bytes=sum(load.wire_bytes for load in loads)))
+        self._result = (devices, reports, ports)
+        return self._result
+
+    @staticmethod
+    def _port(switch, neighbor, speed, out, into):
+        scale = 8 / (speed * 1e6) * 100
+        out_utilization = float(out[1]) * scale
+        in_utilization = float(into[1]) * scale
+        return PortReport(
+            switch=switch, neighbor=neighbor, speed=speed,
+            out_packets=float(out[0]), out_bytes=float(out[1]), out_utilization=out_utilization,
+            in_packets=float(into[0]), in_bytes=float(into[1]), in_utilization=in_utilization,
+            status=nmea_schedule.status_of(max(out_utilization, in_utilization)))
+
+    def device_reports(self):
+        """Return the DeviceReport of every device."""
+        return self.analyze()[0]
+
+    def group_reports(self):
+        """Return the GroupReport of every group in use."""
+        return self.analyze()[1]
+
+    def ports(self):
+        """Return the PortReport of every switch port in use."""
+        return self.analyze()[2]
+
+def load_network(spec, database):
+    """Build a Network from a spec dict.
+
+    spec = {"vlan": false, "mtu": 1500, "snooping": true,
+            "switches": [{"name": "bridge"}, {"name": "ecr"}],
+            "links": [{"from": "bridge", "to": "ecr", "speed": 1000}],
+            "devices": [{"name": "gps1", "switch": "bridge", "sentences": ["GGA@10", "RMC"]},
+                        {"name": "nav-gw", "switch": "bridge", "batch": 0.05,
+                         "serial": [{"name": "gyro", "baud": 4800, "sentences": ["HDT@10"]},
+                                    {"name": "log", "sentences": ["VHW", "VBW"]}]},
+                        {"name": "ecdis", "switch": "bridge", "speed": 1000,
+                         "listen": ["NAVD", "TGTD"]}]}
+
+    A device's own sentences and each of its serial talkers use the job
+    file format of nmea_jobs (with "ais" for an AIS transponder's
+    traffic); a "group" on the device or a talker sends all its
+    sentences there instead of each sentence's default group. Speeds are
+    in Mbit/s, batch in seconds.
+    """
+    import nmea_jobs
+    network = Network(bool(spec.get('vlan', False)), int(spec.get('mtu', MTU)),
+                      bool(spec.get('snooping', True)))
+    for switch in spec.get('switches', []):
+        network.add_switch(switch['name'])
+    for link in spec.get('links', []):
+        network.connect(link['from'], link['to'], float(link.get('speed', DEFAULT_SPEED)))
+    for device in spec.get('devices', []):
+        talkers = [device] if device.get('sentences') or device.get('ais') else []
+        sends = []
+        serial = {}
+        for number, talker in enumerate(device.get('serial', []), 1):
+            streams = nmea_jobs.job_streams(database, talker)
+            model = nmea_link.link_model(nmea_link.profile_from_dict(talker))
+            serial[talker.get('name', f"serial-{number}")] = model.utilization(streams)
+            talkers.append(talker)
+        for talker in talkers:
+            streams = nmea_jobs.job_streams(database, talker)
+            group = talker.get('group', device.get('group'))
+            sends.extend(group_streams(database, streams, group).items())
+        network.add_device(device['name'], device['switch'], sends, device.get('listen', []),
+                           float(device.get('speed', DEFAULT_SPEED)),
+                           float(device.get('batch', 0.0)), int(device.get('max_sentences', 0)),
+                           device.get('source'), serial)
+    return network
+
+@nmea_metrics.instrumented('lan.capture')
+def capture(network, database, duration, seed=0):
+    """Return the Packets a network's devices send in duration seconds, by time.
+
+    Each talker starts at a random phase of its hyperperiod; batching
+    sources send a window's sentences at the end of the window.
+    """
+    rng = np.random.default_rng(seed)
+    packets = []
+    for name, device in network.devices.items():
+        streams = {}
+        for group, members in device.sends:
+            if not members:
+                continue
+            horizon = float(nmea_schedule.hyperperiod(stream.rate for stream in members))
+            phase = float(rng.random()) * horizon
+            streams.setdefault(group, []).extend(
+                stream._replace(offset=stream.offset + phase) for stream in members)
+        templates = nmea_generator.compile_templates(
+            database, [stream for members in streams.values() for stream in members],
+            talker=device.source[:2])
+        # Only the release times are used, not when a serial line would finish
+        link = nmea_link.COMMON_BAUDS[-1]
+        releases = heapq.merge(*[((release, group, data) for release, _, data
+                                  in nmea_generator.traffic(members, templates, link))
+                                 for group, members in streams.items()])
+        line = 1
+        pending = {}
+        for release, group, data in releases:
+            if release >= duration:
+                break
+            if not device.batch:
+                datagram, line = encode_datagram([data], device.source, line)
+                packets.append(Packet(release, name, group, datagram))
+                continue
+            window = int(release // device.batch)
+            if group in pending and pending[group][0] != window:
+                line = _flush(packets, device, group, pending.pop(group), network.mtu, line)
+            pending.setdefault(group, (window, []))[1].append(data)
+        for group, window in pending.items():
+            if (window[0] + 1) * device.batch <= duration:
+                line = _flush(packets, device, group, window, network.mtu, line)
+    packets.sort(key=lambda packet: packet.time)
+    return packets
+
+def _flush(packets, device, group, window, mtu, line):
+    """Send the sentences of one window as datagrams at its end."""
+    number, sentences = window
+    limit = max_payload(mtu) - len(HEADER)
+    # Room for the longest TAG block
+    tag = len(tag_block(device.source, LINE_COUNT_LIMIT))
+    batches = [[]]
+    size = 0
+    for sentence in sentences:
+        if batches[-1] and (size + len(sentence) + tag > limit
+                            or len(batches[-1]) == device.max_sentences):
+            batches.append([])
+            size = 0
+        batches[-1].append(sentence)
+        size += len(sentence) + tag
+    for batch in batches:
+        datagram, line = encode_datagram(batch, device.source, line)
+        packets.append(Packet((number + 1) * device.batch, device.name, group, datagram))
+    return line
+
+def _checksum(header):
+    total = sum(struct.unpack(f"!{len(header) // 2}H", header))
+    while total >> 16:
+        total = (total & 0xFFFF) + (total >> 16)
+    return ~total & 0xFFFF
+
+def write_pcap(packets, path, network):
+    """Write a capture's Packets as Ethernet frames to a pcap file.
+
+    Device n gets the address 10.0.n/16 and a locally administered MAC;
+    frames carry a VLAN tag on networks with vlan set.
+    """
+    hosts = {name: number for number, name in enumerate(network.devices, 1)}
+    with open(path, 'wb') as f:
+        # Microsecond timestamps, frames up to 65535 bytes, Ethernet
+        f.write(struct.pack('<IHHiIII', 0xA1B2C3D4, 2, 4, 0, 0, 65535, 1))
+        for number, packet in enumerate(packets):
+            host = hosts[packet.device]
+            group = GROUPS[packet.group]
+            port = 60000 + group
+            udp = struct.pack('!HHHH', port, port, UDP_HEADER + len(packet.payload), 0)
+            header = struct.pack('!BBHHHBBH4s4s', 0x45, 0, IP_HEADER + len(udp)
+                                 + len(packet.payload), number & 0xFFFF, 0x4000, 1, 17, 0,
+                                 bytes([10, 0, host >> 8, host & 0xFF]),
+                                 bytes([239, 192, 0, group]))
+            header = header[:10] + struct.pack('!H', _checksum(header)) + header[12:]
+            ethernet = (bytes([0x01, 0x00, 0x5E, 0x40, 0x00, group])
+                        + bytes([0x02, 0x00, 0x00, 0x00, host >> 8, host & 0xFF]))
+            if network.vlan:
+                ethernet += struct.pack('!HH', 0x8100, 1)
+            frame = ethernet + b'\x08\x00' + header + udp + packet.payload
+            frame = frame.ljust(MIN_FRAME - FCS, b'\x00')
+            seconds = int(packet.time)
+            f.write(struct.pack('<IIII', seconds, int((packet.time - seconds) * 1e6),
+                                len(frame), len(frame)))
+            f.write(frame)
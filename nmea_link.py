@@ -0,0 +1,192 @@
+"""Serial link model: baud rate, character framing and transmit overhead.
+
+A LinkProfile describes one port: baud rate, character framing (8N1, 7E1,
+8N2 ...), idle bit times between characters, idle time per sentence (the
+driver's write call, RS-422 turnaround) and the UART transmit FIFO, which
+can leave the line idle while the driver refills it:
+
+    airtime(L) = L x bits_per_character / baud
+               + sentence_gap
+               + (ceil(L / fifo_depth) - 1) x refill_latency
+
+compile_link() turns a profile into a LinkModel once, with airtime()
+looked up from a table for every sentence length up to TABLE_SIZE, so the
+calculators, the batch engine and the sweeps never redo the arithmetic per
+sentence. Plain numbers are accepted wherever a link is, meaning that baud
+rate at 8N1.
+"""
+
+import re
+from collections import namedtuple
+from functools import lru_cache
+from math import ceil
+
+DEFAULT_FRAMING = '8N1'
+# Sentence lengths with a precomputed airtime; longer ones are computed
+TABLE_SIZE = 128
+COMMON_BAUDS = (4800, 9600, 19200, 38400, 57600, 115200, 230400, 460800)
+COMMON_FRAMINGS = ('8N1', '8N2', '8E1', '8O1', '7E1', '7O1', '7N2')
+
+# Overhead fields of a profile and their types
+OVERHEAD_FIELDS = {'char_gap': float, 'sentence_gap': float, 'fifo_depth': int,
+                   'refill_latency': float}
+
+_FRAMING = re.compile(r'^([5-8])([NEOMS])(1|1\.5|2)$')
+
+LinkProfile = namedtuple('LinkProfile', [
+    'baud', 'data_bits', 'parity', 'stop_bits', 'char_gap', 'sentence_gap',
+    'fifo_depth', 'refill_latency'], defaults=[8, 'N', 1, 0.0, 0.0, 0, 0.0])
+LinkProfile.__doc__ = """One serial port.
+
+parity is N, E, O, M or S. char_gap is idle bit times between characters,
+sentence_gap idle seconds per sentence. fifo_depth is the UART transmit
+FIFO in bytes (0 for none) and refill_latency the idle seconds each time
+the driver has to refill it within a sentence.
+"""
+
+def parse_framing(text):
+    """Parse '7E1' style framing into (data bits, parity, stop bits)."""
+    match = _FRAMING.match(text.strip().upper())
+    if not match:
+        raise ValueError(f"Unknown framing: {text} (expected e.g. 8N1, 7E1, 8N2)")
+    data, parity, stop = match.groups()
+    return int(data), parity, float(stop) if stop == '1.5' else int(stop)
+
+def framing_of(profile):
+    """Return the '8N1' style name of a profile's framing."""
+    return f"{profile.data_bits}{profile.parity}{profile.stop_bits:g}"
+
+def bits_per_character(profile):
+    """Return the bit times one character occupies, including gaps."""
+    return (1 + profile.data_bits + (profile.parity != 'N') + profile.stop_bits
+            + profile.char_gap)
+
+def make_profile(baud, framing=DEFAULT_FRAMING, **overhead):
+    """Build a LinkProfile from a baud rate, a framing name and overhead fields."""
+    baud = float(baud)
+    if baud <= 0:
+        raise ValueError(f"Baud rate must be positive: {baud:g}")
+    data_bits, parity, stop_bits = parse_framing(framing)
+    profile = LinkProfile(int(baud) if baud.is_integer() else baud,
+                          data_bits, parity, stop_bits, **overhead)
+    if profile.fifo_depth < 0 or profile.refill_latency < 0 or profile.sentence_gap < 0:
+        raise ValueError("Link overheads cannot be negative")
+    return profile
+
+def parse_link(text):
+    """Parse '115200', '115200 7E1' or '38400/8N2' into a LinkProfile."""
+    parts = re.split(r'[\s/,:]+', str(text).strip())
+    if not parts[0] or len(parts) > 2:
+        raise ValueError(f"Unknown link: {text}")
+    return make_profile(parts[0], parts[1] if len(parts) > 1 else DEFAULT_FRAMING)
+
+def profile_from_dict(data):
+    """Build a LinkProfile from {"baud": 115200, "framing": "7E1", "fifo_depth": 16, ...}.
+
+    A "link" entry such as "115200 7E1" may stand in for baud and framing.
+    Other keys are ignored, so job and topology entries can be passed as is.
+    Numbers may be given as strings (query strings, YAML); a value that is
+    not a number raises ValueError naming its field.
+    """
+    if 'link' in data:
+        data = dict(data)
+        profile = parse_link(data.pop('link'))
+        data.setdefault('baud', profile.baud)
+        data.setdefault('framing', framing_of(profile))
+    fields = {}
+    for key, kind in OVERHEAD_FIELDS.items():
+        if key in data:
+            try:
+                value = float(data[key])
+            except (TypeError, ValueError):
+                raise ValueError(f"{key} must be a number: {data[key]!r}") from None
+            if kind is int:
+                if not value.is_integer():
+                    raise ValueError(f"{key} must be a whole number: {data[key]!r}")
+                value = int(value)
+            fields[key] = value
+    try:
+        baud = float(data.get('baud', 4800))
+    except (TypeError, ValueError):
+        raise ValueError(f"baud must be a number: {data.get('baud')!r}") from None
+    return make_profile(baud, str(data.get('framing', DEFAULT_FRAMING)), **fields)
+
+class LinkModel:
+    """A LinkProfile compiled for fast airtime and utilization lookups."""
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.baud = profile.baud
+        self.bits_per_byte = bits_per_character(profile)
+        self.seconds_per_byte = self.bits_per_byte / profile.baud
+        # Airtime is a plain multiple of the length without per-sentence costs
+        self.linear = not profile.sentence_gap and not (profile.fifo_depth and
+                                                        profile.refill_latency)
+        self._table = [self._airtime(length) for length in range(TABLE_SIZE)]
+
+    def _airtime(self, length):
+        time = length * self.seconds_per_byte + self.profile.sentence_gap
+        depth = self.profile.fifo_depth
+        if depth and length > depth:
+            time += (ceil(length / depth) - 1) * self.profile.refill_latency
+        return time
+
+    def airtime(self, length):
+        """Return the seconds a sentence of length bytes keeps the line busy."""
+        if type(length) is int and 0 <= length < TABLE_SIZE:
+            return self._table[length]
+        return self._airtime(length)
+
+    def load(self, streams):
+        """Return the fraction of the line a list of streams keeps busy."""
+        return sum(stream.rate * self.airtime(stream.length) for stream in streams)
+
+    def utilization(self, streams):
+        """Return the long-run utilization of a list of streams in percent."""
+        return self.load(streams) * 100
+
+    @property
+    def capacity(self):
+        """Bytes per second the line carries when sent back to back."""
+        return 1 / self.seconds_per_byte
+
+    def __repr__(self):
+        return f"LinkModel({describe(self.profile)})"
+
+def describe(profile):
+    """Return a short description such as '115200 7E1' or '38400 8N1, 16 byte FIFO'."""
+    text = f"{profile.baud} {framing_of(profile)}"
+    extras = []
+    if profile.char_gap:
+        extras.append(f"{profile.char_gap:g} bit gap")
+    if profile.sentence_gap:
+        extras.append(f"{profile.sentence_gap * 1000:g} ms per sentence")
+    if profile.fifo_depth and profile.refill_latency:
+        extras.append(f"{profile.fifo_depth} byte FIFO, "
+                      f"{profile.refill_latency * 1000:g} ms refill")
+    return ', '.join([text] + extras)
+
+@lru_cache(maxsize=256)
+def compile_link(profile):
+    """Return the LinkModel of a LinkProfile, compiled once per profile."""
+    return LinkModel(profile)
+
+def link_model(link, bits_per_byte=None):
+    """Return a LinkModel for a LinkModel, LinkProfile, dict, '115200 7E1'
+    string or plain baud rate.
+
+    A plain baud rate means 8N1, or bits_per_byte bit times per character
+    if that is given (the difference from 10 counts as a character gap).
+    """
+    if isinstance(link, LinkModel):
+        return link
+    if isinstance(link, LinkProfile):
+        return compile_link(link)
+    if isinstance(link, dict):
+        return compile_link(profile_from_dict(link))
+    if isinstance(link, str):
+        return compile_link(parse_link(link))
+    profile = make_profile(link)
+    if bits_per_byte is not None and bits_per_byte != bits_per_character(profile):
+        profile = profile._replace(char_gap=bits_per_byte - bits_per_character(profile))
+    return compile_link(profile)
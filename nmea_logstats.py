@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""Streaming statistics for captured NMEA 0183 traffic.
+
+Reads capture files in large fixed-size blocks (never the whole file) and
+processes each block of complete lines with NumPy: sentence boundaries,
+checksums and address fields are found with whole-array operations rather
+than a Python loop per line, which keeps ingestion in the hundreds of MB/s
+on one core.
+
+For every sentence ID the result holds a histogram of observed on-the-wire
+lengths (always counted with a real CR/LF terminator), the number of
+checksum errors and, when the capture carries GGA/RMC/ZDA/GBS times or a
+duration is supplied, the observed rate. A LogStats can be saved as a JSON
+sizing profile and used by the calculators instead of template lengths.
+
+    python nmea_logstats.py capture.nmea -o profile.json
+"""
+
+import argparse
+import json
+import sys
+from collections import Counter
+from math import ceil
+
+import numpy as np
+
+import nmea_metrics
+
+CHUNK_SIZE = 8 * 1024 * 1024
+
+# Longer lines are counted in the top histogram bucket
+MAX_LENGTH = 4095
+
+# Sentences whose first field is hhmmss.ss, used to measure capture duration
+TIME_IDS = ('GGA', 'RMC', 'ZDA', 'GBS')
+
+_HEX = np.full(256, 255, dtype=np.uint8)
+for _i, _c in enumerate(b'0123456789ABCDEF'):
+    _HEX[_c] = _i
+for _i, _c in enumerate(b'abcdef'):
+    _HEX[_c] = 10 + _i
+
+def _id_code(ID):
+    """Pack a three-letter sentence ID the same way _process packs addresses."""
+    a, b, c = ID.encode('ascii')
+    return (a << 16) | (b << 8) | c
+
+_TIME_CODES = [_id_code(ID) for ID in TIME_IDS]
+
+def iter_chunks(f, chunk_size=CHUNK_SIZE):
+    """Yield blocks of complete lines read from a binary file in bulk.
+
+    Blocks are memoryviews into one reusable buffer filled with readinto(),
+    so each must be consumed before the next is requested. A trailing
+    partial line is carried into the next block, and a final unterminated
+    line is yielded with a newline appended.
+    """
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    carry = 0
+    while True:
+        if carry == len(buffer):
+            # A single line longer than the buffer: move to a bigger one
+            buffer = buffer + bytes(len(buffer))
+            view = memoryview(buffer)
+        read = f.readinto(view[carry:])
+        if not read:
+            break
+        filled = carry + read
+        cut = buffer.rfind(b'\n', 0, filled) + 1
+        if cut == 0:
+            carry = filled
+            continue
+        yield view[:cut]
+        carry = filled - cut
+        buffer[:carry] = view[cut:filled]
+    if carry:
+        yield bytes(view[:carry]) + b'\n'
+
+class SentenceLogStats:
+    """Observed traffic for one sentence ID."""
+
+    __slots__ = ('count', 'total_bytes', 'checksum_errors', 'missing_checksum',
+                 'histogram')
+
+    def __init__(self):
+        self.count = 0
+        self.total_bytes = 0
+        self.checksum_errors = 0
+        self.missing_checksum = 0
+        self.histogram = Counter()
+
+    @property
+    def mean_length(self):
+        return self.total_bytes / self.count if self.count else 0.0
+
+    @property
+    def min_length(self):
+        return min(self.histogram) if self.histogram else 0
+
+    @property
+    def max_length(self):
+        return max(self.histogram) if self.histogram else 0
+
+    def percentile(self, q):
+        """Return the smallest length covering q percent of the sentences."""
+        target = self.count * q / 100
+        seen = 0
+        for length in sorted(self.histogram):
+            seen += self.histogram[length]
+            if seen >= target:
+                return length
+        return 0
+
+class LogStats:
+    """Per-sentence-ID statistics collected from one or more captures."""
+
+    def __init__(self):
+        self.sentences = {}
+        self.bytes_read = 0
+        self.lines = 0
+        self.malformed = 0
+        self.duration = 0.0
+        self._last_time = None
+        # Sorted packed sentence keys and the SentenceLogStats of each
+        self._keys = np.zeros(0, dtype=np.int64)
+        self._entries = []
+
+    def rate(self, ID):
+        """Return the observed rate of a sentence in Hz, or None if unknown."""
+        if not self.duration or ID not in self.sentences:
+            return None
+        return self.sentences[ID].count / self.duration
+
+    @nmea_metrics.instrumented('logstats.chunk')
+    def feed(self, chunk):
+        """Add a block of complete lines (bytes ending in a newline)."""
+        self.bytes_read += len(chunk)
+        if nmea_metrics.enabled:
+            nmea_metrics.count('logstats.bytes', len(chunk))
+        _process(self, np.frombuffer(chunk, dtype=np.uint8))
+
+    def feed_file(self, f, chunk_size=CHUNK_SIZE):
+        """Stream a binary file object through feed()."""
+        for chunk in iter_chunks(f, chunk_size):
+            self.feed(chunk)
+        return self
+
+    def merge(self, other):
+        """Add the counts of another LogStats; capture durations add up."""
+        self.bytes_read += other.bytes_read
+        self.lines += other.lines
+        self.malformed += other.malformed
+        self.duration += other.duration
+        for ID, entry in other.sentences.items():
+            merged = self.sentences.get(ID)
+            if merged is None:
+                merged = self.sentences[ID] = SentenceLogStats()
+            merged.count += entry.count
+            merged.total_bytes += entry.total_bytes
+            merged.checksum_errors += entry.checksum_errors
+            merged.missing_checksum += entry.missing_checksum
+            merged.histogram.update(entry.histogram)
+        return self
+
+    def _add_time(self, seconds):
+        if self._last_time is not None:
+            delta = seconds - self._last_time
+            if delta < -43200:  # Passed midnight
+                delta += 86400
+            if delta > 0:
+                self.duration += delta
+        self._last_time = seconds
+
+    def profile(self, statistic='mean'):
+        """Return {ID: bytes} sizing from the observed lengths.
+
+        statistic is 'mean', 'max', 'min' or a percentile such as 'p95'.
+        Lengths are rounded up to whole bytes.
+        """
+        sizes = {}
+        for ID, stats in self.sentences.items():
+            if statistic == 'mean':
+                value = stats.mean_length
+            elif statistic == 'max':
+                value = stats.max_length
+            elif statistic == 'min':
+                value = stats.min_length
+            elif statistic.startswith('p'):
+                value = stats.percentile(float(statistic[1:]))
+            else:
+                raise ValueError(f"Unknown statistic: {statistic}")
+            sizes[ID] = ceil(value)
+        return sizes
+
+    def to_dict(self):
+        """Return a JSON-serializable summary, the format save() writes."""
+        return {
+            'bytes_read': self.bytes_read,
+            'lines': self.lines,
+            'malformed': self.malformed,
+            'duration': self.duration,
+            'sentences': {
+                ID: {
+                    'count': stats.count,
+                    'total_bytes': stats.total_bytes,
+                    'checksum_errors': stats.checksum_errors,
+                    'missing_checksum': stats.missing_checksum,
+                    'rate': self.rate(ID),
+                    'histogram': {str(k): v for k, v in sorted(stats.histogram.items())},
+                }
+                for ID, stats in sorted(self.sentences.items())
+            },
+        }
+
+    def save(self, path):
+        """Write the statistics as a JSON sizing profile."""
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=4)
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.bytes_read = data.get('bytes_read', 0)
+        stats.lines = data.get('lines', 0)
+        stats.malformed = data.get('malformed', 0)
+        stats.duration = data.get('duration', 0.0)
+        for ID, entry in data['sentences'].items():
+            sentence = stats.sentences[ID] = SentenceLogStats()
+            sentence.count = entry['count']
+            sentence.total_bytes = entry['total_bytes']
+            sentence.checksum_errors = entry['checksum_errors']
+            sentence.missing_checksum = entry.get('missing_checksum', 0)
+            sentence.histogram = Counter({int(k): v for k, v in entry['histogram'].items()})
+        return stats
+
+def load_profile(path):
+    """Load a LogStats previously written by LogStats.save()."""
+    with open(path, 'r') as f:
+        return LogStats.from_dict(json.load(f))
+
+def _first_per_group(groups):
+    """Mask selecting the first element of each run of equal values."""
+    mask = np.empty(len(groups), dtype=bool)
+    if len(groups):
+        mask[0] = True
+        np.not_equal(groups[1:], groups[:-1], out=mask[1:])
+    return mask
+
+def _decode_key(key):
+    """Turn a packed ID or proprietary address back into a sentence ID."""
+    if key >> 40:
+        raw = (key & 0xFFFFFFFFFF).to_bytes(5, 'big')
+    else:
+        raw = key.to_bytes(3, 'big')
+    return raw.split(b',')[0].split(b'*')[0].decode('ascii', 'replace')
+
+def _add_keys(stats, new_keys):
+    """Insert unseen packed keys into the sorted key table of a LogStats."""
+    keys = np.union1d(stats._keys, new_keys)
+    entries = []
+    old = dict(zip(stats._keys.tolist(), stats._entries))
+    for key in keys.tolist():
+        entry = old.get(key)
+        if entry is None:
+            ID = _decode_key(key)
+            entry = stats.sentences.get(ID)
+            if entry is None:
+                entry = stats.sentences[ID] = SentenceLogStats()
+        entries.append(entry)
+    stats._keys = keys
+    stats._entries = entries
+
+def _process(stats, buf):
+    """Vectorized pass over one block of complete lines."""
+    ends = np.flatnonzero(buf == 10)
+    if not len(ends):
+        return
+    stats.lines += len(ends)
+
+    # Sentences normally start each line; logs with prefixes (timestamps,
+    # port tags) fall back to searching for the first '$' or '!' per line
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    lead = buf[np.minimum(starts, len(buf) - 1)]
+    if not ((lead == 36) | (lead == 33)).all():
+        starts = np.flatnonzero((buf == 36) | (buf == 33))
+        start_lines = np.searchsorted(ends, starts)
+        first = _first_per_group(start_lines)
+        starts = starts[first]
+        line_ends = ends[start_lines[first]]
+    else:
+        line_ends = ends
+
+    # Content ends before CR/LF; the wire length always counts a real CR/LF
+    content_end = line_ends - (buf[np.maximum(line_ends - 1, 0)] == 13)
+    valid = content_end - starts >= 7  # '$' + five address chars + one more
+    stats.malformed += len(ends) - int(valid.sum())
+    if not valid.all():
+        starts, content_end = starts[valid], content_end[valid]
+    if not len(starts):
+        return
+    wire_length = content_end - starts + 2
+
+    # The checksum is the last thing on the line: '*hh'
+    star = content_end - 3
+    has_checksum = (buf[star] == 42) & (star > starts)
+    star = np.where(has_checksum, star, starts + 2)
+    # XOR of every byte between '$' and '*', one segment per sentence
+    bounds = np.empty(2 * len(starts), dtype=np.int64)
+    bounds[0::2] = starts + 1
+    bounds[1::2] = star
+    computed = np.bitwise_xor.reduceat(buf, bounds)[0::2]
+    hi = _HEX[buf[star + 1]]
+    lo = _HEX[buf[star + 2]]
+    bad = has_checksum & ((hi == 255) | (lo == 255) | (computed != (hi << 4 | lo)))
+
+    # Sentence ID follows the two-letter talker; proprietary sentences
+    # ($P + manufacturer) keep their whole address field
+    key = (buf[starts + 3].astype(np.int64) << 16) | (buf[starts + 4].astype(np.int64) << 8) \
+        | buf[starts + 5]
+    proprietary = np.flatnonzero(buf[starts + 1] == 80)
+    if len(proprietary):
+        address = np.full(len(proprietary), 1, dtype=np.int64)
+        for k in range(1, 6):
+            address = (address << 8) | buf[starts[proprietary] + k]
+        key[proprietary] = address
+
+    # Map keys to rows of the per-ID table, growing it for unseen IDs
+    rows = np.searchsorted(stats._keys, key)
+    known = rows < len(stats._keys)
+    known[known] = stats._keys[rows[known]] == key[known]
+    if not known.all():
+        _add_keys(stats, np.unique(key[~known]))
+        rows = np.searchsorted(stats._keys, key)
+
+    size = len(stats._keys)
+    counts = np.bincount(rows, minlength=size)
+    byte_sums = np.bincount(rows, weights=wire_length, minlength=size)
+    errors = np.bincount(rows, weights=bad, minlength=size)
+    missing = np.bincount(rows, weights=~has_checksum, minlength=size)
+    lengths = np.minimum(wire_length, MAX_LENGTH)
+    width = int(lengths.max()) + 1
+    histogram = np.bincount(rows * width + lengths, minlength=size * width)
+
+    for row in np.flatnonzero(counts).tolist():
+        entry = stats._entries[row]
+        entry.count += int(counts[row])
+        entry.total_bytes += int(byte_sums[row])
+        entry.checksum_errors += int(errors[row])
+        entry.missing_checksum += int(missing[row])
+        bins = histogram[row * width:(row + 1) * width]
+        for length in np.flatnonzero(bins).tolist():
+            entry.histogram[length] += int(bins[length])
+
+    # Capture duration from the first and last time-stamped sentence
+    is_timed = key == _TIME_CODES[0]
+    for code in _TIME_CODES[1:]:
+        is_timed |= key == code
+    timed = np.flatnonzero(is_timed & ~bad)
+    for row in (timed[:1], timed[-1:]) if len(timed) > 1 else (timed,):
+        for index in row.tolist():
+            seconds = _parse_time(buf, int(starts[index]), int(content_end[index]))
+            if seconds is not None:
+                stats._add_time(seconds)
+
+def _parse_time(buf, start, end):
+    """Return seconds since midnight from the first field of a sentence."""
+    fields = buf[start:end].tobytes().split(b',')
+    try:
+        value = fields[1].split(b'*')[0]
+        hours, minutes, seconds = int(value[0:2]), int(value[2:4]), float(value[4:])
+    except (IndexError, ValueError):
+        return None
+    return hours * 3600 + minutes * 60 + seconds
+
+@nmea_metrics.instrumented('logstats.ingest')
+def ingest(path, chunk_size=CHUNK_SIZE, duration=None):
+    """Return LogStats for a capture file ('-' reads stdin)."""
+    stats = LogStats()
+    if path == '-':
+        stats.feed_file(sys.stdin.buffer, chunk_size)
+    else:
+        with open(path, 'rb') as f:
+            stats.feed_file(f, chunk_size)
+    if duration:
+        stats.duration = duration
+    return stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Measure per-sentence lengths, rates and checksum errors in NMEA captures")
+    parser.add_argument('paths', nargs='+', help="capture files ('-' for stdin)")
+    parser.add_argument('-o', '--output', help="write a JSON sizing profile")
+    parser.add_argument('-d', '--duration', type=float,
+                        help="capture length in seconds when the log has no GGA/RMC/ZDA/GBS times")
+    args = parser.parse_args(argv)
+
+    total = LogStats()
+    for path in args.paths:
+        total.merge(ingest(path))
+    if args.duration:
+        total.duration = args.duration
+
+    print(f"{total.lines} lines, {total.bytes_read} bytes, {total.malformed} malformed, "
+          f"{total.duration:.1f} s")
+    print(f"{'ID':<8}{'Count':>10}{'Min':>6}{'Mean':>8}{'Max':>6}{'Rate Hz':>10}{'Bad *hh':>9}")
+    for ID, entry in sorted(total.sentences.items()):
+        rate = total.rate(ID)
+        rate_text = f"{rate:.3f}" if rate is not None else '-'
+        print(f"{ID:<8}{entry.count:>10}{entry.min_length:>6}{entry.mean_length:>8.1f}"
+              f"{entry.max_length:>6}{rate_text:>10}{entry.checksum_errors:>9}")
+    if args.output:
+        total.save(args.output)
+        print(f"Profile written to {args.output}")
+
+if __name__ == "__main__":
+    main()
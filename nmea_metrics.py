@@ -0,0 +1,174 @@
+"""Opt-in timers and counters on the hot paths, and a cProfile switch.
+
+Hot functions are registered with @instrumented('database.lookup').
+Registering leaves the function as it is, so while metrics are off the
+calculators run exactly the code they always did. enable() swaps every
+registered function (in its module or class) for a wrapper that counts
+calls and adds up their time; functions registered after that are
+wrapped as they are defined. count() adds to a named counter and is
+meant for per-call totals (bytes ingested, rows drawn), behind an
+"if nmea_metrics.enabled" test at the call site.
+
+    with nmea_metrics.session(profile='run.prof', metrics='metrics.prom'):
+        ...
+
+writes cProfile output (pstats binary, or a text report for a .txt path)
+and the metrics (Prometheus text format for .prom, JSON otherwise; '-'
+for stdout) when the block ends. The front ends expose this as
+--profile FILE and --metrics FILE.
+
+Work done in worker processes (batch jobs, sweeps) is not counted.
+cProfile and pstats are only imported when a profile is asked for, so
+front ends that import this module do not pay for them at startup.
+"""
+
+import functools
+import json
+import sys
+import time
+from contextlib import contextmanager
+
+enabled = False
+
+# (module name, qualified name, metric name) of every registered function
+_registry = []
+# Metric name: [calls, total seconds, longest call in seconds]
+timers = {}
+counters = {}
+
+def _wrap(function, name):
+    entry = timers.setdefault(name, [0, 0.0, 0.0])
+    clock = time.perf_counter
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = clock()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            elapsed = clock() - start
+            entry[0] += 1
+            entry[1] += elapsed
+            if elapsed > entry[2]:
+                entry[2] = elapsed
+    wrapper._metric = name
+    return wrapper
+
+def instrumented(name):
+    """Register a function or method to be timed under name once enabled."""
+    def register(function):
+        _registry.append((function.__module__, function.__qualname__, name))
+        return _wrap(function, name) if enabled else function
+    return register
+
+def _owner(module_name, qualname):
+    owner = sys.modules.get(module_name)
+    parts = qualname.split('.')
+    for part in parts[:-1]:
+        owner = getattr(owner, part, None)
+    return owner, parts[-1]
+
+def enable():
+    """Start timing every registered function."""
+    global enabled
+    enabled = True
+    for module_name, qualname, name in _registry:
+        owner, attribute = _owner(module_name, qualname)
+        function = getattr(owner, '__dict__', {}).get(attribute)
+        if callable(function) and not hasattr(function, '_metric'):
+            setattr(owner, attribute, _wrap(function, name))
+
+def disable():
+    """Put the registered functions back."""
+    global enabled
+    enabled = False
+    for module_name, qualname, name in _registry:
+        owner, attribute = _owner(module_name, qualname)
+        function = getattr(owner, '__dict__', {}).get(attribute)
+        if hasattr(function, '_metric'):
+            setattr(owner, attribute, function.__wrapped__)
+
+def count(name, amount=1):
+    """Add to a counter (call only when enabled)."""
+    counters[name] = counters.get(name, 0) + amount
+
+def reset():
+    for entry in timers.values():
+        entry[:] = [0, 0.0, 0.0]
+    counters.clear()
+
+def _called():
+    return sorted((name, entry) for name, entry in timers.items() if entry[0])
+
+def snapshot():
+    """Return the timers that ran and the counters as a JSON-serializable dict."""
+    return {
+        'timers': {name: {'calls': calls, 'seconds': total, 'max_seconds': longest,
+                          'mean_seconds': total / calls}
+                   for name, (calls, total, longest) in _called()},
+        'counters': dict(sorted(counters.items())),
+    }
+
+def prometheus():
+    """Return the timers and counters in the Prometheus text exposition format."""
+    lines = ["# HELP nmea_call_seconds Time spent in instrumented calls.",
+             "# TYPE nmea_call_seconds summary"]
+    for name, (calls, total, _) in _called():
+        lines.append(f'nmea_call_seconds_count{{path="{name}"}} {calls}')
+        lines.append(f'nmea_call_seconds_sum{{path="{name}"}} {total:.9f}')
+    lines += ["# HELP nmea_call_seconds_max Longest instrumented call.",
+              "# TYPE nmea_call_seconds_max gauge"]
+    for name, (_, _, longest) in _called():
+        lines.append(f'nmea_call_seconds_max{{path="{name}"}} {longest:.9f}')
+    lines += ["# HELP nmea_events_total Instrumented counters.",
+              "# TYPE nmea_events_total counter"]
+    for name, value in sorted(counters.items()):
+        lines.append(f'nmea_events_total{{name="{name}"}} {value}')
+    return '\n'.join(lines) + '\n'
+
+def write_metrics(path):
+    """Write the metrics to a file: Prometheus text for .prom, else JSON."""
+    if str(path).endswith('.prom'):
+        text = prometheus()
+    else:
+        text = json.dumps(snapshot(), indent=2) + '\n'
+    if str(path) == '-':
+        sys.stdout.write(text)
+    else:
+        with open(path, 'w') as f:
+            f.write(text)
+
+def write_profile(profiler, path, limit=40):
+    """Write cProfile results: a text report for .txt, pstats binary otherwise."""
+    if str(path).endswith('.txt'):
+        import pstats
+        with open(path, 'w') as f:
+            pstats.Stats(profiler, stream=f).sort_stats('cumulative').print_stats(limit)
+    else:
+        profiler.dump_stats(path)
+
+@contextmanager
+def session(profile=None, metrics=None):
+    """Profile and/or collect metrics for the duration of a block."""
+    if metrics:
+        enable()
+    profiler = None
+    if profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+            write_profile(profiler, profile)
+        if metrics:
+            write_metrics(metrics)
+
+def add_arguments(parser):
+    """Add --profile and --metrics to an argparse parser."""
+    parser.add_argument('--profile', metavar='FILE',
+                        help="write cProfile output (.txt for a text report)")
+    parser.add_argument('--metrics', metavar='FILE',
+                        help="write timers and counters (.prom for Prometheus text, else JSON)")
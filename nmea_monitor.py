@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""Live monitor of NMEA 0183 traffic with measured and predicted utilization.
+
+    python nmea_monitor.py /dev/ttyUSB0 -b 460800     serial port or PTY
+    python nmea_monitor.py udp:10110                  UDP datagrams
+    some_talker | python nmea_monitor.py -            stdin
+
+Input is read with non-blocking asyncio I/O (a reader callback on the file
+descriptor, or a datagram endpoint for UDP), so the monitor drains the
+device as fast as bytes arrive and the display never holds up reading.
+Serial ports are switched to raw mode at the given baud rate and framing
+(data bits, parity and stop bits); PTYs and pipes are read as they are.
+
+Every received line is framed, its checksum verified, and counted against
+its sentence ID in a rolling window. Each refresh shows the measured
+utilization of the line (all bytes received, at the link's framing) next
+to the figure the calculators predict for the same mix: the sentences
+seen, at their measured rates, sized from the database.
+
+A PTY pair makes a loopback for testing, e.g.
+
+    socat -d -d pty,raw,echo=0 pty,raw,echo=0
+    python nmea_monitor.py /dev/pts/3 &  cat capture.nmea > /dev/pts/4
+
+(benchmarks/bench_monitor.py does the same with os.openpty()).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import deque, namedtuple
+
+import nmea_database
+import nmea_link
+import nmea_schedule
+
+DEFAULT_WINDOW = 10.0
+READ_SIZE = 65536
+# A line longer than this without a terminator is dropped as noise
+MAX_LINE = 4096
+
+SentenceRate = namedtuple('SentenceRate', ['id', 'count', 'rate', 'bytes_per_second',
+                                           'mean_length', 'checksum_errors'])
+SentenceRate.__doc__ = """Rolling figures for one sentence ID."""
+
+Snapshot = namedtuple('Snapshot', [
+    'elapsed', 'window', 'bytes_per_second', 'measured', 'predicted', 'sentences',
+    'total_bytes', 'total_sentences', 'checksum_errors', 'missing_checksum', 'noise_bytes'])
+Snapshot.__doc__ = """Monitor state: measured and predicted utilization in percent."""
+
+def checksum(body):
+    """Return the XOR checksum of the bytes between '$' or '!' and '*'."""
+    value = 0
+    for byte in body:
+        value ^= byte
+    return value
+
+def sentence_id(address):
+    """Return the ID counted for an address field: GPGGA -> GGA, PGRME as is."""
+    if address[:1] == 'P':
+        return address
+    return address[2:]
+
+class Monitor:
+    """Frames a byte stream into sentences and keeps rolling counters."""
+
+    def __init__(self, database, link, window=DEFAULT_WINDOW):
+        self.database = database
+        self.link = nmea_link.link_model(link)
+        self.window = window
+        self.started = None
+        self.partial = b''
+        self.total_bytes = 0
+        self.total_sentences = 0
+        self.checksum_errors = 0
+        self.missing_checksum = 0
+        self.noise_bytes = 0
+        self.errors = {}
+        # Per ID: deque of (time, length); per chunk: deque of (time, bytes)
+        self.seen = {}
+        self.chunks = deque()
+
+    def feed(self, data, now=None):
+        """Count a block of received bytes."""
+        if now is None:
+            now = time.monotonic()
+        if self.started is None:
+            self.started = now
+        self.total_bytes += len(data)
+        self.chunks.append((now, len(data)))
+
+        lines = (self.partial + data).split(b'\n')
+        self.partial = lines.pop()
+        if len(self.partial) > MAX_LINE:
+            self.noise_bytes += len(self.partial)
+            self.partial = b''
+        for line in lines:
+            self._line(line.rstrip(b'\r'), now)
+
+    def _line(self, line, now):
+        if not line or line[0] not in b'$!':
+            self.noise_bytes += len(line) + 1
+            return
+        star = len(line) - 3
+        if star > 0 and line[star] == 0x2A:  # '*'
+            content = line[1:star]
+            try:
+                valid = int(line[star + 1:], 16) == checksum(content)
+            except ValueError:
+                valid = False
+        else:
+            star = line.find(b'*')
+            content = line[1:star] if star > 0 else line[1:]
+            valid = None
+        address = content.split(b',', 1)[0].decode('ascii', 'replace')
+        ID = sentence_id(address)
+        if valid is None:
+            self.missing_checksum += 1
+        elif not valid:
+            self.checksum_errors += 1
+            self.errors[ID] = self.errors.get(ID, 0) + 1
+        self.total_sentences += 1
+        # Counted on the wire with a real CR/LF, as nmea_logstats does
+        self.seen.setdefault(ID, deque()).append((now, len(line) + 2))
+
+    def _expire(self, now):
+        cutoff = now - self.window
+        while self.chunks and self.chunks[0][0] < cutoff:
+            self.chunks.popleft()
+        for entries in self.seen.values():
+            while entries and entries[0][0] < cutoff:
+                entries.popleft()
+
+    def snapshot(self, now=None):
+        """Return the rolling figures over the last window seconds."""
+        if now is None:
+            now = time.monotonic()
+        self._expire(now)
+        elapsed = 0.0 if self.started is None else now - self.started
+        span = min(self.window, elapsed) or 1.0
+
+        sentences = []
+        streams = []
+        for ID, entries in sorted(self.seen.items()):
+            if not entries:
+                continue
+            count = len(entries)
+            total = sum(length for _, length in entries)
+            rate = count / span
+            sentences.append(SentenceRate(ID, count, rate, total / span, total / count,
+                                          self.errors.get(ID, 0)))
+            try:
+                length = self.database.wire_lengths(ID)[1]
+            except KeyError:
+                length = round(total / count)  # Not in the database: as measured
+            streams.append(nmea_schedule.Stream(ID, length, rate))
+
+        received = sum(size for _, size in self.chunks) / span
+        return Snapshot(
+            elapsed=elapsed, window=span, bytes_per_second=received,
+            measured=received * self.link.seconds_per_byte * 100,
+            predicted=self.link.utilization(streams), sentences=sentences,
+            total_bytes=self.total_bytes, total_sentences=self.total_sentences,
+            checksum_errors=self.checksum_errors, missing_checksum=self.missing_checksum,
+            noise_bytes=self.noise_bytes)
+
+def configure_serial(fd, link):
+    """Put a serial port into raw mode at a link's baud rate and framing
+    (POSIX only). link is a baud rate, '4800 7E1' string or LinkProfile."""
+    import termios
+    import tty
+    profile = nmea_link.link_model(link).profile
+    speed = getattr(termios, f'B{int(profile.baud)}', None)
+    if speed is None or profile.baud != int(profile.baud):
+        raise ValueError(f"Baud rate {profile.baud} is not supported by this system")
+    framing = nmea_link.framing_of(profile)
+    cflag = getattr(termios, f'CS{profile.data_bits}')
+    if profile.parity in 'EO':
+        cflag |= termios.PARENB | (termios.PARODD if profile.parity == 'O' else 0)
+    elif profile.parity in 'MS':
+        # Mark and space parity need the (Linux) sticky parity flag
+        sticky = getattr(termios, 'CMSPAR', None)
+        if sticky is None:
+            raise ValueError(f"Framing {framing} is not supported by this system")
+        cflag |= termios.PARENB | sticky | (termios.PARODD if profile.parity == 'M' else 0)
+    # CSTOPB means two stop bits, or one and a half with five data bits
+    if profile.stop_bits == (1.5 if profile.data_bits == 5 else 2):
+        cflag |= termios.CSTOPB
+    elif profile.stop_bits != 1:
+        raise ValueError(f"Framing {framing} is not supported by this system")
+    tty.setraw(fd)
+    attrs = termios.tcgetattr(fd)
+    mask = (termios.CSIZE | termios.PARENB | termios.PARODD | termios.CSTOPB
+            | getattr(termios, 'CMSPAR', 0))
+    attrs[2] = (attrs[2] & ~mask) | cflag
+    attrs[4] = attrs[5] = speed
+    termios.tcsetattr(fd, termios.TCSANOW, attrs)
+
+async def read_fd(fd, monitor, done):
+    """Feed everything readable from a file descriptor until end of input."""
+    loop = asyncio.get_running_loop()
+
+    def readable():
+        try:
+            while True:
+                data = os.read(fd, READ_SIZE)
+                if not data:
+                    break
+                monitor.feed(data)
+            # Closed: a pipe or file has ended
+            loop.remove_reader(fd)
+            done.set()
+        except BlockingIOError:
+            pass
+        except OSError:
+            # EIO: the other end of a PTY was closed
+            loop.remove_reader(fd)
+            done.set()
+
+    os.set_blocking(fd, False)
+    try:
+        loop.add_reader(fd, readable)
+    except PermissionError:
+        # Regular files cannot be polled; they are always readable
+        while True:
+            data = os.read(fd, READ_SIZE)
+            if not data:
+                break
+            monitor.feed(data)
+            await asyncio.sleep(0)
+        done.set()
+    await done.wait()
+
+class _Datagrams(asyncio.DatagramProtocol):
+    def __init__(self, monitor):
+        self.monitor = monitor
+
+    def datagram_received(self, data, addr):
+        if not data.endswith(b'\n'):
+            data += b'\r\n'  # One sentence per datagram without a terminator
+        self.monitor.feed(data)
+
+async def read_udp(host, port, monitor, done):
+    """Feed UDP datagrams until done is set."""
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(
+        lambda: _Datagrams(monitor), local_addr=(host, port))
+    try:
+        await done.wait()
+    finally:
+        transport.close()
+
+def open_source(source, monitor, link, done):
+    """Return the reading coroutine for a source string."""
+    if source == '-':
+        return read_fd(sys.stdin.fileno(), monitor, done)
+    if source.startswith('udp:'):
+        parts = source[4:].rsplit(':', 1)
+        host, port = (parts[0], parts[1]) if len(parts) == 2 else ('0.0.0.0', parts[0])
+        return read_udp(host, int(port), monitor, done)
+    fd = os.open(source, os.O_RDONLY | os.O_NONBLOCK | getattr(os, 'O_NOCTTY', 0))
+    if os.isatty(fd) and link:
+        try:
+            configure_serial(fd, link)
+        except Exception:
+            os.close(fd)
+            raise
+    return read_fd(fd, monitor, done)
+
+def format_snapshot(snapshot, link):
+    """Return the monitor display as text."""
+    lines = [f"Link: {nmea_link.describe(link.profile)}   "
+             f"Running {snapshot.elapsed:.0f}s, {snapshot.window:.0f}s window",
+             f"Measured utilization:  {snapshot.measured:6.1f}%  "
+             f"({snapshot.bytes_per_second:.0f} bytes/s)",
+             f"Predicted utilization: {snapshot.predicted:6.1f}%  "
+             f"(same mix at database lengths)",
+             f"Sentences: {snapshot.total_sentences}   Checksum errors: "
+             f"{snapshot.checksum_errors}   No checksum: {snapshot.missing_checksum}   "
+             f"Noise: {snapshot.noise_bytes} bytes",
+             "",
+             f"{'ID':<8}{'Rate Hz':>10}{'Bytes/s':>10}{'Mean':>8}{'Bad *hh':>9}"]
+    for entry in snapshot.sentences:
+        lines.append(f"{entry.id:<8}{entry.rate:>10.2f}{entry.bytes_per_second:>10.1f}"
+                     f"{entry.mean_length:>8.1f}{entry.checksum_errors:>9}")
+    return '\n'.join(lines)
+
+def snapshot_dict(snapshot):
+    data = snapshot._asdict()
+    data['sentences'] = [entry._asdict() for entry in snapshot.sentences]
+    return data
+
+async def run(source, monitor, link=None, interval=1.0, duration=None, as_json=False):
+    """Read a source and print the monitor every interval seconds until it ends."""
+    done = asyncio.Event()
+    reader = asyncio.ensure_future(open_source(source, monitor, link, done))
+    stop_at = None if duration is None else time.monotonic() + duration
+
+    def show():
+        snapshot = monitor.snapshot()
+        if as_json:
+            print(json.dumps(snapshot_dict(snapshot)), flush=True)
+        else:
+            # ANSI clear and home, as the console calculator does
+            print('\033[2J\033[H' + format_snapshot(snapshot, monitor.link), flush=True)
+
+    try:
+        while not done.is_set():
+            try:
+                await asyncio.wait_for(done.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+            if stop_at is not None and time.monotonic() >= stop_at:
+                done.set()
+            show()
+        await reader
+    finally:
+        reader.cancel()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Monitor live NMEA traffic and compare measured with predicted utilization")
+    parser.add_argument('source', help="serial device or PTY, 'udp:[HOST:]PORT', or '-' for stdin")
+    parser.add_argument('-b', '--baud', type=int, default=4800, help="line baud rate")
+    parser.add_argument('-f', '--framing', default=nmea_link.DEFAULT_FRAMING,
+                        help="character framing, e.g. 8N1 or 7E1")
+    parser.add_argument('-w', '--window', type=float, default=DEFAULT_WINDOW,
+                        help="seconds of traffic the rolling figures cover")
+    parser.add_argument('-i', '--interval', type=float, default=1.0, help="seconds between refreshes")
+    parser.add_argument('-d', '--duration', type=float, help="stop after this many seconds")
+    parser.add_argument('--json', action='store_true', help="print one JSON object per refresh")
+    args = parser.parse_args(argv)
+
+    try:
+        link = nmea_link.make_profile(args.baud, args.framing)
+        monitor = Monitor(nmea_database.load_database(), link, args.window)
+        asyncio.run(run(args.source, monitor, link, args.interval, args.duration, args.json))
+    except KeyboardInterrupt:
+        pass
+    except (OSError, ValueError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""Named mix presets and a persistent cache of computed results.
+
+Presets are kept in presets.json next to config.json, by name, in the
+batch job format (see nmea_jobs), so a preset can be copied into a job
+file as it is:
+
+    {"presets": {"autopilot": {"sentences": ["APB", "HDT@10", "RMC"],
+                               "rate": 1, "link": "4800 8N1"}}}
+
+ResultCache keeps the calculators' figures (nmea_schedule.Usage) for the
+mixes evaluated in earlier sessions, in __pycache__ next to the compiled
+database. Entries are keyed by the canonical mix (sorted sentence IDs
+with their lengths and rates) and every field of the link profile, and
+the file records the digest of the database they were computed from: a
+changed database or catalog starts an empty cache. The least recently
+used entries are dropped beyond the size limit.
+"""
+
+import json
+import os
+from collections import OrderedDict
+from pathlib import Path
+
+import nmea_database
+import nmea_link
+import nmea_metrics
+import nmea_schedule
+
+PRESETS_PATH = Path(__file__).parent / 'presets.json'
+RESULTS_PATH = Path(__file__).parent / '__pycache__' / 'nmea_results.json'
+# Results kept between sessions
+RESULTS_SIZE = 1000
+
+def _write_json(path, data, indent=4):
+    """Atomically replace a JSON file."""
+    path = Path(path)
+    path.parent.mkdir(exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=indent)
+    os.replace(tmp_path, path)
+
+def load_presets(path=PRESETS_PATH):
+    """Return {name: preset} from a presets file, empty when there is none."""
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    presets = data.get('presets', {}) if isinstance(data, dict) else None
+    if not isinstance(presets, dict):
+        raise ValueError(f"{path} must hold a \"presets\" object")
+    return presets
+
+def save_preset(name, preset, path=PRESETS_PATH):
+    """Add or replace a named preset."""
+    presets = load_presets(path)
+    presets[name] = preset
+    _write_json(path, {'presets': dict(sorted(presets.items()))})
+
+def delete_preset(name, path=PRESETS_PATH):
+    """Remove a named preset; returns False when there was none."""
+    presets = load_presets(path)
+    if presets.pop(name, None) is None:
+        return False
+    _write_json(path, {'presets': presets})
+    return True
+
+def make_preset(sentences, default_rate, link):
+    """Return a preset for (ID, rate or None) pairs at a default rate on a link."""
+    profile = nmea_link.link_model(link).profile
+    preset = {'sentences': [ID if rate is None else f"{ID}@{rate:g}" for ID, rate in sentences],
+              'rate': default_rate,
+              'link': f"{profile.baud} {nmea_link.framing_of(profile)}"}
+    for key in ('char_gap', 'sentence_gap', 'fifo_depth', 'refill_latency'):
+        if getattr(profile, key):
+            preset[key] = getattr(profile, key)
+    return preset
+
+def preset_mix(preset):
+    """Return (link profile, default rate, [(ID, rate or None)]) of a preset."""
+    default_rate = nmea_schedule.check_rate(preset.get('rate', 1))
+    sentences = []
+    for entry in preset.get('sentences', []):
+        if isinstance(entry, dict):
+            ID, rate = entry['id'], entry.get('rate')
+            if rate is not None:
+                rate = nmea_schedule.check_rate(rate, f"{ID}@{rate}")
+        else:
+            ID, rate = nmea_schedule.parse_rate(str(entry))
+        sentences.append((ID.strip().upper(), rate))
+    return nmea_link.profile_from_dict(preset), default_rate, sentences
+
+class ResultCache:
+    """Usage of previously evaluated mixes, saved between sessions."""
+
+    def __init__(self, database, path=RESULTS_PATH, size=RESULTS_SIZE):
+        self.database = database
+        self.path = Path(path)
+        self.size = size
+        self.digest = nmea_database.database_digest(database)
+        self.entries = OrderedDict()
+        self.hits = self.misses = 0
+        self.dirty = False
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            if data.get('database') == self.digest:
+                self.entries.update(data.get('entries', {}))
+        except (OSError, ValueError, AttributeError):
+            pass  # Missing or unreadable: start empty
+
+    @staticmethod
+    def key(streams, link):
+        """Return the canonical key of a mix on a link."""
+        profile = nmea_link.link_model(link).profile
+        mix = sorted((stream.id, stream.length, stream.rate) for stream in streams)
+        return json.dumps([mix, list(profile)], separators=(',', ':'))
+
+    @nmea_metrics.instrumented('presets.usage')
+    def usage(self, streams, link):
+        """Return the nmea_schedule.Usage of a mix, from the cache when known."""
+        key = self.key(streams, link)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return nmea_schedule.Usage(*entry)
+        self.misses += 1
+        usage = nmea_schedule.mix_usage(streams, self.database.wire_lengths, link)
+        self.entries[key] = list(usage)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+        self.dirty = True
+        return usage
+
+    def clear(self):
+        self.entries.clear()
+        self.dirty = True
+
+    def save(self):
+        """Write the cache if it changed; failures leave the old file alone."""
+        if not self.dirty:
+            return
+        try:
+            _write_json(self.path, {'database': self.digest, 'entries': self.entries},
+                        indent=None)
+            self.dirty = False
+        except OSError:
+            pass
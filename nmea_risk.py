@@ -0,0 +1,248 @@
+"""Monte Carlo overload risk: how often a window of the line is overbooked.
+
+The calculators' utilization is a long-run mean. Over a short window a
+line can still be asked for more than it carries: null and variable-width
+fields (x.x, c--c) change a sentence's length from one transmission to
+the next, and talkers with free-running transmit clocks drift in and out
+of phase, so now and then their sentences bunch up. Each trial here is
+one window of the line, and samples both:
+
+    lengths   every transmission's length is drawn from its sentence's
+              distribution (nmea_fields.length_distribution)
+    phases    every stream's first release in the window is uniform over
+              its period (independent clocks); with shared_clock the mix
+              keeps its offsets and only the window's start is drawn
+    drift     every stream's rate is off by up to drift_ppm, as from its
+              talker's crystal (one error for the mix with shared_clock)
+
+The airtime released in the window divided by the window is the trial's
+utilization; a trial above 100% is an overload. Streams whose length is
+not the template's typical length (measured sizes, AIS fragments) and
+encapsulated (!) sentences keep their length.
+
+On links where the airtime of several sentences is the airtime of their
+total length (no FIFO refill stalls), a stream's bytes in a window are
+drawn in one go from the exact distribution of the sum of that many
+lengths (the length distribution convolved with itself), rather than one
+draw per sentence.
+
+Trials run in NumPy batches of BATCH_TRIALS. Batch n always draws from
+child n of the seed's SeedSequence, so a run gives the same result on
+any number of worker processes; runs of PARALLEL_THRESHOLD trials or
+more spread the batches over a process pool.
+"""
+
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import nmea_fields
+import nmea_link
+import nmea_metrics
+import nmea_schedule
+
+WINDOW = 1.0
+NULL_RATE = 0.05
+DRIFT_PPM = 100.0
+TRIALS = 1_000_000
+BATCH_TRIALS = 65536
+# Below this many trials a process pool costs more than it saves
+PARALLEL_THRESHOLD = 4_000_000
+# Histogram of window utilization: bin width and last bin, in percent
+BIN_WIDTH = 0.1
+HISTOGRAM_TOP = 400.0
+PERCENTILES = (50, 90, 99, 99.9, 99.99)
+
+Risk = namedtuple('Risk', ['trials', 'window', 'expected', 'mean', 'std', 'peak',
+                           'percentiles', 'overloads', 'overload_probability',
+                           'overload_upper', 'histogram'])
+Risk.__doc__ = """Distribution of the utilization of one window, in percent.
+
+expected is the long-run utilization at mean lengths; percentiles maps
+each of PERCENTILES to its value (to BIN_WIDTH). overloads counts the
+trials above 100%, overload_upper is the 95% upper bound of their
+probability, and histogram holds the trials per BIN_WIDTH bin from 0 (the
+last bin also counts everything above HISTOGRAM_TOP).
+"""
+
+class OverloadModel:
+    """A mix compiled for sampling: rates, offsets and length distributions."""
+
+    def __init__(self, streams, database, link, window=WINDOW, null_rate=NULL_RATE,
+                 drift_ppm=DRIFT_PPM, shared_clock=False):
+        streams = list(streams)
+        if not streams:
+            raise ValueError("No sentences to sample")
+        if window <= 0 or not 0 <= null_rate < 1 or drift_ppm < 0:
+            raise ValueError("Window must be positive, null rate from 0 to 1 "
+                             "and drift not negative")
+        model = nmea_link.link_model(link)
+        self.window = float(window)
+        self.drift = drift_ppm * 1e-6
+        self.shared_clock = shared_clock
+        self.rates = np.array([stream.rate for stream in streams], dtype=np.float64)
+        self.offsets = np.array([stream.offset % (1.0 / stream.rate) for stream in streams])
+        self.horizon = float(nmea_schedule.hyperperiod(stream.rate for stream in streams))
+        # Most releases a stream can have in a window, with drift
+        self.most = [int(np.ceil(self.window * rate * (1 + self.drift))) + 1
+                     for rate in self.rates]
+        profile = model.profile
+        self.additive = not (profile.fifo_depth and profile.refill_latency)
+        airtimes = np.array([model.airtime(n)
+                             for n in range(nmea_fields.MAX_SENTENCE_LENGTH + 1)])
+        distributions = {}
+        # Per stream: a fixed airtime, or per release count the (cumulative
+        # probabilities, airtimes) of the stream's total, or with a link
+        # that is not additive those of one sentence
+        self.lengths = []
+        expected = 0.0
+        for stream, most in zip(streams, self.most):
+            sentence = database[stream.id]
+            typical = database.wire_lengths(stream.id)[1]
+            if stream.length != typical or sentence['sentence_structure'].startswith('!'):
+                airtime = model.airtime(stream.length)
+                self.lengths.append(airtime)
+                expected += stream.rate * airtime
+                continue
+            key = (stream.id, most)
+            if key not in distributions:
+                pmf = np.array(nmea_fields.length_distribution(sentence, null_rate))
+                expected_airtime = float(pmf @ airtimes)
+                if self.additive:
+                    table = _sum_tables(pmf, most, model.seconds_per_byte,
+                                        profile.sentence_gap)
+                else:
+                    table = _table(pmf, airtimes)
+                distributions[key] = (table, expected_airtime)
+            table, expected_airtime = distributions[key]
+            self.lengths.append(table)
+            expected += stream.rate * expected_airtime
+        self.expected = expected * 100
+
+    def phases(self, rng, trials):
+        """Return (trials, streams) periods and first release times in the window."""
+        count = len(self.rates)
+        if self.shared_clock:
+            error = 1 + self.drift * rng.uniform(-1, 1, (trials, 1))
+            periods = 1.0 / (self.rates * error)
+            start = rng.random((trials, 1)) * self.horizon
+            phases = np.mod(self.offsets - start, periods)
+        else:
+            error = 1 + self.drift * rng.uniform(-1, 1, (trials, count))
+            periods = 1.0 / (self.rates * error)
+            phases = rng.random((trials, count)) * periods
+        return periods, phases
+
+    def sample(self, trials, seed):
+        """Return the utilization of trials windows, in percent."""
+        rng = np.random.default_rng(seed)
+        periods, phases = self.phases(rng, trials)
+        releases = np.maximum(0.0, np.ceil((self.window - phases) / periods)).astype(np.int64)
+        busy = np.zeros(trials)
+        for i, lengths in enumerate(self.lengths):
+            count = releases[:, i]
+            if not isinstance(lengths, (list, tuple)):
+                busy += count * lengths
+            elif self.additive:
+                # One draw per trial from the total of its number of releases
+                for releases_in_window in np.unique(count):
+                    if releases_in_window:
+                        chosen = np.flatnonzero(count == releases_in_window)
+                        busy[chosen] += _draw(lengths[releases_in_window], rng, len(chosen))
+            else:
+                most = self.most[i]
+                airtime = _draw(lengths, rng, (trials, most))
+                airtime[np.arange(most) >= count[:, None]] = 0.0
+                busy += airtime.sum(axis=1)
+        return busy * (100.0 / self.window)
+
+    def batch(self, trials, seed):
+        """Return the summary of one batch: (histogram, sum, sum of squares,
+        overloads, peak)."""
+        usage = self.sample(trials, seed)
+        bins = int(round(HISTOGRAM_TOP / BIN_WIDTH)) + 1
+        index = np.minimum((usage / BIN_WIDTH).astype(np.int64), bins - 1)
+        return (np.bincount(index, minlength=bins), float(usage.sum()),
+                float(usage @ usage), int(np.count_nonzero(usage > 100.0)),
+                float(usage.max()))
+
+def _table(pmf, values):
+    """Return the (cumulative probabilities, values) of a distribution's support."""
+    support = np.flatnonzero(pmf)
+    return np.cumsum(pmf[support]), values[support]
+
+def _sum_tables(pmf, most, seconds_per_byte, sentence_gap):
+    """Return the table of the airtime of the total length of 0..most sentences."""
+    tables = [(np.ones(1), np.zeros(1))]
+    total = np.ones(1)
+    for count in range(1, most + 1):
+        total = np.convolve(total, pmf)
+        total[total < 1e-300] = 0.0
+        lengths = np.arange(len(total))
+        tables.append(_table(total, lengths * seconds_per_byte + count * sentence_gap))
+    return tables
+
+def _draw(table, rng, shape):
+    """Draw values from a (cumulative probabilities, values) table."""
+    cdf, values = table
+    index = np.searchsorted(cdf, rng.random(shape) * cdf[-1], side='right')
+    return values[np.minimum(index, len(values) - 1)]
+
+_model = None
+
+def _init_worker(model):
+    global _model
+    _model = model
+
+def _run_batch(args):
+    trials, seed = args
+    return _model.batch(trials, seed)
+
+def _batches(trials, seed):
+    children = np.random.SeedSequence(seed).spawn(-(-trials // BATCH_TRIALS))
+    return [(min(BATCH_TRIALS, trials - n * BATCH_TRIALS), child)
+            for n, child in enumerate(children)]
+
+@nmea_metrics.instrumented('risk.overload')
+def overload_risk(streams, database, link, trials=TRIALS, window=WINDOW, null_rate=NULL_RATE,
+                  drift_ppm=DRIFT_PPM, shared_clock=False, seed=0, workers=None):
+    """Sample trials windows of a mix on a link and return its Risk."""
+    if trials < 1:
+        raise ValueError("At least one trial is needed")
+    model = OverloadModel(streams, database, link, window, null_rate, drift_ppm, shared_clock)
+    batches = _batches(int(trials), seed)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or trials < PARALLEL_THRESHOLD or len(batches) < 2:
+        parts = [model.batch(*batch) for batch in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(model,)) as pool:
+            parts = list(pool.map(_run_batch, batches))
+    if nmea_metrics.enabled:
+        nmea_metrics.count('risk.trials', int(trials))
+
+    histogram = sum(part[0] for part in parts)
+    total = sum(part[1] for part in parts)
+    squares = sum(part[2] for part in parts)
+    overloads = sum(part[3] for part in parts)
+    mean = total / trials
+    cumulative = np.cumsum(histogram)
+    percentiles = {q: round((int(np.searchsorted(cumulative, q / 100 * trials)) + 1) * BIN_WIDTH, 6)
+                   for q in PERCENTILES}
+    probability = overloads / trials
+    if overloads:
+        upper = probability + 1.96 * np.sqrt(probability * (1 - probability) / trials)
+    else:
+        upper = 3.0 / trials  # Rule of three
+    return Risk(trials=int(trials), window=model.window, expected=model.expected, mean=mean,
+                std=float(np.sqrt(max(0.0, squares / trials - mean * mean))),
+                peak=max(part[4] for part in parts), percentiles=percentiles,
+                overloads=overloads, overload_probability=probability,
+                overload_upper=float(min(1.0, upper)), histogram=histogram)
+
+def overloads_per_hour(risk):
+    """Return the expected overloaded windows in an hour of back-to-back windows."""
+    return risk.overload_probability * 3600.0 / risk.window
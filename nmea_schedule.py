@@ -0,0 +1,288 @@
+"""Per-sentence update rates and a serial-line timeline simulator.
+
+A mix is a list of streams, each sentence carrying its own rate (GGA at
+10 Hz, RMC at 1 Hz, GSV at 0.2 Hz ...). average_utilization() gives the
+long-run figure the calculators show; simulate() lays every transmission
+out on the wire over the hyperperiod (the least common multiple of the
+sentence periods) and reports bursts, queueing latency and idle gaps.
+
+The simulator is event driven: it walks the merged release times of all
+streams in order, so its cost depends on the number of transmissions in
+the hyperperiod, not on its length in time.
+
+Wherever a baud rate is taken, a link profile can be given instead (see
+nmea_link); a plain baud rate means 8N1.
+"""
+
+import heapq
+from collections import namedtuple
+from fractions import Fraction
+from math import ceil, gcd
+
+import nmea_metrics
+from nmea_link import link_model
+
+BITS_PER_BYTE = 10  # 8N1: start + 8 data + stop
+
+# Upper bound on transmissions simulated per run
+MAX_EVENTS = 5_000_000
+# Utilization (percent) above which the calculators caution and warn
+HIGH_UTILIZATION = 80.0
+OVER_UTILIZATION = 100.0
+# Encapsulated (!) sentences: their streams are AIS fragments of known length
+# (nmea_ais), not templates whose fields may be null or wider
+EXACT_LENGTH_IDS = frozenset({'VDM', 'VDO'})
+
+Stream = namedtuple('Stream', ['id', 'length', 'rate', 'offset'], defaults=[0.0])
+Stream.__doc__ = """A sentence sent repeatedly: length in bytes, rate in Hz, offset in seconds."""
+
+def check_rate(rate, text=None):
+    """Return a rate in Hz as a float, raising ValueError unless it is a
+    positive number. text is what it was read from, for the message."""
+    text = rate if text is None else text
+    try:
+        rate = float(rate)
+    except (TypeError, ValueError):
+        raise ValueError(f"Update rate must be a number: {text}") from None
+    if not rate > 0:
+        raise ValueError(f"Update rate must be positive: {text}")
+    return rate
+
+def parse_rate(text):
+    """Parse 'GGA@10' style input into (ID, rate in Hz or None)."""
+    ID, sep, rate = text.partition('@')
+    if not sep:
+        return ID, None
+    return ID, check_rate(rate, text)
+
+def period_of(rate):
+    """Return the period of a rate in Hz as an exact Fraction of a second."""
+    return Fraction(1) / Fraction(rate).limit_denominator(1_000_000)
+
+def hyperperiod(rates):
+    """Return the least common multiple of the periods of the given rates."""
+    result = None
+    for rate in rates:
+        period = period_of(rate)
+        if result is None:
+            result = period
+        else:
+            num = result.numerator * period.numerator // gcd(result.numerator, period.numerator)
+            den = gcd(result.denominator, period.denominator)
+            result = Fraction(num, den)
+    return result
+
+def bytes_per_second(streams):
+    """Return the average byte load of a list of streams."""
+    return sum(stream.length * stream.rate for stream in streams)
+
+def average_utilization(streams, link, bits_per_byte=BITS_PER_BYTE):
+    """Return the long-run link utilization of a list of streams in percent."""
+    return link_model(link, bits_per_byte).utilization(streams)
+
+@nmea_metrics.instrumented('calc.utilization_range')
+def utilization_range(streams, wire_lengths, link, bits_per_byte=BITS_PER_BYTE):
+    """Return (best, expected, worst) utilization of a list of streams in percent.
+
+    wire_lengths(ID) returns (min, typical, max) bytes for a sentence, such
+    as SentenceTable.wire_lengths. Expected uses each stream's own length so
+    measured sizes carry through. A stream whose length is not the typical
+    one (a measured size) or that is an AIS fragment is exact and bounds
+    itself, as in nmea_risk.
+    """
+    model = link_model(link, bits_per_byte)
+    best = expected = worst = 0.0
+    for stream in streams:
+        minimum, typical, maximum = wire_lengths(stream.id)
+        if stream.length != typical or stream.id in EXACT_LENGTH_IDS:
+            minimum = maximum = stream.length
+        best += model.airtime(minimum) * stream.rate
+        expected += model.airtime(stream.length) * stream.rate
+        worst += model.airtime(maximum) * stream.rate
+    return best * 100, expected * 100, worst * 100
+
+Usage = namedtuple('Usage', ['bytes_per_second', 'load', 'best', 'expected', 'worst', 'status'])
+Usage.__doc__ = """The calculators' figures for one mix: load in seconds of line time per
+second, utilization in percent and the status of the expected figure."""
+
+def status_of(percentage):
+    """Return 'ok', 'high' or 'over' using the calculators' 80%/100% limits."""
+    if percentage > OVER_UTILIZATION:
+        return 'over'
+    if percentage > HIGH_UTILIZATION:
+        return 'high'
+    return 'ok'
+
+@nmea_metrics.instrumented('calc.mix_usage')
+def mix_usage(streams, wire_lengths, link, bits_per_byte=BITS_PER_BYTE):
+    """Return the Usage of a list of streams on a link, as both calculators show it."""
+    model = link_model(link, bits_per_byte)
+    best, expected, worst = utilization_range(streams, wire_lengths, model)
+    return Usage(bytes_per_second(streams), model.load(streams), best, expected, worst,
+                 status_of(expected))
+
+SentenceCost = namedtuple('SentenceCost', ['id', 'rate', 'length', 'utilization', 'share'])
+SentenceCost.__doc__ = """What one stream of a mix costs: the utilization in percent it adds (and
+would give back if dropped) and its share of the mix's total in percent."""
+
+@nmea_metrics.instrumented('calc.rank_mix')
+def rank_mix(streams, link, bits_per_byte=BITS_PER_BYTE):
+    """Return a SentenceCost per stream of a mix, the most expensive first."""
+    model = link_model(link, bits_per_byte)
+    costs = [(model.airtime(stream.length) * stream.rate * 100, stream) for stream in streams]
+    total = sum(cost for cost, _ in costs)
+    costs.sort(key=lambda entry: -entry[0])
+    return [SentenceCost(stream.id, stream.rate, stream.length, cost,
+                         cost / total * 100 if total else 0.0)
+            for cost, stream in costs]
+
+class RunningLoad:
+    """Running (min, typical, max) load of a mix, updated one sentence at a time.
+
+    Sentences at the mix's default rate are counted per length, sentences
+    with their own rate summed as updates per second per length. A change
+    of default rate, baud or framing then only walks the distinct lengths
+    (a few dozen), however many sentences are selected.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.count = 0
+        self.default_counts = [{}, {}, {}]
+        self.own_rates = [{}, {}, {}]
+
+    def add(self, lengths, rate=None, sign=1):
+        """Add a sentence's (min, typical, max) lengths, at its own rate if given."""
+        self.count += sign
+        tables = self.default_counts if rate is None else self.own_rates
+        weight = sign if rate is None else sign * rate
+        for table, length in zip(tables, lengths):
+            total = table.get(length, 0) + weight
+            if abs(total) > 1e-9:
+                table[length] = total
+            else:
+                table.pop(length, None)
+        if not self.count:
+            # Nothing selected: drop any floating point residue
+            self.clear()
+
+    def remove(self, lengths, rate=None):
+        """Undo a previous add() with the same arguments."""
+        self.add(lengths, rate, sign=-1)
+
+    @nmea_metrics.instrumented('calc.running_load')
+    def utilization(self, default_rate, link, bits_per_byte=BITS_PER_BYTE):
+        """Return (best, expected, worst) utilization in percent."""
+        airtime = link_model(link, bits_per_byte).airtime
+        return tuple((sum(airtime(length) * count for length, count in defaults.items())
+                      * default_rate
+                      + sum(airtime(length) * rate for length, rate in own.items())) * 100
+                     for defaults, own in zip(self.default_counts, self.own_rates))
+
+SentenceStats = namedtuple('SentenceStats',
+                           ['id', 'transmissions', 'worst_queueing', 'worst_latency'])
+SentenceStats.__doc__ = """Per-sentence simulation results, times in seconds.
+
+worst_queueing is the longest wait from release to the first bit on the
+wire, worst_latency the longest wait from release to the last bit.
+"""
+
+SimulationResult = namedtuple('SimulationResult', [
+    'hyperperiod', 'transmissions', 'utilization', 'peak_backlog_bytes',
+    'peak_backlog_time', 'worst_latency', 'idle_gaps', 'longest_idle',
+    'shortest_idle', 'carry_over', 'sentences'])
+SimulationResult.__doc__ = """Timeline simulation results, times in seconds.
+
+peak_backlog_bytes is the largest number of bytes waiting or on the wire at
+any release instant and peak_backlog_time when it first happened.
+carry_over is the transmission time still queued at the end of the
+hyperperiod; it is non-zero when the line cannot drain the mix.
+"""
+
+def _releases(index, stream, horizon):
+    period = 1.0 / stream.rate
+    offset = stream.offset % period
+    count = max(0, ceil((horizon - offset) * stream.rate - 1e-9))
+    for n in range(count):
+        yield offset + n * period, index
+
+@nmea_metrics.instrumented('calc.simulate')
+def simulate(streams, link, bits_per_byte=BITS_PER_BYTE, duration=None):
+    """Simulate every transmission of a mix on one serial line.
+
+    Sentences released at the same instant go out in mix order, and a
+    sentence released while the line is busy waits in a FIFO queue. The run
+    covers one hyperperiod unless duration (seconds) is given.
+    """
+    streams = list(streams)
+    if not streams:
+        raise ValueError("No sentences to simulate")
+    horizon = float(duration if duration is not None
+                    else hyperperiod(s.rate for s in streams))
+    events = sum(horizon * s.rate for s in streams)
+    if events > MAX_EVENTS:
+        raise ValueError(f"Simulation would need {events:.0f} transmissions; "
+                         f"pass a shorter duration")
+
+    model = link_model(link, bits_per_byte)
+    tx_times = [model.airtime(s.length) for s in streams]
+    counts = [0] * len(streams)
+    worst_queueing = [0.0] * len(streams)
+    worst_latency = [0.0] * len(streams)
+
+    line_free = 0.0
+    busy = 0.0
+    peak_backlog = 0.0
+    peak_time = 0.0
+    gaps = 0
+    longest_gap = 0.0
+    shortest_gap = None
+
+    releases = heapq.merge(*(_releases(i, s, horizon) for i, s in enumerate(streams)))
+    for release, index in releases:
+        if release > line_free:
+            gap = release - line_free
+            # The line starts idle at t=0; that is not a gap between frames
+            if busy:
+                gaps += 1
+                longest_gap = max(longest_gap, gap)
+                shortest_gap = gap if shortest_gap is None else min(shortest_gap, gap)
+            start = release
+        else:
+            start = line_free
+        tx_time = tx_times[index]
+        line_free = start + tx_time
+        busy += tx_time
+        counts[index] += 1
+
+        backlog = line_free - release
+        if backlog > peak_backlog:
+            peak_backlog = backlog
+            peak_time = release
+        worst_queueing[index] = max(worst_queueing[index], start - release)
+        worst_latency[index] = max(worst_latency[index], line_free - release)
+
+    # Idle time between the last frame and the end of the run wraps around
+    # to the start of the next hyperperiod when the line has drained
+    if busy and line_free < horizon:
+        tail = horizon - line_free + min(s.offset % (1.0 / s.rate) for s in streams)
+        gaps += 1
+        longest_gap = max(longest_gap, tail)
+        shortest_gap = tail if shortest_gap is None else min(shortest_gap, tail)
+
+    sentences = [SentenceStats(s.id, counts[i], worst_queueing[i], worst_latency[i])
+                 for i, s in enumerate(streams)]
+    return SimulationResult(
+        hyperperiod=horizon,
+        transmissions=sum(counts),
+        utilization=busy / horizon * 100,
+        peak_backlog_bytes=peak_backlog / model.seconds_per_byte,
+        peak_backlog_time=peak_time,
+        worst_latency=max(worst_latency),
+        idle_gaps=gaps,
+        longest_idle=longest_gap,
+        shortest_idle=shortest_gap or 0.0,
+        carry_over=max(0.0, line_free - horizon),
+        sentences=sentences)
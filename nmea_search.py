@@ -0,0 +1,210 @@
+"""Ranked search over sentence IDs, descriptions and field names.
+
+The index is built once when the database is compiled and stored in the
+cache next to the records (see nmea_database), so the calculators never
+scan the catalog while the user types. It holds:
+
+    rows      the sentence IDs, in table row order
+    tokens    every lowercase word of the IDs, descriptions and field
+              names, sorted, so a prefix is a bisect range
+    postings  for each token, the rows it occurs in as row * 4 + field,
+              field being the best place it occurs: ID, description or
+              field name
+    bigrams   for each padded letter pair, the tokens containing it, for
+              typo-tolerant (Dice coefficient) matches
+
+A query is split into words the same way. Each word scores every row it
+reaches by its best hit -- exact word, word prefix, then fuzzy match --
+weighted by where the word occurs (an ID counts most), and the scores of
+the words are added. Fuzzy matches are only looked for among the tokens
+sharing the word's first letter, and a single letter is not matched
+against field names, so no keystroke scans the whole catalog. "gga",
+"gg", "gag", "heading" and "GPGGA" all find GGA in well under a
+millisecond. Word scores are memoized, so typing a query one key at a
+time only scores the word being typed, and the index of a plain-dict
+database is kept for the next search (see index_for).
+"""
+
+import heapq
+import re
+from bisect import bisect_left
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+from operator import neg
+
+import nmea_metrics
+
+# Field codes in the postings
+ID_FIELD, NAME_FIELD, FIELD_NAME_FIELD = 0, 1, 2
+FIELD_WEIGHTS = (8.0, 3.0, 1.0)
+# Score multipliers of the three kinds of hit
+EXACT, PREFIX, FUZZY = 3.0, 2.0, 1.0
+# Smallest Dice coefficient counted as a fuzzy hit
+FUZZY_THRESHOLD = 0.5
+DEFAULT_LIMIT = 10
+# Words whose scores are remembered
+WORD_CACHE_SIZE = 256
+# Indexes of plain-dict databases kept
+INDEX_CACHE_SIZE = 4
+
+_WORD = re.compile(r'[a-z0-9]+')
+
+Match = namedtuple('Match', ['id', 'score'])
+Match.__doc__ = """A search result: sentence ID and its score (higher is better)."""
+
+def words(text):
+    """Return the lowercase words of a text."""
+    return _WORD.findall(str(text).lower())
+
+def bigrams(token):
+    """Return the set of letter pairs of a token padded with ^ and $."""
+    padded = f"^{token}$"
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+def build_index(sentences):
+    """Return the search index of a sentences dict as JSON-serializable data."""
+    rows = sorted(sentences.keys())
+    postings = {}
+    for row, ID in enumerate(rows):
+        sentence = sentences[ID]
+        texts = ((ID_FIELD, [ID]), (NAME_FIELD, [sentence.get('sentence_name', '')]),
+                 (FIELD_NAME_FIELD, sentence.get('field_names', [])))
+        for field, values in texts:
+            for text in values:
+                for token in words(text):
+                    # Single letters (N/S, E/W) only match as IDs
+                    if len(token) > 1 or field == ID_FIELD:
+                        # Only the best field of a row counts, so keep the first
+                        postings.setdefault(token, {}).setdefault(row, row * 4 + field)
+    tokens = sorted(postings)
+    pairs = {}
+    for number, token in enumerate(tokens):
+        for pair in bigrams(token):
+            pairs.setdefault(pair, []).append(number)
+    return {'rows': rows, 'tokens': tokens,
+            'postings': [sorted(postings[token].values()) for token in tokens],
+            'bigrams': pairs}
+
+class SearchIndex:
+    """Answers ranked queries from the data returned by build_index."""
+
+    def __init__(self, data):
+        self.rows = data['rows']
+        self.tokens = data['tokens']
+        self.postings = data['postings']
+        self.bigrams = data['bigrams']
+        self._sizes = [len(bigrams(token)) for token in self.tokens]
+        self._pairs = [None] * len(self.tokens)
+        self._fields = [None] * len(self.tokens)
+        self.word_scores = lru_cache(maxsize=WORD_CACHE_SIZE)(self._word_scores)
+
+    @classmethod
+    def from_database(cls, database):
+        return cls(build_index(database))
+
+    def _token_hits(self, word):
+        """Return {token number: multiplier} for the tokens a word reaches."""
+        # Tokens are [a-z0-9]+ and "{" sorts after "z": the prefix is a range
+        first = bisect_left(self.tokens, word)
+        last = bisect_left(self.tokens, word + '{', first)
+        hits = dict.fromkeys(range(first, last), PREFIX)
+        if first < last and self.tokens[first] == word:
+            hits[first] = EXACT
+        if len(word) > 1:
+            # A Dice coefficient of at least FUZZY_THRESHOLD needs a token of
+            # between a third and three times as many pairs as the word, and a
+            # typo rarely hits the first letter, so only tokens sharing it
+            # (and so the ^x pair) are compared
+            query = bigrams(word)
+            low, high = len(query) / 3.0, len(query) * 3.0
+            for number in self.bigrams.get(f"^{word[0]}", ()):
+                size = self._sizes[number]
+                if first <= number < last or not low <= size <= high:
+                    continue
+                pairs = self._pairs[number]
+                if pairs is None:
+                    pairs = self._pairs[number] = bigrams(self.tokens[number])
+                dice = 2.0 * len(query & pairs) / (len(query) + size)
+                if dice >= FUZZY_THRESHOLD:
+                    hits[number] = FUZZY * dice
+        return hits
+
+    def _field_rows(self, number):
+        """Return the rows of a token's postings split by field."""
+        fields = self._fields[number]
+        if fields is None:
+            fields = ([], [], [])
+            for code in self.postings[number]:
+                fields[code & 3].append(code >> 2)
+            self._fields[number] = fields
+        return fields
+
+    def _word_scores(self, word):
+        """Return {row: score} for one word, including a full address (GPGGA)."""
+        # Rows grouped by the score a hit gives them
+        groups = {}
+        # A single letter would reach most of the catalog through the field
+        # names, so it only matches IDs and descriptions
+        fields = FIELD_NAME_FIELD if len(word) == 1 else len(FIELD_WEIGHTS)
+        for number, multiplier in self._token_hits(word).items():
+            for field, rows in enumerate(self._field_rows(number)[:fields]):
+                if rows:
+                    groups.setdefault(multiplier * FIELD_WEIGHTS[field], []).extend(rows)
+        if len(word) == 5 and not word.startswith('p'):
+            for row, score in self._word_scores(word[2:]).items():
+                groups.setdefault(score, []).append(row)
+        # Lowest scores first, so each row ends with its best score
+        scores = {}
+        for score in sorted(groups):
+            scores.update(dict.fromkeys(groups[score], score))
+        return scores
+
+    @nmea_metrics.instrumented('search.query')
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """Return up to limit Matches for a query, best first."""
+        per_word = sorted((self.word_scores(word) for word in words(query)), key=len)
+        # Copy the widest word's scores (or use them as they are for a single
+        # word) and add the others to them
+        totals = per_word.pop() if per_word else {}
+        if per_word:
+            totals = dict(totals)
+        for scores in per_word:
+            for row, score in scores.items():
+                totals[row] = totals.get(row, 0.0) + score
+        # Rows are in ID order, so (-score, row) ranks best first, then by ID
+        ranked = zip(map(neg, totals.values()), totals.keys())
+        if limit is None:
+            ranked = sorted(ranked)
+        else:
+            ranked = heapq.nsmallest(limit, ranked)
+        return [Match(self.rows[row], -score) for score, row in ranked]
+
+# Indexes built from plain dicts: key -> (dict, index). The dict is kept so
+# an identity key cannot be reused by another object
+_indexes = OrderedDict()
+
+def index_for(database, digest=None):
+    """Return the SearchIndex of a database: its stored one, or one built from
+    a plain dict and kept for later searches.
+
+    The kept index is found by digest, a string identifying the dict's
+    contents (such as nmea_database.database_digest), when one is given;
+    otherwise by the dict object itself, so a dict changed in place after
+    being searched must be searched with a digest.
+    """
+    index = getattr(database, 'search_index', None)
+    if index is not None:
+        return index
+    key = digest if digest is not None else id(database)
+    entry = _indexes.get(key)
+    if entry is None or (digest is None and entry[0] is not database):
+        entry = _indexes[key] = (database, SearchIndex.from_database(database))
+        if len(_indexes) > INDEX_CACHE_SIZE:
+            _indexes.popitem(last=False)
+    _indexes.move_to_end(key)
+    return entry[1]
+
+def search(database, query, limit=DEFAULT_LIMIT, digest=None):
+    """Search a database with its stored index (a plain dict is indexed once;
+    see index_for for digest)."""
+    return index_for(database, digest).search(query, limit)
@@ -0,0 +1,326 @@
+"""Local HTTP/JSON service for sentence lookup and bandwidth calculation.
+
+    python nmea_service.py --port 8183
+
+Endpoints (all responses are JSON):
+
+    GET  /health                  status and number of sentences
+    GET  /sentences               every sentence ID with its description, optionally
+                                  only ?standard=nmea|iec, ?release=2.30 or ?catalog=NAME
+    GET  /sentences/GGA           the details the calculators show for GGA
+    GET  /search?q=wind+speed     sentences ranked by match (limit=N, default 10)
+    POST /bandwidth               a job as in nmea_jobs, e.g.
+                                  {"baud": 4800, "rate": 1, "sentences": ["GGA@10", "RMC"]},
+                                  with "ais" traffic as in nmea_ais.job_streams
+    GET  /bandwidth?sentences=GGA@10,RMC&baud=4800&rate=1&framing=8N1
+    POST /costs                   the same job's sentences ranked by the utilization
+    GET  /costs?sentences=...     each adds, with its share and the link's headroom
+    GET  /stats                   request count and statistics of both caches
+    GET  /metrics                 timers and counters in Prometheus text format,
+                                  when started with --metrics
+
+The database is loaded once and shared by every connection. Bandwidth
+results are kept in a bounded LRU cache keyed on the normalized mix (the
+sentences with their effective rates, in sorted order) and the link
+profile, so the same mix asked for in another order or with the default
+rate spelled out is served from the cache. Connections are HTTP/1.1
+keep-alive, so a client can send any number of requests on one socket.
+
+Only the standard library is used (and NumPy for jobs with AIS traffic);
+this is a small local server for planning tools, not something to expose
+to a network.
+"""
+
+import argparse
+import asyncio
+import json
+import traceback
+from functools import lru_cache
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import nmea_database
+import nmea_jobs
+import nmea_link
+import nmea_metrics
+import nmea_schedule
+import nmea_search
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8183
+CACHE_SIZE = 4096
+# Largest request body accepted, in bytes
+MAX_BODY = 1 << 20
+
+STANDARDS = {'N': 'NMEA 0183', 'I': 'IEC 61162-1', 'B': 'NMEA 0183 and IEC 61162-1',
+             'P': 'Proprietary'}
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+class HTTPError(Exception):
+    """An error answered with a status code and a JSON message."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def encode(data):
+    return json.dumps(data, separators=(',', ':')).encode()
+
+def sentence_details(database, ID):
+    """Return the details of a sentence as shown by the calculators."""
+    sentence = database[ID]
+    minimum, typical, maximum = database.wire_lengths(ID)
+    return {
+        'id': ID,
+        'description': sentence['sentence_name'],
+        'sentence_structure': sentence['sentence_structure'],
+        'lengths': {'min': minimum, 'typical': typical, 'max': maximum},
+        'num_fields': sentence['num_fields'],
+        'fields': [{'name': name, 'chars': length}
+                   for name, length in zip(sentence['field_names'],
+                                           sentence['chars_per_field'])],
+        'standard': STANDARDS.get(sentence['standard'], sentence['standard']),
+        'version': sentence.get('version'),
+        'catalog': database.catalog_of(ID).get('name'),
+    }
+
+def normalize(job):
+    """Return the cache key of a bandwidth request: (mix, link profile).
+
+    mix is a sorted tuple of (ID, rate in Hz, length) with the default rate
+    applied, so the order of the sentences does not matter. length is None
+    for the catalog's typical length; the VDM/VDO fragments of an "ais"
+    entry carry their own.
+    """
+    default_rate = nmea_schedule.check_rate(job.get('rate', 1))
+    sentences = job.get('sentences', [])
+    if isinstance(sentences, str):
+        sentences = [s for s in sentences.split(',') if s]
+    mix = []
+    for entry in sentences:
+        if isinstance(entry, dict):
+            ID, rate = entry['id'], entry.get('rate')
+            if rate is not None:
+                rate = nmea_schedule.check_rate(rate, f"{ID}@{rate}")
+        else:
+            ID, rate = nmea_schedule.parse_rate(str(entry))
+        mix.append((ID.strip().upper(), rate if rate is not None else default_rate, None))
+    if job.get('ais'):
+        # NumPy is only needed for AIS traffic
+        import nmea_ais
+        mix.extend((stream.id, stream.rate, stream.length)
+                   for stream in nmea_ais.job_streams(job['ais']))
+    return (tuple(sorted(mix, key=lambda entry: (entry[0], entry[1], entry[2] or 0))),
+            nmea_link.profile_from_dict(job))
+
+class BandwidthService:
+    """Request handling on one shared database, independent of the transport."""
+
+    def __init__(self, database, cache_size=CACHE_SIZE):
+        self.database = database
+        self.requests = 0
+        self.bandwidth = lru_cache(maxsize=cache_size)(self._bandwidth)
+        self.costs = lru_cache(maxsize=cache_size)(self._costs)
+        self._details = {}
+        self._index = encode([{'id': ID, 'description': database[ID]['sentence_name']}
+                              for ID in sorted(database.keys())])
+
+    def streams(self, mix):
+        streams = []
+        for ID, rate, length in mix:
+            try:
+                typical = self.database.wire_lengths(ID)[1]
+            except KeyError:
+                raise HTTPError(404, f"Sentence ID '{ID}' not found in database") from None
+            streams.append(nmea_schedule.Stream(ID, length or typical, rate))
+        return streams
+
+    def _bandwidth(self, mix, profile):
+        return encode(nmea_jobs.summarize(self.database, self.streams(mix), profile))
+
+    def _costs(self, mix, profile):
+        ranked = nmea_schedule.rank_mix(self.streams(mix), profile)
+        total = sum(cost.utilization for cost in ranked)
+        return encode({'link': nmea_link.describe(profile), 'utilization': round(total, 3),
+                       'headroom': round(100 - total, 3),
+                       'sentences': [{'id': cost.id, 'rate': cost.rate, 'bytes': cost.length,
+                                      'utilization': round(cost.utilization, 3),
+                                      'share': round(cost.share, 3)} for cost in ranked]})
+
+    def details(self, ID):
+        body = self._details.get(ID)
+        if body is None:
+            try:
+                body = encode(sentence_details(self.database, ID))
+            except KeyError:
+                raise HTTPError(404, f"Sentence ID '{ID}' not found in database") from None
+            self._details[ID] = body
+        return body
+
+    @nmea_metrics.instrumented('service.request')
+    def handle(self, method, target, body):
+        """Return the JSON body for a request, raising HTTPError on failure."""
+        self.requests += 1
+        url = urlsplit(target)
+        path = url.path.rstrip('/') or '/'
+
+        if path in ('/bandwidth', '/costs'):
+            if method == 'POST':
+                try:
+                    job = json.loads(body or b'{}')
+                except ValueError as e:
+                    raise HTTPError(400, f"Invalid JSON: {str(e)}") from None
+                if not isinstance(job, dict):
+                    raise HTTPError(400, "Request body must be a JSON object")
+            elif method == 'GET':
+                job = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            else:
+                raise HTTPError(405, f"{method} not allowed on {path}")
+            try:
+                key = normalize(job)
+                if path == '/costs':
+                    return self.costs(*key)
+                return self.bandwidth(*key)
+            except (KeyError, ValueError, TypeError) as e:
+                raise HTTPError(400, str(e.args[0] if isinstance(e, KeyError) else e)) from None
+
+        if method != 'GET':
+            raise HTTPError(405, f"{method} not allowed on {path}")
+        if path == '/sentences':
+            if not url.query:
+                return self._index
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            try:
+                ids = self.database.select(query.get('standard'), query.get('release'),
+                                           query.get('catalog'))
+            except KeyError:
+                raise HTTPError(400, "standard must be 'nmea' or 'iec'") from None
+            return encode([{'id': ID, 'description': self.database[ID]['sentence_name']}
+                           for ID in ids])
+        if path.startswith('/sentences/'):
+            return self.details(unquote(path[len('/sentences/'):]).upper())
+        if path == '/search':
+            query = parse_qs(url.query)
+            try:
+                limit = int(query.get('limit', [nmea_search.DEFAULT_LIMIT])[-1])
+            except ValueError:
+                raise HTTPError(400, "limit must be an integer") from None
+            matches = nmea_search.search(self.database, query.get('q', [''])[-1], limit)
+            return encode([{'id': match.id, 'score': match.score,
+                            'description': self.database[match.id]['sentence_name']}
+                           for match in matches])
+        if path == '/health':
+            return encode({'status': 'ok', 'sentences': len(self.database)})
+        if path == '/metrics' and nmea_metrics.enabled:
+            return nmea_metrics.prometheus().encode()
+        if path == '/stats':
+            info = self.bandwidth.cache_info()
+            costs = self.costs.cache_info()
+            return encode({'requests': self.requests, 'cache_hits': info.hits,
+                           'cache_misses': info.misses, 'cache_size': info.currsize,
+                           'cache_limit': info.maxsize, 'costs_cache_hits': costs.hits,
+                           'costs_cache_misses': costs.misses,
+                           'costs_cache_size': costs.currsize})
+        raise HTTPError(404, f"No such endpoint: {path}")
+
+def response(status, body, keep_alive, content_type='application/json'):
+    head = (f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode('latin-1') + body
+
+async def serve_connection(service, reader, writer):
+    """Answer requests on one connection until the client closes it."""
+    try:
+        while True:
+            try:
+                head = await reader.readuntil(b'\r\n\r\n')
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                break
+            lines = head.decode('latin-1').split('\r\n')
+            try:
+                method, target, version = lines[0].split(' ', 2)
+            except ValueError:
+                writer.write(response(400, encode({'error': "Malformed request line"}), False))
+                break
+            headers = {}
+            for line in lines[1:]:
+                name, sep, value = line.partition(':')
+                if sep:
+                    headers[name.strip().lower()] = value.strip()
+            connection = headers.get('connection', '').lower()
+            keep_alive = (connection != 'close' if version == 'HTTP/1.1'
+                          else connection == 'keep-alive')
+
+            try:
+                length = int(headers.get('content-length') or 0)
+            except ValueError:
+                length = -1
+            if length < 0:
+                # Without a length the body cannot be told from the next request
+                writer.write(response(400, encode({'error': "Invalid Content-Length"}), False))
+                break
+            if length > MAX_BODY:
+                writer.write(response(413, encode({'error': "Request body too large"}), False))
+                break
+            try:
+                body = await reader.readexactly(length) if length else b''
+            except asyncio.IncompleteReadError:
+                # The client closed before sending the whole body
+                break
+
+            try:
+                status, payload = 200, service.handle(method, target, body)
+            except HTTPError as e:
+                status, payload = e.status, encode({'error': str(e)})
+            except Exception as e:
+                traceback.print_exc()
+                status, payload = 500, encode({'error': f"Internal error: {str(e)}"})
+            # Only /metrics answers in text
+            content_type = ('text/plain; version=0.0.4' if target.startswith('/metrics')
+                            and status == 200 else 'application/json')
+            writer.write(response(status, payload, keep_alive, content_type))
+            if not keep_alive:
+                break
+            # Only wait for the socket when the client is not reading
+            if writer.transport.get_write_buffer_size() > 1 << 16:
+                await writer.drain()
+        await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+async def start_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Start serving and return the asyncio server."""
+    return await asyncio.start_server(
+        lambda reader, writer: serve_connection(service, reader, writer), host, port)
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, cache_size=CACHE_SIZE,
+                db_path=nmea_database.DEFAULT_PATH):
+    service = BandwidthService(nmea_database.load_database(db_path), cache_size)
+    server = await start_server(service, host, port)
+    for sock in server.sockets:
+        print(f"Serving on http://{sock.getsockname()[0]}:{sock.getsockname()[1]}", flush=True)
+    async with server:
+        await server.serve_forever()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local HTTP/JSON NMEA bandwidth service")
+    parser.add_argument('--host', default=DEFAULT_HOST, help="address to listen on")
+    parser.add_argument('-p', '--port', type=int, default=DEFAULT_PORT, help="port to listen on")
+    parser.add_argument('--cache-size', type=int, default=CACHE_SIZE,
+                        help="bandwidth results kept in the LRU cache")
+    nmea_metrics.add_arguments(parser)
+    args = parser.parse_args(argv)
+    # /metrics serves the timers live; the file is written on shutdown
+    with nmea_metrics.session(args.profile, args.metrics):
+        try:
+            asyncio.run(serve(args.host, args.port, args.cache_size))
+        except KeyboardInterrupt:
+            pass
+
+if __name__ == "__main__":
+    main()
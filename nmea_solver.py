@@ -0,0 +1,275 @@
+"""Choose the most valuable sentence mix that fits a link.
+
+Given required sentences, optional sentences with priorities, the rates
+each may be sent at and a utilization ceiling, solve() returns the schedule
+with the highest total priority that stays under the ceiling, trying each
+candidate baud rate or link profile (see nmea_link). Among schedules of
+equal priority it prefers higher rates (weighted by priority), then the
+slowest link.
+
+This is a multiple-choice knapsack: every sentence is a group whose options
+are "not sent" (optional sentences only) or one of its allowed rates, each
+costing its airtime x rate, counted in byte times of the link. It is solved exactly with a
+dynamic program over the Pareto frontier of (cost, value) partial
+schedules. Dominated partial schedules are dropped after every group, and
+so are those whose fractional-knapsack upper bound on the remaining
+sentences cannot reach the best complete schedule already found.
+"""
+
+from bisect import bisect_right
+from collections import namedtuple
+from functools import lru_cache
+from math import ceil, floor
+
+import nmea_link
+import nmea_metrics
+import nmea_schedule
+
+# Rates offered when a candidate only gives a range, in Hz
+RATE_STEPS = (0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 20)
+# Costs are compared in units of 1/COST_SCALE byte times per second
+COST_SCALE = 20
+# Position of each length bound in SentenceTable.wire_lengths()
+BOUNDS = ('min', 'typical', 'max')
+
+Candidate = namedtuple('Candidate', ['id', 'priority', 'min_rate', 'max_rate', 'required'],
+                       defaults=[1, 1, 1, False])
+Candidate.__doc__ = """A sentence the solver may send at min_rate..max_rate Hz."""
+
+Schedule = namedtuple('Schedule', ['baud', 'rates', 'value', 'bytes_per_second',
+                                   'utilization', 'link'])
+Schedule.__doc__ = """A solved mix: rates maps each sent sentence ID to its rate in Hz."""
+
+@lru_cache(maxsize=None)
+def allowed_rates(min_rate, max_rate):
+    """Return the RATE_STEPS within a range, or the range ends if none are."""
+    rates = tuple(r for r in RATE_STEPS if min_rate <= r <= max_rate)
+    return rates or tuple(sorted({min_rate, max_rate}))
+
+def _groups(database, candidates, bound, model):
+    """Build (candidate, options) groups, options as (cost units, value, rate)."""
+    position = BOUNDS.index(bound)
+    groups = []
+    for candidate in candidates:
+        length = database.wire_lengths(candidate.id)[position]
+        # Airtime in byte times: the length itself on a link without overheads
+        size = model.airtime(length) / model.seconds_per_byte
+        rates = allowed_rates(candidate.min_rate, candidate.max_rate)
+        top = max(len(rates) - 1, 1)
+        options = tuple((ceil(size * rate * COST_SCALE - 1e-9),
+                         (candidate.priority, candidate.priority * k / top),
+                         rate)
+                        for k, rate in enumerate(rates))
+        groups.append((candidate, options))
+    # Required sentences first so every later partial schedule is feasible,
+    # then optional ones by priority so good solutions appear early
+    groups.sort(key=lambda g: (not g[0].required, -g[0].priority))
+    return groups
+
+def _add(a, b):
+    return (a[0] + b[0], a[1] + b[1])
+
+class _Relaxation:
+    """Fractional-knapsack upper bound on the value of a set of increments.
+
+    increments are (cost, value) steps that can each be taken in part; the
+    best fractional use of a budget takes them by value per cost.
+    """
+
+    def __init__(self, increments):
+        steps = sorted((s for s in increments if s[1] > 0),
+                       key=lambda s: s[1] / s[0] if s[0] else float('inf'), reverse=True)
+        self.costs = [0]
+        self.values = [0.0]
+        for cost, value in steps:
+            self.costs.append(self.costs[-1] + cost)
+            self.values.append(self.values[-1] + value)
+        self.steps = steps
+
+    def bound(self, budget):
+        k = bisect_right(self.costs, budget) - 1
+        value = self.values[k]
+        if k < len(self.steps):
+            cost, step_value = self.steps[k]
+            value += step_value * (budget - self.costs[k]) / cost
+        return value
+
+def _hull_steps(options):
+    """Upgrade steps along the upper convex hull of a group's (cost, value)."""
+    points = [(0, 0.0)] + [(cost, value[1]) for cost, value, _ in options]
+    points.sort()
+    hull = []
+    for point in points:
+        if hull and point[1] <= hull[-1][1]:
+            continue
+        while len(hull) >= 2:
+            (c1, v1), (c2, v2) = hull[-2], hull[-1]
+            # Drop the middle point when it lies under the line to the new one
+            if (v2 - v1) * (point[0] - c1) <= (point[1] - v1) * (c2 - c1):
+                hull.pop()
+            else:
+                break
+        hull.append(point)
+    return [(b[0] - a[0], b[1] - a[1]) for a, b in zip(hull, hull[1:])]
+
+def _bounds(groups):
+    """Per-position bounds on what the remaining optional groups can add.
+
+    Entry i bounds groups i.. : priority from the fractional knapsack of
+    each sentence at its cheapest rate, rate preference from the fractional
+    relaxation of every group's upgrade steps.
+    """
+    integral = all(float(c.priority).is_integer() for c, _ in groups)
+    bounds = [None] * (len(groups) + 1)
+    for i in range(len(groups) + 1):
+        rest = [(c, o) for c, o in groups[i:] if not c.required]
+        primary = _Relaxation([(min(cost for cost, _, _ in o), c.priority) for c, o in rest])
+        secondary = _Relaxation([step for _, o in rest for step in _hull_steps(o)])
+        bounds[i] = (primary, secondary, integral)
+    return bounds
+
+def _upper_bound(bounds, budget):
+    primary, secondary, integral = bounds
+    first = primary.bound(budget)
+    if integral:
+        first = floor(first + 1e-9)
+    return (first, secondary.bound(budget) + 1e-9)
+
+def _greedy(groups, budget):
+    """Value of a quick feasible schedule, used as the first incumbent.
+
+    Required sentences at their slowest rate, then optional ones by priority
+    per byte while they fit, then rate upgrades by value per byte.
+    """
+    spent = 0
+    value = (0, 0.0)
+    level = {}
+    for i, (candidate, options) in enumerate(groups):
+        if candidate.required:
+            spent += options[0][0]
+            value = _add(value, options[0][1])
+            level[i] = 0
+    if spent > budget:
+        return None
+    optional = sorted((i for i, (c, _) in enumerate(groups) if not c.required),
+                      key=lambda i: groups[i][0].priority / max(groups[i][1][0][0], 1),
+                      reverse=True)
+    for i in optional:
+        cost, option_value, _ = groups[i][1][0]
+        if spent + cost <= budget:
+            spent += cost
+            value = _add(value, option_value)
+            level[i] = 0
+    upgrades = sorted(((groups[i][1][k + 1][0] - groups[i][1][k][0],
+                        groups[i][1][k + 1][1][1] - groups[i][1][k][1][1], i, k)
+                       for i in level for k in range(len(groups[i][1]) - 1)),
+                      key=lambda u: u[1] / max(u[0], 1), reverse=True)
+    for cost, gain, i, k in upgrades:
+        if level[i] == k and spent + cost <= budget:
+            spent += cost
+            value = (value[0], value[1] + gain)
+            level[i] = k + 1
+    return value
+
+def _solve_budget(groups, budget):
+    """Return (value, choices) of the best schedule within budget, or None."""
+    bounds = _bounds(groups)
+
+    # Each state is (cost, value, choices) with choices a linked list of
+    # (group index, rate, previous choices)
+    frontier = [(0, (0, 0.0), None)]
+    best = _greedy(groups, budget)
+    if best is None:
+        return None
+    for i, (candidate, options) in enumerate(groups):
+        states = [] if candidate.required else list(frontier)
+        for cost, value, choices in frontier:
+            for option_cost, option_value, rate in options:
+                total = cost + option_cost
+                if total <= budget:
+                    states.append((total, _add(value, option_value), (i, rate, choices)))
+        if not states:
+            return None
+
+        # Keep the Pareto frontier: cheapest first, strictly better value only
+        states.sort(key=lambda s: (s[0], -s[1][0], -s[1][1]))
+        frontier = []
+        top = None
+        for state in states:
+            if top is None or state[1] > top:
+                frontier.append(state)
+                top = state[1]
+
+        if candidate.required:
+            continue
+        # Every state is now a complete schedule (the rest can be skipped);
+        # drop those that cannot reach the best even with the rest added
+        best = max(best, top)
+        frontier = [s for s in frontier
+                    if _add(s[1], _upper_bound(bounds[i + 1], budget - s[0])) >= best]
+
+    cost, value, choices = max(frontier, key=lambda s: (s[1], -s[0]))
+    return value, choices
+
+@nmea_metrics.instrumented('solver.solve')
+def solve(database, candidates, bauds=(4800, 38400), ceiling=80.0, bound='typical'):
+    """Return the best Schedule for the candidates, or None if nothing fits.
+
+    candidates is a list of Candidate; lengths come from the database's
+    wire-length model at the given bound ('min', 'typical' or 'max').
+    bauds are baud rates or links as taken by nmea_link.link_model.
+    ceiling is the highest utilization allowed, in percent.
+    """
+    candidates = [c._replace(id=c.id.upper()) for c in candidates]
+    models = sorted((nmea_link.link_model(link) for link in bauds),
+                    key=lambda model: model.capacity)
+    best = None
+    for model in models:
+        groups = _groups(database, candidates, bound, model)
+        budget = int(ceiling / 100 / model.seconds_per_byte * COST_SCALE + 1e-9)
+        result = _solve_budget(groups, budget)
+        if result is None:
+            continue
+        value, choices = result
+        if best is not None and value <= best[1]:
+            continue
+        best = (model, value, choices, groups)
+    if best is None:
+        return None
+
+    model, value, choices, groups = best
+    rates = {}
+    while choices is not None:
+        i, rate, choices = choices
+        rates[groups[i][0].id] = rate
+    position = BOUNDS.index(bound)
+    streams = [nmea_schedule.Stream(ID, database.wire_lengths(ID)[position], rate)
+               for ID, rate in rates.items()]
+    load = nmea_schedule.bytes_per_second(streams)
+    return Schedule(baud=model.baud,
+                    rates=dict(sorted(rates.items())),
+                    value=value[0],
+                    bytes_per_second=load,
+                    utilization=model.utilization(streams),
+                    link=nmea_link.describe(model.profile))
+
+def load_candidates(spec):
+    """Build Candidates from a problem spec dict.
+
+    spec = {"required": [{"id": "GGA", "min_rate": 1, "max_rate": 10}, "RMC"],
+            "optional": [{"id": "GSV", "priority": 3, "max_rate": 1}],
+            "bauds": [4800, "38400 7E1"], "ceiling": 80}
+    Plain strings mean rate 1 Hz and, for optional sentences, priority 1.
+    """
+    candidates = []
+    for required, key in ((True, 'required'), (False, 'optional')):
+        for entry in spec.get(key, []):
+            if isinstance(entry, str):
+                entry = {'id': entry}
+            candidates.append(Candidate(
+                id=entry['id'],
+                priority=entry.get('priority', 1),
+                min_rate=float(entry.get('min_rate', entry.get('rate', 1))),
+                max_rate=float(entry.get('max_rate', entry.get('rate', entry.get('min_rate', 1)))),
+                required=required))
+    return candidates
@@ -0,0 +1,306 @@
+"""Parameter sweeps: utilization over grids of mixes, update rates and links.
+
+A sweep spec names the sentences that are always sent, optional sentences
+whose every combination is tried, a grid of default update rates, grids
+for sentences with their own rate, and the links:
+
+    {"sentences": ["GGA", "RMC"],
+     "optional": ["GSV", "HDT", "VTG"],
+     "rate": {"start": 0.1, "stop": 20, "steps": 50, "scale": "log"},
+     "rates": {"GGA": [1, 5, 10]},
+     "bauds": [4800, 9600, "38400 7E1"],
+     "ceiling": 80}
+
+A grid is a list of values or a {"start", "stop", "steps", "scale"} range
+("linear" by default). Every mix x rate plan x link point is evaluated by
+nmea_engine, one block of mixes at a time, so the whole surface comes from
+a few matrix products. Points are streamed to CSV or Parquet block by
+block and never held in memory together; large sweeps spread the blocks
+over a process pool and write them in order as they complete.
+
+The summary gives, for the mix and link pairs that reach the ceiling at
+the lowest default rates, the default update rate at which the mix
+reaches the ceiling and saturates the link (with every per-sentence grid
+at its lowest rate); utilization is linear in the default rate, so these
+come out exactly rather than from the grid.
+"""
+
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import nmea_engine
+import nmea_link
+import nmea_metrics
+
+# Points evaluated and written per block
+CHUNK_POINTS = 1_000_000
+# Rows formatted together when writing CSV
+CSV_ROWS = 65536
+# Below this many points a process pool costs more than it saves
+PARALLEL_THRESHOLD = 2_000_000
+# At most 2**MAX_OPTIONAL mixes
+MAX_OPTIONAL = 20
+
+Threshold = namedtuple('Threshold', ['mix', 'members', 'baud', 'link', 'ceiling_rate',
+                                     'saturation_rate'])
+Threshold.__doc__ = """Default update rates (Hz) at which a mix reaches the ceiling and 100%.
+
+Either is None when the sentences with their own rates already exceed it,
+or inf when the mix has no sentences at the default rate.
+"""
+
+def grid(values):
+    """Return a grid as a float64 array from a list, a number or a range dict."""
+    if isinstance(values, dict):
+        steps = int(values.get('steps', 10))
+        start, stop = float(values['start']), float(values['stop'])
+        if values.get('scale', 'linear') == 'log':
+            points = np.geomspace(start, stop, steps)
+        else:
+            points = np.linspace(start, stop, steps)
+    else:
+        points = np.atleast_1d(np.asarray(values, dtype=np.float64))
+    if points.size == 0 or np.any(points <= 0):
+        raise ValueError("Grids must hold positive values")
+    return points
+
+class Sweep:
+    """A parsed sweep spec: sentences, mixes, rate plans and links."""
+
+    def __init__(self, database, spec):
+        self.base = [ID.upper() for ID in spec.get('sentences', [])]
+        self.optional = [ID.upper() for ID in spec.get('optional', [])]
+        if len(self.optional) > MAX_OPTIONAL:
+            raise ValueError(f"At most {MAX_OPTIONAL} optional sentences can be swept")
+        self.ceiling = float(spec.get('ceiling', 80))
+        self.default_rates = grid(spec.get('rate', 1))
+        swept = spec.get('rates', {})
+        self.swept = [ID.upper() for ID in swept]
+        self.swept_grids = [grid(values) for values in swept.values()]
+
+        bauds = spec.get('bauds', [4800, 38400])
+        if isinstance(bauds, dict):
+            bauds = [int(round(baud)) for baud in grid(bauds)]
+        self.models = [nmea_link.link_model(link) for link in bauds]
+
+        self.ids = sorted(set(self.base + self.optional + self.swept))
+        if not self.ids:
+            raise ValueError("No sentences to sweep")
+        all_ids, lengths = nmea_engine.load_lengths(database, bound=spec.get('bound', 'typical'))
+        index = {ID: i for i, ID in enumerate(all_ids)}
+        missing = [ID for ID in self.ids if ID not in index]
+        if missing:
+            raise KeyError(f"Sentence ID '{missing[0]}' not found in database")
+        self.lengths = lengths[[index[ID] for ID in self.ids]]
+        column = {ID: i for i, ID in enumerate(self.ids)}
+        self.base_columns = [column[ID] for ID in self.base]
+        self.optional_columns = [column[ID] for ID in self.optional]
+        self.swept_columns = [column[ID] for ID in self.swept]
+
+        # Rate plans: the product of the default grid and every per-sentence grid
+        axes = np.meshgrid(self.default_rates, *self.swept_grids, indexing='ij')
+        self.plan_values = np.stack([axis.ravel() for axis in axes], axis=1)
+        self.plans = np.repeat(self.plan_values[:, :1], len(self.ids), axis=1)
+        for j, col in enumerate(self.swept_columns):
+            self.plans[:, col] = self.plan_values[:, j + 1]
+
+    @property
+    def num_mixes(self):
+        return 1 << len(self.optional)
+
+    @property
+    def num_points(self):
+        return self.num_mixes * len(self.plans) * len(self.models)
+
+    @property
+    def columns(self):
+        """Names of the exported columns."""
+        return (['mix'] + self.optional + ['rate'] + [f"{ID}_rate" for ID in self.swept]
+                + ['baud', 'bits_per_char', 'utilization', 'headroom'])
+
+    def mixes(self, start, stop):
+        """Return the (M, S) membership matrix of mixes start..stop."""
+        numbers = np.arange(start, stop)
+        matrix = np.zeros((len(numbers), len(self.ids)))
+        matrix[:, self.base_columns] = 1
+        for bit, col in enumerate(self.optional_columns):
+            matrix[:, col] = np.maximum(matrix[:, col], (numbers >> bit) & 1)
+        return matrix
+
+    def members(self, mix):
+        """Return the sentence IDs sent in a mix number."""
+        chosen = [ID for bit, ID in enumerate(self.optional) if mix >> bit & 1]
+        return sorted(set(self.base + chosen))
+
+    def blocks(self):
+        """Split the mixes into (start, stop) blocks of about CHUNK_POINTS points."""
+        per_mix = len(self.plans) * len(self.models)
+        size = max(1, CHUNK_POINTS // per_mix)
+        return [(start, min(start + size, self.num_mixes))
+                for start in range(0, self.num_mixes, size)]
+
+    @nmea_metrics.instrumented('sweep.evaluate')
+    def evaluate(self, start, stop):
+        """Return the (M, R, B) utilization of mixes start..stop."""
+        return nmea_engine.utilization(self.lengths, self.mixes(start, stop), self.plans,
+                                       self.models)
+
+    def block_columns(self, start, stop):
+        """Return the exported columns of a block as a list of arrays."""
+        usage = self.evaluate(start, stop)
+        M, R, B = usage.shape
+        mix = np.repeat(np.arange(start, stop), R * B)
+        columns = [mix]
+        columns += [(mix >> bit) & 1 for bit in range(len(self.optional))]
+        for j in range(self.plan_values.shape[1]):
+            columns.append(np.tile(np.repeat(self.plan_values[:, j], B), M))
+        columns.append(np.tile([model.baud for model in self.models], M * R))
+        columns.append(np.tile([model.bits_per_byte for model in self.models], M * R))
+        flat = usage.ravel()
+        columns += [flat, 100 - flat]
+        return columns
+
+    @nmea_metrics.instrumented('sweep.thresholds')
+    def thresholds(self, limit=None):
+        """Return the Thresholds of the limit mix and link pairs that reach the
+        ceiling at the lowest default rate, lowest first (every pair without
+        a limit).
+
+        Pairs the own-rate sentences already put over the ceiling come
+        first. Each block is ranked as it is evaluated and only the best
+        limit pairs are kept, so a large sweep never holds all of them.
+        """
+        lowest = self.plans[0].copy()
+        for j, col in enumerate(self.swept_columns):
+            lowest[col] = self.swept_grids[j].min()
+        own = np.zeros(len(self.ids))
+        own[self.swept_columns] = lowest[self.swept_columns]
+        default = np.ones(len(self.ids))
+        default[self.swept_columns] = 0
+        # (ceiling rate, saturation rate, mix, link), -inf for over already
+        best = []
+        for start, stop in self.blocks():
+            # Utilization per Hz of default rate, and of the own-rate sentences
+            usage = nmea_engine.utilization(self.lengths, self.mixes(start, stop),
+                                            np.stack([default, own]), self.models)
+            slope, fixed = usage[:, 0, :], usage[:, 1, :]
+            ceiling = _rates_at(self.ceiling, slope, fixed).ravel()
+            saturation = _rates_at(100.0, slope, fixed).ravel()
+            order = np.lexsort((saturation, ceiling))
+            if limit is not None:
+                order = order[:limit]
+            mixes, links = np.divmod(order, len(self.models))
+            best.extend(zip(ceiling[order].tolist(), saturation[order].tolist(),
+                            (mixes + start).tolist(), links.tolist()))
+            best.sort()
+            if limit is not None:
+                del best[limit:]
+        results = []
+        for ceiling, saturation, mix, b in best:
+            model = self.models[b]
+            results.append(Threshold(mix, self.members(mix), model.baud,
+                                     nmea_link.describe(model.profile),
+                                     _rate_or_none(ceiling), _rate_or_none(saturation)))
+        return results
+
+def _rates_at(limit, slope, fixed):
+    """Return the default rates reaching limit, -inf where fixed is already over."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rates = np.where(slope > 0, (limit - fixed) / slope, np.inf)
+    return np.where(fixed >= limit, -np.inf, rates)
+
+def _rate_or_none(rate):
+    return None if rate == float('-inf') else rate
+
+_sweep = None
+
+def _init_worker(sweep):
+    global _sweep
+    _sweep = sweep
+
+def _encode_block(args):
+    start, stop, fmt = args
+    return encode_block(_sweep, start, stop, fmt)
+
+def encode_block(sweep, start, stop, fmt):
+    """Return a block ready to write: CSV text, or columns for Parquet."""
+    columns = sweep.block_columns(start, stop)
+    if fmt == 'parquet':
+        return columns
+    formats = (['%d'] * (1 + len(sweep.optional)) + ['%.6g'] * (1 + len(sweep.swept))
+               + ['%.6g', '%.6g', '%.4f', '%.4f'])
+    parts = []
+    # Slices keep the Python strings of only CSV_ROWS rows alive at a time
+    for first in range(0, len(columns[0]), CSV_ROWS):
+        text = [_format_column(fmt, column[first:first + CSV_ROWS])
+                for fmt, column in zip(formats, columns)]
+        parts.append('\n'.join(map(','.join, zip(*text))))
+        parts.append('\n')
+    return ''.join(parts)
+
+def _format_column(fmt, column):
+    """Format a column as strings, formatting each distinct value only once
+    when there are few (rates, bauds and memberships repeat across a block)."""
+    values, inverse = np.unique(column, return_inverse=True)
+    if len(values) * 4 < len(column):
+        table = np.array([fmt % value for value in values.tolist()], dtype=object)
+        return table[inverse].tolist()
+    if fmt == '%d':
+        return list(map(str, column.astype(np.int64).tolist()))
+    return list(map(fmt.__mod__, column.tolist()))
+
+def _iter_blocks(sweep, fmt, workers):
+    blocks = [(start, stop, fmt) for start, stop in sweep.blocks()]
+    if workers <= 1 or sweep.num_points < PARALLEL_THRESHOLD or len(blocks) < 2:
+        for block in blocks:
+            yield encode_block(sweep, *block)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(sweep,)) as pool:
+        # Keep a bounded number of blocks in flight, written in order
+        pending = []
+        for block in blocks:
+            pending.append(pool.submit(_encode_block, block))
+            if len(pending) > 2 * workers:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+@nmea_metrics.instrumented('sweep.write')
+def write_sweep(sweep, path, fmt=None, workers=None):
+    """Evaluate a sweep and stream every point to a CSV or Parquet file.
+
+    fmt defaults from the file suffix. Returns the number of points written.
+    """
+    if fmt is None:
+        fmt = 'parquet' if str(path).endswith('.parquet') else 'csv'
+    if fmt not in ('csv', 'parquet'):
+        raise ValueError(f"Unknown output format: {fmt}")
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if fmt == 'parquet':
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Parquet output needs pyarrow (pip install pyarrow)") from None
+        writer = None
+        try:
+            for columns in _iter_blocks(sweep, fmt, workers):
+                table = pa.table(dict(zip(sweep.columns, columns)))
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        with open(path, 'w', newline='') as out:
+            out.write(','.join(sweep.columns) + '\n')
+            for text in _iter_blocks(sweep, fmt, workers):
+                out.write(text)
+    return sweep.num_points
@@ -0,0 +1,330 @@
+"""Networks of talkers, multiplexers and listeners.
+
+A topology is a directed graph. Talkers generate sentence streams,
+multiplexers merge everything they receive and queue it for each of their
+output ports, and listeners only receive. Every link is one serial port
+with its own baud rate or link profile (see nmea_link) and, optionally, a
+filter of the sentence IDs it passes:
+
+    gps1 --(4800)--\\                    /--(38400)--> ecdis
+                    mux [1024 byte buffer]
+    gyro --(4800)--/                    \\--(4800, HDT/RMC only)--> autopilot
+
+Flows are kept per (talker, sentence ID) so two GPS receivers sending GGA
+stay distinct. For each port the model reports utilization, the backlog
+bound of the port's queue and the drop risk against the multiplexer's
+buffer. The burst a queue must absorb is one copy of every sentence on it
+arriving at once; while the port keeps up with the average load the
+backlog cannot exceed that burst. A port that cannot keep up fills its
+buffer at the excess rate and then drops it, shared in proportion to each
+sentence's load, so downstream ports see what is actually forwarded.
+
+Changes to one node or link only recompute the nodes downstream of it, in
+topological order, and propagation stops where a node's output does not
+change.
+"""
+
+import heapq
+from collections import namedtuple
+
+import nmea_link
+import nmea_metrics
+import nmea_schedule
+
+TALKER, MULTIPLEXER, LISTENER = 'talker', 'multiplexer', 'listener'
+
+# Multiplexer buffer per output port when none is given, in bytes
+DEFAULT_BUFFER = 1024
+
+Flow = namedtuple('Flow', ['sentences', 'bytes_per_second', 'burst'])
+Flow.__doc__ = """Traffic on a link: sentences maps (talker, ID) to (length, rate in Hz)."""
+
+PortReport = namedtuple('PortReport', [
+    'source', 'target', 'baud', 'link', 'sentences', 'bytes_per_second', 'utilization',
+    'backlog_bytes', 'buffer_bytes', 'occupancy', 'drop_risk', 'overflow_seconds',
+    'dropped_bytes_per_second'])
+PortReport.__doc__ = """Load of one port.
+
+backlog_bytes bounds the port's queue (None when the port is overloaded
+and the queue grows without bound), occupancy is that bound as a
+percentage of the buffer. drop_risk is 'none', 'burst' (a burst may not
+fit in the buffer) or 'overflow' (the average load exceeds the port);
+overflow_seconds is then how long the buffer lasts after a burst before
+it starts dropping.
+"""
+
+EMPTY = Flow({}, 0.0, 0)
+
+def make_flow(sentences):
+    """Build a Flow from a {(talker, ID): (length, rate)} mapping."""
+    return Flow(sentences,
+                sum(length * rate for length, rate in sentences.values()),
+                sum(length for length, _ in sentences.values()))
+
+def merge_flows(flows):
+    """Combine the flows arriving at a node; repeated sentences add up their rates."""
+    sentences = {}
+    for flow in flows:
+        for key, (length, rate) in flow.sentences.items():
+            if key in sentences:
+                rate += sentences[key][1]
+            sentences[key] = (length, rate)
+    return make_flow(sentences)
+
+class Node:
+    """A talker, multiplexer or listener and the links attached to it."""
+
+    def __init__(self, name, kind, streams=(), buffer=None):
+        self.name = name
+        self.kind = kind
+        self.streams = list(streams)
+        self.buffer = buffer
+        self.inputs = []
+        self.outputs = []
+
+class Link:
+    """A serial port from one node to another."""
+
+    def __init__(self, source, target, model, sentences=None):
+        self.source = source
+        self.target = target
+        self.model = model
+        self.sentences = None if sentences is None else {ID.upper() for ID in sentences}
+
+class Topology:
+    """A network of nodes and links with incrementally updated port loads."""
+
+    def __init__(self, bits_per_byte=nmea_schedule.BITS_PER_BYTE):
+        self.bits_per_byte = bits_per_byte
+        self.nodes = {}
+        self.links = {}
+        self._order = None
+        self._dirty = set()
+        self._received = {}
+        self._carried = {}
+        self._reports = {}
+
+    # Building the graph
+
+    def add_talker(self, name, streams):
+        """Add a talker sending a list of nmea_schedule.Stream."""
+        return self._add_node(Node(name, TALKER, streams=streams))
+
+    def add_multiplexer(self, name, buffer=DEFAULT_BUFFER):
+        """Add a multiplexer with a buffer of the given bytes per output port."""
+        return self._add_node(Node(name, MULTIPLEXER, buffer=buffer))
+
+    def add_listener(self, name):
+        """Add a listener."""
+        return self._add_node(Node(name, LISTENER))
+
+    def _add_node(self, node):
+        if node.name in self.nodes:
+            raise ValueError(f"Duplicate node name: {node.name}")
+        self.nodes[node.name] = node
+        self._order = None
+        self._dirty.add(node.name)
+        return node
+
+    def connect(self, source, target, link, sentences=None):
+        """Link two nodes with a port, passing only the listed sentence IDs if
+        sentences is given. link is a baud rate or link profile."""
+        src, dst = self._node(source), self._node(target)
+        if src.kind == LISTENER:
+            raise ValueError(f"Listener '{source}' cannot send")
+        if dst.kind == TALKER:
+            raise ValueError(f"Talker '{target}' cannot receive")
+        if (source, target) in self.links:
+            raise ValueError(f"'{source}' is already linked to '{target}'")
+        model = nmea_link.link_model(link, self.bits_per_byte)
+        if source == target or self._reaches(target, source):
+            raise ValueError(f"Linking '{source}' to '{target}' would create a loop")
+        link = Link(source, target, model, sentences)
+        self.links[(source, target)] = link
+        src.outputs.append(link)
+        dst.inputs.append(link)
+        self._order = None
+        self._dirty.add(source)
+        return link
+
+    def _node(self, name):
+        try:
+            return self.nodes[name]
+        except KeyError:
+            raise KeyError(f"Unknown node: {name}") from None
+
+    def _link(self, source, target):
+        try:
+            return self.links[(source, target)]
+        except KeyError:
+            raise KeyError(f"No link from '{source}' to '{target}'") from None
+
+    def _reaches(self, start, goal):
+        stack, seen = [start], {start}
+        while stack:
+            for link in self.nodes[stack.pop()].outputs:
+                if link.target == goal:
+                    return True
+                if link.target not in seen:
+                    seen.add(link.target)
+                    stack.append(link.target)
+        return False
+
+    # Changing it
+
+    def set_streams(self, name, streams):
+        """Replace the streams a talker sends."""
+        node = self._node(name)
+        if node.kind != TALKER:
+            raise ValueError(f"'{name}' is not a talker")
+        node.streams = list(streams)
+        self._dirty.add(name)
+
+    def set_buffer(self, name, buffer):
+        """Change a multiplexer's buffer size."""
+        node = self._node(name)
+        if node.kind != MULTIPLEXER:
+            raise ValueError(f"'{name}' is not a multiplexer")
+        node.buffer = buffer
+        self._dirty.add(name)
+
+    def set_link(self, source, target, link):
+        """Change the baud rate or link profile of a link."""
+        self._link(source, target).model = nmea_link.link_model(link, self.bits_per_byte)
+        self._dirty.add(source)
+
+    def set_filter(self, source, target, sentences):
+        """Change the sentence IDs a link passes (None for all)."""
+        link = self._link(source, target)
+        link.sentences = None if sentences is None else {ID.upper() for ID in sentences}
+        self._dirty.add(source)
+
+    # Analysis
+
+    def _topological_order(self):
+        if self._order is None:
+            indegree = {name: len(node.inputs) for name, node in self.nodes.items()}
+            ready = [name for name, count in indegree.items() if not count]
+            order = []
+            while ready:
+                name = ready.pop()
+                order.append(name)
+                for link in self.nodes[name].outputs:
+                    indegree[link.target] -= 1
+                    if not indegree[link.target]:
+                        ready.append(link.target)
+            self._order = {name: i for i, name in enumerate(order)}
+        return self._order
+
+    @nmea_metrics.instrumented('topology.update')
+    def update(self):
+        """Recompute everything downstream of the nodes changed since the last
+        update and return the number of nodes recomputed."""
+        order = self._topological_order()
+        heap = [(order[name], name) for name in self._dirty if name in self.nodes]
+        heapq.heapify(heap)
+        queued = set(self._dirty)
+        self._dirty.clear()
+        recomputed = 0
+        while heap:
+            _, name = heapq.heappop(heap)
+            recomputed += 1
+            node = self.nodes[name]
+            if node.kind == TALKER:
+                received = make_flow({(name, s.id): (s.length, s.rate) for s in node.streams})
+            else:
+                received = merge_flows(self._carried.get((link.source, name), EMPTY)
+                                       for link in node.inputs)
+            self._received[name] = received
+            for link in node.outputs:
+                key = (link.source, link.target)
+                carried, report = self._port(node, link, received)
+                self._reports[key] = report
+                if self._carried.get(key) != carried:
+                    self._carried[key] = carried
+                    if link.target not in queued:
+                        queued.add(link.target)
+                        heapq.heappush(heap, (order[link.target], link.target))
+        return recomputed
+
+    def _port(self, node, link, received):
+        """Return the flow a link forwards and its PortReport."""
+        if link.sentences is None:
+            offered = received
+        else:
+            offered = make_flow({key: value for key, value in received.sentences.items()
+                                 if key[1] in link.sentences})
+        airtime = link.model.airtime
+        # Fraction of the line the offered sentences need
+        busy = sum(rate * airtime(length) for length, rate in offered.sentences.values())
+        load = offered.bytes_per_second
+        buffer = node.buffer if node.kind == MULTIPLEXER else None
+
+        if busy > 1 + 1e-9:
+            # Only what the port can carry goes on, shared by load
+            scale = 1 / busy
+            carried = make_flow({key: (length, rate * scale)
+                                 for key, (length, rate) in offered.sentences.items()})
+            backlog = None
+            occupancy = None
+            risk = 'overflow'
+            dropped = load - carried.bytes_per_second
+            overflow = max(0.0, buffer - offered.burst) / dropped if buffer is not None else 0.0
+        else:
+            carried = offered
+            backlog = offered.burst
+            occupancy = backlog / buffer * 100 if buffer else None
+            risk = 'burst' if buffer is not None and backlog > buffer else 'none'
+            overflow = None
+            dropped = 0.0
+
+        report = PortReport(
+            source=link.source, target=link.target, baud=link.model.baud,
+            link=nmea_link.describe(link.model.profile),
+            sentences=len(offered.sentences), bytes_per_second=load,
+            utilization=min(busy, 1.0) * 100,
+            backlog_bytes=backlog, buffer_bytes=buffer, occupancy=occupancy,
+            drop_risk=risk, overflow_seconds=overflow, dropped_bytes_per_second=dropped)
+        return carried, report
+
+    def ports(self):
+        """Return the PortReport of every link, bringing the analysis up to date."""
+        self.update()
+        return [self._reports[key] for key in self.links]
+
+    def port(self, source, target):
+        """Return the PortReport of one link."""
+        self._link(source, target)
+        self.update()
+        return self._reports[(source, target)]
+
+    def received(self, name):
+        """Return the Flow arriving at (or, for a talker, sent by) a node."""
+        self._node(name)
+        self.update()
+        return self._received[name]
+
+def load_topology(spec, database):
+    """Build a Topology from a spec dict.
+
+    spec = {"talkers": [{"name": "gps1", "rate": 1, "sentences": ["GGA@10", "RMC"]}],
+            "multiplexers": [{"name": "mux", "buffer": 1024}],
+            "listeners": [{"name": "ecdis"}],
+            "links": [{"from": "gps1", "to": "mux", "baud": 4800},
+                      {"from": "mux", "to": "ecdis", "baud": 38400, "framing": "8N2",
+                       "sentences": ["GGA", "RMC"]}]}
+    Talker sentences use the job file format of nmea_jobs; links take the
+    fields of nmea_link.profile_from_dict.
+    """
+    import nmea_jobs
+    topology = Topology()
+    for talker in spec.get('talkers', []):
+        topology.add_talker(talker['name'], nmea_jobs.job_streams(database, talker))
+    for mux in spec.get('multiplexers', []):
+        topology.add_multiplexer(mux['name'], int(mux.get('buffer', DEFAULT_BUFFER)))
+    for listener in spec.get('listeners', []):
+        topology.add_listener(listener['name'])
+    for link in spec.get('links', []):
+        topology.connect(link['from'], link['to'], nmea_link.profile_from_dict(link),
+                         link.get('sentences'))
+    return topology
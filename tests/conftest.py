@@ -0,0 +1,15 @@
+"""Shared fixtures: the modules live at the top of the repository."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import nmea_database
+
+@pytest.fixture(scope='session')
+def database():
+    """The compiled sentence database, loaded once for the whole run."""
+    return nmea_database.load_database()
@@ -0,0 +1,59 @@
+"""AIS load: fragments, scenario rates and streams."""
+
+import numpy as np
+import pytest
+
+import nmea_ais
+import nmea_link
+
+def test_fragment_lengths():
+    assert nmea_ais.fragment_lengths(168) == [49]
+    assert nmea_ais.fragment_lengths(424) == [82, 33]
+    assert nmea_ais.fragment_lengths(6 * nmea_ais.MAX_PAYLOAD) == [81]
+
+def test_scenario_rates():
+    rates = nmea_ais.scenario_rates(100, class_a=0.6, base_stations=2)
+    assert rates[nmea_ais.POSITION_A] == pytest.approx(60 / nmea_ais.CLASS_A_INTERVAL)
+    assert rates[nmea_ais.POSITION_B] == pytest.approx(40 / nmea_ais.CLASS_B_INTERVAL)
+    assert rates[nmea_ais.STATIC_B_PART_B] == pytest.approx(40 / nmea_ais.STATIC_INTERVAL)
+    assert rates[nmea_ais.BASE_STATION] == pytest.approx(0.2)
+
+@pytest.mark.parametrize('kwargs', [
+    {'targets': -1}, {'targets': 10, 'class_a': 1.5}, {'targets': 10, 'class_a_interval': 0},
+])
+def test_bad_scenarios(kwargs):
+    with pytest.raises(ValueError):
+        nmea_ais.scenario_rates(**kwargs)
+
+def test_grid_broadcasts_like_single_scenarios():
+    targets = np.array([10, 100, 400])
+    grid = nmea_ais.load(nmea_ais.scenario_rates(targets, 0.5), 38400)
+    for i, count in enumerate(targets):
+        single = nmea_ais.load(nmea_ais.scenario_rates(count, 0.5), 38400)
+        assert grid.bytes_per_second[i] == pytest.approx(single.bytes_per_second)
+        assert grid.utilization[i] == pytest.approx(single.utilization)
+
+def test_streams_carry_the_load():
+    rates = nmea_ais.scenario_rates(200, class_a=0.7, aids=3)
+    streams = nmea_ais.streams(rates)
+    load = nmea_ais.load(rates, 38400)
+    assert sum(stream.rate for stream in streams) == pytest.approx(load.sentences)
+    assert sum(stream.rate * stream.length for stream in streams) == pytest.approx(load.bytes_per_second)
+    assert nmea_link.link_model(38400).utilization(streams) == pytest.approx(load.utilization)
+    assert nmea_ais.load(rates).utilization is None
+
+def test_target_rates_match_their_scenario():
+    is_a, intervals = nmea_ais.random_targets(500, class_a=0.4, seed=3)
+    rates = nmea_ais.target_rates(is_a, intervals)
+    assert rates[nmea_ais.POSITION_A] == pytest.approx((1 / intervals[is_a]).sum())
+    assert rates[nmea_ais.STATIC_A] == pytest.approx(is_a.sum() / nmea_ais.STATIC_INTERVAL)
+    again = nmea_ais.random_targets(500, class_a=0.4, seed=3)
+    assert (again[0] == is_a).all() and (again[1] == intervals).all()
+
+def test_job_entry():
+    streams = nmea_ais.job_streams({'targets': 10, 'own_ship': 2})
+    assert {stream.id for stream in streams} == {'VDM', 'VDO'}
+    own = sum(stream.rate for stream in streams if stream.id == 'VDO' and stream.length == 49)
+    assert own == pytest.approx(0.5)
+    with pytest.raises(ValueError):
+        nmea_ais.job_streams({'class_a': 1})
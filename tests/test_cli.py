@@ -0,0 +1,43 @@
+"""Exit codes and error reporting of the command-line subcommands."""
+
+import json
+
+import pytest
+
+import nmea0183bwcalc
+
+SPECS = {
+    'run': [{'sentences': ['GGA']}],
+    'solve': {'required': ['GGA'], 'optional': ['RMC']},
+    'network': {'talkers': [{'name': 'gps', 'sentences': ['GGA']}],
+                'listeners': [{'name': 'ecdis'}],
+                'links': [{'from': 'gps', 'to': 'ecdis', 'baud': 4800}]},
+    'lan': {'devices': [{'name': 'gps', 'sentences': ['GGA']}]},
+    'sweep': {'mixes': [['GGA']], 'rates': [1]},
+    'risk': [{'sentences': ['GGA'], 'baud': 38400}],
+}
+
+def spec_file(tmp_path, command):
+    path = tmp_path / f"{command}.json"
+    path.write_text(json.dumps(SPECS[command]))
+    return str(path)
+
+@pytest.mark.parametrize('command', sorted(SPECS))
+def test_database_failure_exits_2(tmp_path, monkeypatch, capsys, command):
+    monkeypatch.setenv('NMEA_CATALOGS', str(tmp_path / 'missing.json'))
+    extra = ['-n', '1000'] if command == 'risk' else []
+    assert nmea0183bwcalc.main([command, spec_file(tmp_path, command)] + extra) == 2
+    out, err = capsys.readouterr()
+    assert out == ''
+    assert err.startswith('Error loading database:')
+
+@pytest.mark.parametrize('command', ['run', 'solve', 'network'])
+def test_success(tmp_path, capsys, command):
+    assert nmea0183bwcalc.main([command, spec_file(tmp_path, command)]) == 0
+    json.loads(capsys.readouterr().out)
+
+def test_bad_rate_fails_the_run(tmp_path, capsys):
+    path = tmp_path / 'jobs.json'
+    path.write_text(json.dumps([{'sentences': [{'id': 'GGA', 'rate': -5}]}]))
+    assert nmea0183bwcalc.main(['run', str(path)]) == 1
+    assert 'Update rate' in json.loads(capsys.readouterr().out)[0]['error']
@@ -0,0 +1,79 @@
+"""Catalog layering and the compiled cache."""
+
+import json
+import os
+
+import pytest
+
+import nmea_database
+
+def record(name, widths, standard='N'):
+    fields = ','.join('x' * width for width in widths)
+    return {'sentence_name': name, 'sentence_structure': f"$--XXX,{fields}*hh<CR><LF>",
+            'field_names': [f"Field {i}" for i in range(len(widths))],
+            'chars_per_field': widths, 'standard': standard}
+
+BASE = {'metadata': {'version': '1.0'},
+        'sentences': {'AAA': record('Alpha', [1, 2]), 'BBB': record('Bravo', [3]),
+                      'CCC': record('Charlie', [4, 4])}}
+VENDOR = {'metadata': {'name': 'vendor'},
+          'sentences': {'PXYZ': record('Vendor sentence', [5], 'P'),
+                        'AAA': {'sentence_name': 'Alpha, patched'},
+                        'CCC': None}}
+
+@pytest.fixture
+def catalogs(tmp_path):
+    base, vendor = tmp_path / 'base.json', tmp_path / 'vendor.json'
+    base.write_text(json.dumps(BASE))
+    vendor.write_text(json.dumps(VENDOR))
+    return base, vendor
+
+def test_merge_adds_overrides_and_removes():
+    sentences, metadata, origins = nmea_database.merge_catalogs([BASE, VENDOR], ['base', 'vendor'])
+    assert sorted(sentences) == ['AAA', 'BBB', 'PXYZ']
+    assert sentences['AAA']['sentence_name'] == 'Alpha, patched'
+    assert sentences['AAA']['chars_per_field'] == [1, 2]
+    assert origins == {'AAA': 0, 'BBB': 0, 'PXYZ': 1}
+    assert [entry['name'] for entry in metadata['catalogs']] == ['base', 'vendor']
+    assert metadata['version'] == '1.0'
+
+def test_new_sentence_needs_every_key():
+    layer = {'sentences': {'NEW': {'sentence_name': 'Incomplete'}}}
+    with pytest.raises(ValueError, match='NEW'):
+        nmea_database.merge_catalogs([BASE, layer])
+
+def test_layered_database(catalogs):
+    base, vendor = catalogs
+    table = nmea_database.load_database(base, catalogs=[str(vendor)])
+    assert sorted(table) == ['AAA', 'BBB', 'PXYZ']
+    assert 'CCC' not in table
+    assert table['AAA']['sentence_name'] == 'Alpha, patched'
+    assert table.catalog_of('PXYZ')['name'] == 'vendor'
+    assert table.catalog_of('AAA')['name'] == 'base'
+    assert table.select(catalog='vendor') == ['PXYZ']
+    # Each combination of files has a cache of its own
+    assert sorted(nmea_database.load_database(base, catalogs=[])) == ['AAA', 'BBB', 'CCC']
+    assert nmea_database.cache_path_for(base, [vendor]).exists()
+    assert nmea_database.cache_path_for(base).exists()
+
+def test_cache_follows_the_files(catalogs):
+    base, vendor = catalogs
+    first = nmea_database.load_database(base, catalogs=[str(vendor)])
+    # Touched but unchanged: the records are the same
+    stat = os.stat(vendor)
+    os.utime(vendor, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert nmea_database.load_database(base, catalogs=[str(vendor)]).digest == first.digest
+    # A changed layer is recompiled
+    changed = dict(VENDOR, sentences=dict(VENDOR['sentences'], BBB=None))
+    vendor.write_text(json.dumps(changed))
+    table = nmea_database.load_database(base, catalogs=[str(vendor)])
+    assert sorted(table) == ['AAA', 'PXYZ']
+    assert table.digest != first.digest
+
+def test_database_digest(database):
+    assert nmea_database.database_digest(database) == database.digest
+    records = {'AAA': record('Alpha', [1])}
+    digest = nmea_database.database_digest(records)
+    assert nmea_database.database_digest({'AAA': record('Alpha', [1])}) == digest
+    records['AAA']['chars_per_field'] = [2]
+    assert nmea_database.database_digest(records) != digest
@@ -0,0 +1,52 @@
+"""Bounds of the on-the-wire length model."""
+
+import pytest
+
+import nmea_fields
+from nmea_fields import FRAME_OVERHEAD, MAX_SENTENCE_LENGTH, wire_lengths
+
+def record(structure, widths):
+    return {'sentence_structure': structure, 'chars_per_field': widths}
+
+def test_fixed_fields_cannot_grow():
+    # The frame and a comma per field, then the widths, none of which can grow
+    assert wire_lengths(record('$--ZDA,hhmmss.ss,xx,xx*hh<CR><LF>', [9, 2, 2])) == (
+        FRAME_OVERHEAD + 3, FRAME_OVERHEAD + 3 + 13, FRAME_OVERHEAD + 3 + 13)
+
+def test_variable_number_widens():
+    minimum, typical, maximum = wire_lengths(record('$--MWV,x.x,a,x.x,a*hh<CR><LF>', [5, 1, 4, 1]))
+    assert minimum == FRAME_OVERHEAD + 4
+    assert typical == minimum + 11
+    assert maximum == minimum + 2 * (len('x.x') + nmea_fields.VARIABLE_DIGITS) + 2
+
+def test_text_fills_to_the_limit():
+    assert wire_lengths(record('$--TXT,xx,xx,xx,c--c*hh<CR><LF>', [2, 2, 2, 20]))[2] == (
+        MAX_SENTENCE_LENGTH)
+
+def test_missing_widths_use_the_format():
+    assert wire_lengths(record('$--HDT,x.x,T*hh<CR><LF>', []))[1] == FRAME_OVERHEAD + 2 + 4
+
+def test_catalog_bounds(database):
+    for ID in database.ids:
+        sentence = database[ID]
+        minimum, typical, maximum = wire_lengths(sentence)
+        formats = nmea_fields.field_formats(sentence['sentence_structure'])
+        widths = sentence.get('chars_per_field', [])
+        num_fields = max(len(formats), len(widths))
+        assert minimum == FRAME_OVERHEAD + num_fields, ID
+        assert minimum <= typical <= maximum, ID
+        # Only a record whose typical length is already over the limit goes past it
+        assert maximum <= max(typical, MAX_SENTENCE_LENGTH), ID
+        assert database.wire_lengths(ID) == (minimum, typical, maximum), ID
+
+@pytest.mark.parametrize('null_rate', [0.0, 0.3, 1.0])
+def test_distribution_within_bounds(database, null_rate):
+    for ID in ('GGA', 'RMC', 'MWV', 'GSV'):
+        minimum, typical, maximum = wire_lengths(database[ID])
+        pmf = nmea_fields.length_distribution(database[ID], null_rate)
+        assert sum(pmf) == pytest.approx(1.0)
+        support = [n for n, p in enumerate(pmf) if p > 1e-12]
+        assert min(support) >= minimum
+        assert max(support) <= MAX_SENTENCE_LENGTH
+        if null_rate == 1.0:
+            assert support == [minimum]
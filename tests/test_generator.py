@@ -0,0 +1,56 @@
+"""Synthetic traffic: checksums, lengths and field ranges."""
+
+import random
+
+import pytest
+
+import nmea_generator
+from nmea_schedule import Stream
+
+IDS = ['GGA', 'GSV', 'RMC', 'GLL', 'ZDA', 'GSA', 'VTG']
+
+def fields(data):
+    return data[1:data.index(b'*')].decode('ascii').split(',')
+
+@pytest.fixture(scope='module')
+def templates(database):
+    streams = [Stream(ID, database.wire_lengths(ID)[1], 1) for ID in IDS]
+    return nmea_generator.compile_templates(database, streams)
+
+def test_checksum_and_length(templates):
+    for (ID, length), template in templates.items():
+        for variant in range(nmea_generator.VARIANTS):
+            for seconds in (0.0, 3600.5, 86399.99):
+                data = template.render(variant, seconds)
+                body, trailer = data[1:].split(b'*')
+                assert trailer == b'%02X\r\n' % nmea_generator.xor_of(body)
+                assert len(data) == template.length == length, ID
+
+def test_measured_length_is_reached(database):
+    typical = database.wire_lengths('GGA')[1]
+    for length in (typical - 3, typical + 9):
+        template = nmea_generator.compile_templates(database, [Stream('GGA', length, 1)])[('GGA', length)]
+        assert len(template.render(0, 12.0)) == template.length == length
+
+def test_field_values_are_in_range(templates):
+    gga = templates[next(key for key in templates if key[0] == 'GGA')]
+    gsv = templates[next(key for key in templates if key[0] == 'GSV')]
+    for variant in range(nmea_generator.VARIANTS):
+        values = fields(gga.render(variant, 0.0))
+        assert int(values[2][2:4]) < 60 and int(values[2][:2]) <= 89
+        assert int(values[4][3:5]) < 60 and int(values[4][:3]) <= 179
+        assert values[3] in ('N', 'S') and values[5] in ('E', 'W')
+        assert 1 <= int(values[6]) <= 2
+        assert 4 <= int(values[7]) <= 12
+        total, number = map(int, fields(gsv.render(variant, 0.0))[1:3])
+        assert 1 <= number <= total
+
+@pytest.mark.parametrize('token, width, name', [
+    ('llll.ll', 7, 'Latitude'), ('llll.ll', 3, 'Latitude'), ('x', 1, 'GPS Quality'),
+    ('xx', 2, 'No. of Satellites'), ('xxxxxx', 6, 'Date'), ('x.x', 5, 'Speed'),
+    ('c--c', 4, 'Text'), ('hh', 2, 'Checksum'), ('xx', 0, 'Empty'),
+])
+def test_fill_keeps_the_width(token, width, name):
+    rng = random.Random(1)
+    for _ in range(50):
+        assert len(nmea_generator._fill(token, width, name, rng)) == width
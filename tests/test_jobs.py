@@ -0,0 +1,72 @@
+"""Job files: rates, single jobs and evaluation."""
+
+import json
+
+import pytest
+
+import nmea_jobs
+
+@pytest.mark.parametrize('job', [
+    {'sentences': [{'id': 'GGA', 'rate': -5}]},
+    {'sentences': [{'id': 'GGA', 'rate': 0}]},
+    {'sentences': [{'id': 'GGA', 'rate': 'fast'}]},
+    {'sentences': ['GGA@0']},
+    {'sentences': ['GGA@-1']},
+    {'rate': 0, 'sentences': ['GGA']},
+    {'rate': -1, 'sentences': ['GGA@10']},
+])
+def test_bad_rates_are_errors(database, job):
+    result = nmea_jobs.evaluate_job(database, job)
+    assert 'Update rate' in result['error']
+    assert 'expected' not in result
+
+def test_rates(database):
+    streams = nmea_jobs.job_streams(database, {'rate': 2, 'sentences': [
+        'GGA@10', 'RMC', {'id': 'gsv', 'rate': 0.2}, {'id': 'VTG'}]})
+    assert [(s.id, s.rate) for s in streams] == [('GGA', 10), ('RMC', 2), ('GSV', 0.2), ('VTG', 2)]
+    assert streams[0].length == database.wire_lengths('GGA')[1]
+
+def test_unknown_sentence(database):
+    result = nmea_jobs.evaluate_job(database, {'sentences': ['XYZ']}, 4)
+    assert result == {'name': 'job-5', 'error': "Sentence ID 'XYZ' not found in database"}
+
+def test_result_matches_the_link(database):
+    result = nmea_jobs.evaluate_job(database, {'name': 'bridge', 'baud': 38400, 'framing': '7E1',
+                                               'sentences': ['GGA@10', 'RMC']})
+    length = database.wire_lengths('GGA')[1] * 10 + database.wire_lengths('RMC')[1]
+    assert result['bytes_per_second'] == length
+    # 7E1 is 10 bits a character, like 8N1
+    assert result['expected'] == pytest.approx(length * 10 / 38400 * 100, abs=1e-3)
+    assert result['best'] <= result['expected'] <= result['worst']
+    assert result['link'] == '38400 7E1'
+
+@pytest.mark.parametrize('document, count', [
+    ([{'sentences': ['GGA']}, {'sentences': ['RMC']}], 2),
+    ({'jobs': [{'sentences': ['GGA']}]}, 1),
+    ({'sentences': ['GGA'], 'baud': 4800}, 1),
+    ({'ais': {'targets': 10}}, 1),
+])
+def test_load_jobs(tmp_path, document, count):
+    path = tmp_path / 'jobs.json'
+    path.write_text(json.dumps(document))
+    assert len(nmea_jobs.load_jobs(path)) == count
+
+def test_load_jobs_rejects_other_documents(tmp_path):
+    path = tmp_path / 'jobs.json'
+    path.write_text(json.dumps({'baud': 4800}))
+    with pytest.raises(ValueError):
+        nmea_jobs.load_jobs(path)
+
+def test_run_keeps_order(database):
+    jobs = [{'name': str(i), 'sentences': [f"GGA@{i + 1}"]} for i in range(5)]
+    results = nmea_jobs.run_jobs(jobs, workers=1)
+    assert [r['name'] for r in results] == ['0', '1', '2', '3', '4']
+    assert [r['bytes_per_second'] for r in results] == [
+        database.wire_lengths('GGA')[1] * (i + 1) for i in range(5)]
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_run_with_a_missing_catalog(monkeypatch, tmp_path, workers):
+    monkeypatch.setenv('NMEA_CATALOGS', str(tmp_path / 'missing.json'))
+    monkeypatch.setattr(nmea_jobs, 'PARALLEL_THRESHOLD', 1)
+    with pytest.raises(OSError):
+        nmea_jobs.run_jobs([{'sentences': ['GGA']}], workers=workers)
@@ -0,0 +1,95 @@
+"""IEC 61162-450 networks: datagrams, batching and switch ports."""
+
+import pytest
+
+import nmea_generator
+import nmea_lan
+from nmea_schedule import Stream
+
+GPS = [Stream('GGA', 71, 10), Stream('RMC', 68, 1)]
+
+def test_datagram_layout():
+    datagram, line = nmea_lan.encode_datagram([b'$GPGGA,1*00\r\n', b'$GPRMC,2*00\r\n'],
+                                              'GP0001', line=999)
+    assert line == 2
+    assert datagram.startswith(nmea_lan.HEADER + b'\\s:GP0001,n:999*')
+    tag = nmea_lan.tag_block('GP0001', 1)
+    assert tag == b'\\s:GP0001,n:1*%02X\\' % nmea_generator.xor_of(b's:GP0001,n:1')
+    assert datagram.endswith(tag + b'$GPRMC,2*00\r\n')
+
+def test_small_frames_are_padded():
+    overhead = nmea_lan.frame_overhead()
+    assert nmea_lan.wire_bytes(1) == nmea_lan.min_payload() + overhead
+    assert nmea_lan.wire_bytes(500) == 500 + overhead
+    assert nmea_lan.wire_bytes(500, vlan=True) == 500 + overhead + nmea_lan.VLAN_TAG
+
+def test_window_share():
+    assert nmea_lan.window_share([Stream('GGA', 71, 1)], 0.1) == pytest.approx(0.1)
+    # Two streams released together occupy the same windows
+    together = [Stream('GGA', 71, 1), Stream('RMC', 68, 1)]
+    assert nmea_lan.window_share(together, 0.1) == pytest.approx(0.1)
+    apart = [Stream('GGA', 71, 1), Stream('RMC', 68, 1, 0.5)]
+    assert nmea_lan.window_share(apart, 0.1) == pytest.approx(0.2)
+    assert nmea_lan.window_share([Stream('GGA', 71, 10)], 0.5) == 1.0
+
+def test_batching_saves_datagrams():
+    single = nmea_lan.group_load([GPS])
+    assert single.sentences == single.datagrams == 11
+    batched = nmea_lan.group_load([GPS], batch=0.1)
+    assert batched.sentences == 11
+    assert batched.datagrams == pytest.approx(10)
+    assert batched.wire_bytes < single.wire_bytes
+    # A sentence limit adds datagrams
+    assert nmea_lan.group_load([GPS], batch=1.0, max_sentences=2).datagrams == pytest.approx(5.5)
+    assert nmea_lan.group_load([]) == nmea_lan.LanLoad(0.0, 0.0, 0.0, 0.0)
+
+def network(snooping):
+    network = nmea_lan.Network(snooping=snooping)
+    network.add_switch('bridge')
+    network.add_switch('ecr')
+    network.connect('bridge', 'ecr', 1000)
+    network.add_device('gps', 'bridge', [('NAVD', GPS)])
+    network.add_device('ecdis', 'ecr', listen=['NAVD'])
+    network.add_device('radar', 'bridge', listen=['TGTD'])
+    return network
+
+def ports(network):
+    return {(port.switch, port.neighbor): port for port in network.ports()}
+
+def test_snooping_forwards_only_to_members():
+    snooped = ports(network(True))
+    assert snooped['bridge', 'radar'].out_packets == 0
+    assert snooped['ecr', 'ecdis'].out_packets == pytest.approx(11)
+    assert snooped['bridge', 'ecr'].out_packets == pytest.approx(11)
+    flooded = ports(network(False))
+    assert flooded['bridge', 'radar'].out_packets == pytest.approx(11)
+
+def test_network_checks():
+    lan = network(True)
+    with pytest.raises(ValueError):
+        lan.connect('ecr', 'bridge')
+    with pytest.raises(KeyError):
+        lan.add_device('log', 'mast')
+    with pytest.raises(ValueError):
+        lan.add_device('log', 'bridge', [('NOPE', GPS)])
+    with pytest.raises(ValueError):
+        lan.add_device('gps', 'bridge')
+    with pytest.raises(ValueError):
+        lan.set_batch('gps', -1)
+    with pytest.raises(ValueError):
+        nmea_lan.group_address('NOPE')
+
+def test_load_network(database):
+    spec = {'switches': [{'name': 'bridge'}],
+            'devices': [{'name': 'gateway', 'switch': 'bridge', 'batch': 0.05,
+                         'serial': [{'name': 'gyro', 'baud': 4800, 'sentences': ['HDT@10']}]},
+                        {'name': 'ais', 'switch': 'bridge', 'ais': {'targets': 50}},
+                        {'name': 'ecdis', 'switch': 'bridge', 'listen': ['NAVD', 'TGTD']}]}
+    lan = nmea_lan.load_network(spec, database)
+    reports = {report.name: report for report in lan.device_reports()}
+    assert reports['gateway'].groups == ['NAVD']
+    assert reports['ais'].groups == ['TGTD']
+    hdt = database.wire_lengths('HDT')[1]
+    assert reports['gateway'].serial['gyro'] == pytest.approx(10 * hdt * 10 / 4800 * 100)
+    assert reports['ecdis'].received_packets == pytest.approx(
+        reports['gateway'].datagrams + reports['ais'].datagrams)
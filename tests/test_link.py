@@ -0,0 +1,59 @@
+"""Link profiles: framing, parsing and airtime."""
+
+import pytest
+
+import nmea_link
+from nmea_schedule import Stream
+
+@pytest.mark.parametrize('text, expected', [
+    ('8N1', (8, 'N', 1)), ('7e1', (7, 'E', 1)), ('8N2', (8, 'N', 2)), ('5N1.5', (5, 'N', 1.5)),
+])
+def test_parse_framing(text, expected):
+    assert nmea_link.parse_framing(text) == expected
+
+@pytest.mark.parametrize('text', ['9N1', '8X1', '8N3', '', 'fast'])
+def test_bad_framing(text):
+    with pytest.raises(ValueError):
+        nmea_link.parse_framing(text)
+
+def test_parse_link():
+    assert nmea_link.parse_link('115200 7E1') == nmea_link.make_profile(115200, '7E1')
+    assert nmea_link.parse_link('38400/8N2') == nmea_link.make_profile(38400, '8N2')
+    assert nmea_link.parse_link(4800) == nmea_link.make_profile(4800)
+
+@pytest.mark.parametrize('text', ['', '4800 8N1 extra', '0', '-9600', 'fast 8N1'])
+def test_bad_link(text):
+    with pytest.raises(ValueError):
+        nmea_link.parse_link(text)
+
+def test_profile_from_dict():
+    profile = nmea_link.profile_from_dict({'link': '9600 7E1', 'fifo_depth': '16',
+                                           'refill_latency': 0.001, 'name': 'gyro'})
+    assert (profile.baud, nmea_link.framing_of(profile)) == (9600, '7E1')
+    assert profile.fifo_depth == 16
+    assert nmea_link.profile_from_dict({}) == nmea_link.make_profile(4800)
+
+@pytest.mark.parametrize('data', [
+    {'baud': 'fast'}, {'baud': 0}, {'fifo_depth': 1.5}, {'fifo_depth': -1},
+    {'sentence_gap': 'x'}, {'framing': '8Q1'},
+])
+def test_bad_profile_dict(data):
+    with pytest.raises(ValueError, match='.'):
+        nmea_link.profile_from_dict(data)
+
+def test_airtime_counts_the_framing_and_overheads():
+    assert nmea_link.link_model(4800).airtime(48) == pytest.approx(48 * 10 / 4800)
+    assert nmea_link.link_model('4800 7E2').airtime(48) == pytest.approx(48 * 11 / 4800)
+    profile = nmea_link.make_profile(4800, fifo_depth=16, refill_latency=0.001,
+                                     sentence_gap=0.002)
+    model = nmea_link.link_model(profile)
+    assert model.airtime(48) == pytest.approx(0.1 + 0.002 + 2 * 0.001)
+    # The table and the formula agree past its end
+    assert model.airtime(nmea_link.TABLE_SIZE + 4) == pytest.approx(
+        model._airtime(nmea_link.TABLE_SIZE + 4))
+    assert model.utilization([Stream('GGA', 48, 10)]) == pytest.approx(10 * 0.104 * 100)
+
+def test_plain_baud_with_bits_per_byte():
+    model = nmea_link.link_model(4800, bits_per_byte=11)
+    assert model.bits_per_byte == 11
+    assert model.profile.char_gap == 1
@@ -0,0 +1,53 @@
+"""Capture statistics: lengths, checksums and observed rates."""
+
+import pytest
+
+import nmea_logstats
+from nmea_monitor import checksum
+
+def line(body, terminator=b'\r\n'):
+    return f"${body}*{checksum(body.encode()):02X}".encode() + terminator
+
+def capture(seconds=10):
+    data = b''
+    for second in range(seconds):
+        stamp = f"{second // 3600:02d}{second // 60 % 60:02d}{second % 60:02d}.00"
+        data += line(f"GPGGA,{stamp},1,2")
+        data += line(f"GPRMC,{stamp},A", b'\n')
+    return data + b'$GPHDT,1.0,T*00\r\n' + b'junk\r\n'
+
+def test_lengths_checksums_and_rates():
+    stats = nmea_logstats.LogStats()
+    stats.feed(capture())
+    gga, rmc, hdt = (stats.sentences[ID] for ID in ('GGA', 'RMC', 'HDT'))
+    assert gga.count == rmc.count == 10
+    assert hdt.checksum_errors == 1
+    # A bare LF is counted as the CR/LF it stands for
+    assert rmc.histogram == {len(line('GPRMC,000000.00,A')): 10}
+    assert stats.malformed == 1
+    assert stats.duration == pytest.approx(9.0)
+    assert stats.rate('GGA') == pytest.approx(10 / 9)
+    assert stats.rate('XYZ') is None
+
+def test_chunking_does_not_change_the_result(tmp_path):
+    path = tmp_path / 'capture.nmea'
+    path.write_bytes(capture(50))
+    whole = nmea_logstats.ingest(path).to_dict()
+    assert nmea_logstats.ingest(path, chunk_size=37).to_dict() == whole
+
+def test_profile_merge_and_round_trip(tmp_path):
+    stats = nmea_logstats.LogStats()
+    stats.feed(line('GPVTG,1') + line('GPVTG,1234') + line('GPVTG,12345678'))
+    lengths = sorted(stats.sentences['VTG'].histogram)
+    assert stats.profile('max') == {'VTG': lengths[-1]}
+    assert stats.profile('min') == {'VTG': lengths[0]}
+    assert stats.profile('p50') == {'VTG': lengths[1]}
+    with pytest.raises(ValueError):
+        stats.profile('median')
+    path = tmp_path / 'profile.json'
+    stats.save(path)
+    loaded = nmea_logstats.load_profile(path)
+    assert loaded.to_dict() == stats.to_dict()
+    loaded.merge(stats)
+    assert loaded.sentences['VTG'].count == 6
+    assert loaded.profile('mean') == stats.profile('mean')
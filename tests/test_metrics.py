@@ -0,0 +1,35 @@
+"""Metric output formats and the instrumentation switch."""
+
+import json
+
+import pytest
+
+import nmea_metrics
+
+@pytest.fixture
+def metrics():
+    nmea_metrics.enable()
+    yield nmea_metrics
+    nmea_metrics.disable()
+
+@nmea_metrics.instrumented('test.square')
+def square(x):
+    return x * x
+
+def test_counts_calls_only_when_enabled(metrics):
+    nmea_metrics.reset()
+    assert square(3) == 9
+    square(4)
+    assert nmea_metrics.snapshot()['timers']['test.square']['calls'] == 2
+
+@pytest.mark.parametrize('name, prometheus', [
+    ('metrics.prom', True), ('metrics.txt', False), ('metrics.json', False)])
+def test_format_follows_the_suffix(metrics, tmp_path, name, prometheus):
+    square(2)
+    path = tmp_path / name
+    nmea_metrics.write_metrics(path)
+    text = path.read_text()
+    if prometheus:
+        assert text == nmea_metrics.prometheus()
+    else:
+        assert 'test.square' in json.loads(text)['timers']
@@ -0,0 +1,91 @@
+"""Live monitor: line framing, checksums and serial port settings."""
+
+import os
+import sys
+
+import pytest
+
+import nmea_generator
+import nmea_link
+import nmea_monitor
+
+termios = pytest.importorskip('termios')
+
+def sentence(body):
+    return f"${body}*{nmea_monitor.checksum(body.encode()):02X}\r\n".encode()
+
+def test_counts_sentences_split_across_reads(database):
+    monitor = nmea_monitor.Monitor(database, 4800, window=10)
+    data = (sentence('GPGGA,1,2,3') + b'$GPRMC,1,2*00\r\n' + b'$PGRME,1,2\r\n'
+            + b'noise\r\n' + sentence('GPGGA,4,5,6'))
+    for i in range(0, len(data), 7):
+        monitor.feed(data[i:i + 7], now=i / len(data))
+    snapshot = monitor.snapshot(now=1.0)
+    assert snapshot.total_sentences == 4
+    assert snapshot.total_bytes == len(data)
+    assert snapshot.checksum_errors == 1
+    assert snapshot.missing_checksum == 1
+    assert snapshot.noise_bytes == len(b'noise\n')
+    counts = {entry.id: (entry.count, entry.checksum_errors) for entry in snapshot.sentences}
+    assert counts == {'GGA': (2, 0), 'RMC': (1, 1), 'PGRME': (1, 0)}
+
+def test_measured_utilization_uses_the_framing(database):
+    line = sentence('GPGGA,1,2,3')
+    for link in ('4800', '4800 7E1', '4800 8N2'):
+        monitor = nmea_monitor.Monitor(database, link, window=10)
+        for second in range(11):
+            monitor.feed(line, now=float(second))
+        snapshot = monitor.snapshot(now=10.0)
+        model = nmea_link.link_model(link)
+        assert snapshot.measured == pytest.approx(
+            snapshot.bytes_per_second * model.seconds_per_byte * 100)
+
+@pytest.fixture
+def port(monkeypatch):
+    """A PTY whose termios settings are captured rather than applied."""
+    master, slave = os.openpty()
+    applied = []
+    monkeypatch.setattr(termios, 'tcsetattr', lambda fd, when, attrs: applied.append(attrs))
+    yield slave, applied
+    os.close(master)
+    os.close(slave)
+
+@pytest.mark.parametrize('link, size, parity, odd, two_stop', [
+    (4800, termios.CS8, False, False, False),
+    ('4800 7E1', termios.CS7, True, False, False),
+    ('38400 8O1', termios.CS8, True, True, False),
+    ('9600 8N2', termios.CS8, False, False, True),
+    (nmea_link.make_profile(4800, '7O1'), termios.CS7, True, True, False),
+])
+def test_framing_is_applied(port, link, size, parity, odd, two_stop):
+    fd, applied = port
+    nmea_monitor.configure_serial(fd, link)
+    cflag = applied[-1][2]
+    assert cflag & termios.CSIZE == size
+    assert bool(cflag & termios.PARENB) == parity
+    assert bool(cflag & termios.PARODD) == odd
+    assert bool(cflag & termios.CSTOPB) == two_stop
+    baud = nmea_link.link_model(link).baud
+    assert applied[-1][4] == applied[-1][5] == getattr(termios, f'B{baud}')
+
+@pytest.mark.parametrize('link', ['4800 8N1.5', '4800 5N2', 1234])
+def test_unsupported_settings(port, link):
+    with pytest.raises(ValueError):
+        nmea_monitor.configure_serial(port[0], link)
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason="mark parity is Linux only")
+def test_mark_parity(port):
+    if not hasattr(termios, 'CMSPAR'):
+        with pytest.raises(ValueError):
+            nmea_monitor.configure_serial(port[0], '4800 7M1')
+    else:
+        nmea_monitor.configure_serial(port[0], '4800 7M1')
+        assert port[1][-1][2] & termios.CMSPAR
+
+def test_generator_sets_the_framing(port, monkeypatch):
+    fd, applied = port
+    monkeypatch.setattr(os, 'open', lambda *args: os.dup(fd))
+    write, close = nmea_generator.open_sink(os.ttyname(fd), nmea_link.make_profile(4800, '7E1'))
+    close()
+    assert applied[-1][2] & termios.CSIZE == termios.CS7
+    assert applied[-1][2] & termios.PARENB
@@ -0,0 +1,76 @@
+"""Named presets and the persistent result cache."""
+
+import json
+
+import pytest
+
+import nmea_presets
+from nmea_schedule import Stream
+
+def test_preset_round_trip(tmp_path):
+    path = tmp_path / 'presets.json'
+    assert nmea_presets.load_presets(path) == {}
+    preset = nmea_presets.make_preset([('GGA', 10), ('RMC', None)], 1, '4800 7E1')
+    nmea_presets.save_preset('bridge', preset, path)
+    assert nmea_presets.load_presets(path) == {'bridge': preset}
+    profile, default_rate, sentences = nmea_presets.preset_mix(preset)
+    assert (profile.baud, default_rate, sentences) == (4800, 1, [('GGA', 10), ('RMC', None)])
+    assert nmea_presets.delete_preset('bridge', path)
+    assert not nmea_presets.delete_preset('bridge', path)
+
+def test_bad_presets_file(tmp_path):
+    path = tmp_path / 'presets.json'
+    path.write_text(json.dumps(['bridge']))
+    with pytest.raises(ValueError):
+        nmea_presets.load_presets(path)
+
+@pytest.mark.parametrize('preset', [
+    {'sentences': [{'id': 'GGA', 'rate': -5}]},
+    {'sentences': [{'id': 'GGA', 'rate': 0}]},
+    {'sentences': ['GGA@0']},
+    {'sentences': ['GGA'], 'rate': 0},
+])
+def test_bad_rates(preset):
+    with pytest.raises(ValueError, match='Update rate'):
+        nmea_presets.preset_mix(preset)
+
+MIX = [Stream('GGA', 71, 10), Stream('RMC', 68, 1)]
+
+def test_cache_hits_any_order(database, tmp_path):
+    cache = nmea_presets.ResultCache(database, tmp_path / 'results.json')
+    first = cache.usage(MIX, 4800)
+    assert cache.usage(list(reversed(MIX)), 4800) == first
+    assert (cache.hits, cache.misses) == (1, 1)
+    # A different framing is a different entry
+    cache.usage(MIX, '4800 8N2')
+    assert cache.misses == 2
+
+def test_cache_survives_sessions(database, tmp_path):
+    path = tmp_path / 'results.json'
+    cache = nmea_presets.ResultCache(database, path)
+    usage = cache.usage(MIX, 4800)
+    cache.save()
+    again = nmea_presets.ResultCache(database, path)
+    assert again.usage(MIX, 4800) == usage
+    assert again.hits == 1
+
+def test_cache_dropped_for_another_database(database, tmp_path):
+    path = tmp_path / 'results.json'
+    cache = nmea_presets.ResultCache(database, path)
+    cache.usage(MIX, 4800)
+    cache.save()
+    other = {ID: database[ID] for ID in ('GGA', 'RMC')}
+    assert nmea_presets.ResultCache(other, path).entries == {}
+
+def test_cache_is_bounded(database, tmp_path):
+    cache = nmea_presets.ResultCache(database, tmp_path / 'results.json', size=3)
+    for rate in (1, 2, 3, 4):
+        cache.usage([Stream('GGA', 71, rate)], 4800)
+    assert len(cache.entries) == 3
+    cache.usage([Stream('GGA', 71, 1)], 4800)
+    assert cache.misses == 5
+
+def test_unreadable_cache_starts_empty(database, tmp_path):
+    path = tmp_path / 'results.json'
+    path.write_text('not json')
+    assert nmea_presets.ResultCache(database, path).entries == {}
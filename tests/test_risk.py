@@ -0,0 +1,48 @@
+"""Monte Carlo overload risk against cases worked out by hand."""
+
+import pytest
+
+import nmea_link
+import nmea_risk
+from nmea_schedule import Stream
+
+def test_fixed_lengths_on_a_shared_clock(database):
+    # Lengths other than the typical one are fixed, and one stream at 1 Hz
+    # releases exactly once per one second window
+    length = database.wire_lengths('GGA')[1] + 3
+    risk = nmea_risk.overload_risk([Stream('GGA', length, 1)], database, 4800, trials=1000,
+                                   drift_ppm=0, shared_clock=True)
+    usage = nmea_link.link_model(4800).airtime(length) * 100
+    assert risk.expected == pytest.approx(usage)
+    assert risk.mean == pytest.approx(usage)
+    assert risk.std == pytest.approx(0, abs=1e-6)
+    assert risk.overloads == 0
+    assert risk.overload_upper == pytest.approx(3 / 1000)
+    assert risk.histogram.sum() == 1000
+
+def test_variable_lengths_average_out(database):
+    streams = [Stream('GGA', database.wire_lengths('GGA')[1], 5),
+               Stream('RMC', database.wire_lengths('RMC')[1], 1)]
+    risk = nmea_risk.overload_risk(streams, database, 9600, trials=20000, seed=1)
+    assert risk.mean == pytest.approx(risk.expected, rel=0.02)
+    assert risk.std > 0
+    assert risk.percentiles[50] <= risk.percentiles[99] <= risk.peak + nmea_risk.BIN_WIDTH
+    again = nmea_risk.overload_risk(streams, database, 9600, trials=20000, seed=1)
+    assert again.mean == risk.mean and (again.histogram == risk.histogram).all()
+
+def test_an_overbooked_line_always_overloads(database):
+    streams = [Stream('GGA', database.wire_lengths('GGA')[1], 20)]
+    risk = nmea_risk.overload_risk(streams, database, 4800, trials=500)
+    assert risk.overload_probability == 1.0
+    assert nmea_risk.overloads_per_hour(risk) == pytest.approx(3600)
+
+@pytest.mark.parametrize('streams, kwargs', [
+    ([], {}),
+    ([Stream('GGA', 71, 1)], {'window': 0}),
+    ([Stream('GGA', 71, 1)], {'null_rate': 1.0}),
+    ([Stream('GGA', 71, 1)], {'drift_ppm': -1}),
+    ([Stream('GGA', 71, 1)], {'trials': 0}),
+])
+def test_bad_arguments(database, streams, kwargs):
+    with pytest.raises(ValueError):
+        nmea_risk.overload_risk(streams, database, 4800, **kwargs)
@@ -0,0 +1,51 @@
+"""The timeline simulator against the closed-form utilization."""
+
+import pytest
+
+import nmea_link
+from nmea_schedule import Stream, average_utilization, hyperperiod, simulate
+
+MIXES = [
+    [Stream('GGA', 71, 10), Stream('RMC', 68, 1), Stream('GSV', 70, 0.2)],
+    [Stream('HDT', 17, 20), Stream('ROT', 16, 10), Stream('VTG', 40, 5, 0.05)],
+    [Stream('GGA', 71, 3), Stream('ZDA', 36, 0.5), Stream('MWV', 28, 2, 0.1)],
+]
+LINKS = [4800, 9600, 38400, '4800 7E1',
+         {'baud': 4800, 'sentence_gap': 0.002},
+         {'baud': 38400, 'fifo_depth': 16, 'refill_latency': 0.001}]
+
+@pytest.mark.parametrize('streams', MIXES)
+@pytest.mark.parametrize('link', LINKS)
+def test_utilization_matches_closed_form(streams, link):
+    result = simulate(streams, link)
+    assert result.hyperperiod == pytest.approx(float(hyperperiod(s.rate for s in streams)))
+    assert result.transmissions == round(sum(s.rate for s in streams) * result.hyperperiod)
+    assert result.utilization == pytest.approx(average_utilization(streams, link))
+    assert [s.transmissions for s in result.sentences] == [
+        round(s.rate * result.hyperperiod) for s in streams]
+
+@pytest.mark.parametrize('streams', MIXES)
+def test_longer_runs_agree(streams):
+    once = simulate(streams, 4800)
+    twice = simulate(streams, 4800, duration=2 * once.hyperperiod)
+    assert twice.transmissions == 2 * once.transmissions
+    assert twice.utilization == pytest.approx(once.utilization)
+
+def test_carry_over_only_when_overloaded():
+    streams = MIXES[0]
+    assert average_utilization(streams, 4800) > 100
+    assert simulate(streams, 4800).carry_over > 0
+    assert average_utilization(streams, 38400) < 100
+    assert simulate(streams, 38400).carry_over == 0
+
+def test_single_stream_has_no_queueing():
+    model = nmea_link.link_model(4800)
+    result = simulate([Stream('GGA', 71, 1)], 4800)
+    assert result.worst_latency == pytest.approx(model.airtime(71))
+    assert result.sentences[0].worst_queueing == 0
+    assert result.idle_gaps == 1
+    assert result.longest_idle == pytest.approx(1 - model.airtime(71))
+
+def test_empty_mix_is_rejected():
+    with pytest.raises(ValueError):
+        simulate([], 4800)
@@ -0,0 +1,44 @@
+"""Ranked sentence search and the plain-dict index cache."""
+
+import pytest
+
+import nmea_database
+import nmea_search
+
+@pytest.mark.parametrize('query', ['gga', 'GG', 'gag', 'GPGGA', 'global positioning'])
+def test_finds_gga(database, query):
+    assert database.search(query, 1)[0].id == 'GGA'
+
+def test_stored_index_matches_a_fresh_one(database):
+    fresh = nmea_search.SearchIndex.from_database(dict(database))
+    for query in ('heading', 'true wind speed', 'd', 'depth below t', 'xyzzy'):
+        assert fresh.search(query, None) == database.search_index.search(query, None)
+
+def test_ranking(database):
+    matches = database.search('heading', None)
+    scores = [match.score for match in matches]
+    assert scores == sorted(scores, reverse=True)
+    assert len(database.search('heading', 3)) == 3
+    assert database.search('xyzzy') == []
+    assert database.search('') == []
+
+def test_single_letters_skip_field_names(database):
+    assert {match.id[0] for match in database.search('d', 5)} == {'D'}
+
+def test_plain_dict_index_is_kept(database):
+    sentences = {ID: database[ID] for ID in ('GGA', 'RMC', 'HDT')}
+    assert nmea_search.index_for(sentences) is nmea_search.index_for(sentences)
+    # Another dict with the same contents is only the same index by digest
+    copy = dict(sentences)
+    assert nmea_search.index_for(copy) is not nmea_search.index_for(sentences)
+    digest = nmea_database.database_digest(sentences)
+    assert (nmea_search.index_for(copy, digest)
+            is nmea_search.index_for(sentences, nmea_database.database_digest(copy)))
+
+def test_changed_dict_with_digest(database):
+    sentences = {ID: database[ID] for ID in ('GGA', 'RMC')}
+    digest = nmea_database.database_digest(sentences)
+    assert nmea_search.search(sentences, 'hdt', digest=digest) == []
+    sentences['HDT'] = database['HDT']
+    digest = nmea_database.database_digest(sentences)
+    assert nmea_search.search(sentences, 'hdt', digest=digest)[0].id == 'HDT'
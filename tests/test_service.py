@@ -0,0 +1,151 @@
+"""Error responses of the local HTTP service."""
+
+import asyncio
+import json
+
+import pytest
+
+import nmea_service
+from nmea_service import BandwidthService, HTTPError
+
+@pytest.fixture
+def service(database):
+    return BandwidthService(database)
+
+def exchange(service, *requests):
+    """Send raw requests on one connection; return (status, headers, body) for
+    each of them answered before the server closes it."""
+    async def run():
+        server = await nmea_service.start_server(service, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b''.join(requests))
+        # Nothing more will be sent, so a short body ends at the end of input
+        writer.write_eof()
+        await writer.drain()
+        responses = []
+        while len(responses) < len(requests):
+            try:
+                head = await reader.readuntil(b'\r\n\r\n')
+            except asyncio.IncompleteReadError:
+                break
+            lines = head.decode('latin-1').split('\r\n')
+            headers = dict(line.lower().split(': ', 1) for line in lines[1:] if line)
+            body = await reader.readexactly(int(headers['content-length']))
+            responses.append((int(lines[0].split()[1]), headers, json.loads(body)))
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return responses
+    return asyncio.run(run())
+
+def get(path):
+    return f"GET {path} HTTP/1.1\r\n\r\n".encode('latin-1')
+
+def post(path, body, length=None):
+    length = len(body) if length is None else length
+    return f"POST {path} HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode('latin-1') + body
+
+@pytest.mark.parametrize('length', ['abc', '-5'])
+def test_bad_content_length_closes(service, length):
+    responses = exchange(service, post('/bandwidth', b'{}', length), get('/health'))
+    assert len(responses) == 1
+    status, headers, body = responses[0]
+    assert status == 400
+    assert headers['connection'] == 'close'
+    assert 'Content-Length' in body['error']
+
+def test_body_too_large(service):
+    request = post('/bandwidth', b'', nmea_service.MAX_BODY + 1)
+    assert [status for status, _, _ in exchange(service, request)] == [413]
+
+def test_malformed_request_line(service):
+    assert [status for status, _, _ in exchange(service, b"NONSENSE\r\n\r\n")] == [400]
+
+@pytest.mark.parametrize('request_bytes, status, message', [
+    (post('/bandwidth', b'{"sentences": '), 400, 'Invalid JSON'),
+    (post('/bandwidth', b'[1, 2]'), 400, 'JSON object'),
+    (get('/bandwidth?sentences=GGA&baud=4800&char_gap=x'), 400, 'char_gap'),
+    (get('/bandwidth?sentences=GGA&baud=fast'), 400, 'baud'),
+    (post('/costs', b'{"sentences": ["GGA@-1"]}'), 400, 'rate'),
+    (get('/bandwidth?sentences=XYZ'), 404, 'XYZ'),
+    (get('/costs?sentences=GGA,XYZ'), 404, 'XYZ'),
+    (get('/sentences/XYZ'), 404, 'XYZ'),
+    (get('/sentences?standard=ieee'), 400, 'standard'),
+    (get('/search?q=gga&limit=some'), 400, 'limit'),
+    (get('/nowhere'), 404, '/nowhere'),
+    (post('/health', b''), 405, 'POST'),
+])
+def test_client_errors_keep_the_connection(service, request_bytes, status, message):
+    responses = exchange(service, request_bytes, get('/health'))
+    assert [r[0] for r in responses] == [status, 200]
+    assert message in responses[0][2]['error']
+    assert responses[0][1]['connection'] == 'keep-alive'
+
+def test_internal_error_is_500_and_keeps_the_connection(service, monkeypatch, capsys):
+    def broken(*args):
+        raise RuntimeError("boom")
+    monkeypatch.setattr(service, 'bandwidth', broken)
+    responses = exchange(service, get('/bandwidth?sentences=GGA'), get('/health'))
+    assert [r[0] for r in responses] == [500, 200]
+    assert 'boom' in responses[0][2]['error']
+    assert 'RuntimeError' in capsys.readouterr().err
+
+def test_handle_raises_http_errors(service):
+    with pytest.raises(HTTPError) as error:
+        service.handle('DELETE', '/costs', b'')
+    assert error.value.status == 405
+    assert json.loads(service.handle('GET', '/stats', b''))['requests'] == 2
+
+@pytest.mark.parametrize('body', [
+    b'{"sentences": [{"id": "GGA", "rate": -5}]}',
+    b'{"sentences": [{"id": "GGA", "rate": 0}]}',
+    b'{"sentences": ["GGA"], "rate": 0}',
+    b'{"sentences": ["GGA@0"]}',
+])
+def test_non_positive_rates(service, body):
+    with pytest.raises(HTTPError) as error:
+        service.handle('POST', '/bandwidth', body)
+    assert error.value.status == 400
+    assert 'Update rate' in str(error.value)
+    assert service.bandwidth.cache_info().currsize == 0
+
+def test_rates_share_the_cache(service):
+    first = service.handle('POST', '/bandwidth', b'{"sentences": [{"id": "GGA", "rate": 2}, "RMC"]}')
+    second = service.handle('GET', '/bandwidth?sentences=RMC@1,GGA@2', b'')
+    assert first == second
+    assert service.bandwidth.cache_info().hits == 1
+
+class Writer:
+    """Collects what serve_connection writes."""
+
+    class transport:
+        @staticmethod
+        def get_write_buffer_size():
+            return 0
+
+    def __init__(self):
+        self.data = b''
+        self.closed = False
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+def test_short_body_closes_quietly(service):
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(get('/health') + post('/bandwidth', b'{"sen', 100))
+        reader.feed_eof()
+        writer = Writer()
+        await nmea_service.serve_connection(service, reader, writer)
+        return writer
+    writer = asyncio.run(run())
+    assert writer.closed
+    assert writer.data.startswith(b'HTTP/1.1 200 OK')
+    assert writer.data.count(b'HTTP/1.1') == 1
@@ -0,0 +1,63 @@
+"""The knapsack solver against exhaustive search on small catalogs."""
+
+import itertools
+
+import pytest
+
+import nmea_link
+from nmea_schedule import Stream
+from nmea_solver import BOUNDS, Candidate, allowed_rates, solve
+
+CANDIDATES = [
+    Candidate('GGA', min_rate=1, max_rate=10, required=True),
+    Candidate('RMC', required=True),
+    Candidate('GSV', priority=3, max_rate=1, min_rate=0.2),
+    Candidate('VTG', priority=2, min_rate=1, max_rate=5),
+    Candidate('HDT', priority=2, min_rate=1, max_rate=10),
+    Candidate('ZDA', priority=1, min_rate=0.1, max_rate=1),
+    Candidate('MWV', priority=4, min_rate=0.5, max_rate=2),
+]
+
+def brute_force(database, candidates, bauds, ceiling, bound):
+    """Return the highest total priority of any schedule under the ceiling."""
+    position = BOUNDS.index(bound)
+    options = [allowed_rates(c.min_rate, c.max_rate) + (() if c.required else (None,))
+               for c in candidates]
+    best = None
+    for link in bauds:
+        model = nmea_link.link_model(link)
+        for rates in itertools.product(*options):
+            streams = [Stream(c.id, database.wire_lengths(c.id)[position], rate)
+                       for c, rate in zip(candidates, rates) if rate is not None]
+            if model.utilization(streams) <= ceiling:
+                value = sum(c.priority for c, rate in zip(candidates, rates) if rate is not None)
+                best = value if best is None else max(best, value)
+    return best
+
+@pytest.mark.parametrize('ceiling', [10, 15, 20, 35, 50, 80])
+@pytest.mark.parametrize('bound', BOUNDS)
+def test_matches_brute_force(database, ceiling, bound):
+    bauds = (4800, '4800 7E1')
+    expected = brute_force(database, CANDIDATES, bauds, ceiling, bound)
+    schedule = solve(database, CANDIDATES, bauds, ceiling, bound)
+    if expected is None:
+        assert schedule is None
+        return
+    assert schedule.value == expected
+    assert schedule.utilization <= ceiling + 1e-9
+    for candidate in CANDIDATES:
+        rate = schedule.rates.get(candidate.id)
+        if candidate.required:
+            assert rate is not None
+        if rate is not None:
+            assert rate in allowed_rates(candidate.min_rate, candidate.max_rate)
+
+def test_prefers_the_slowest_link(database):
+    # Fixed rates: both links carry the same schedule
+    candidates = [Candidate('GGA', required=True), Candidate('RMC', required=True)]
+    assert solve(database, candidates, (38400, 4800), 80).baud == 4800
+    # A faster link wins when it allows higher rates
+    assert solve(database, CANDIDATES[:2], (38400, 4800), 80).rates['GGA'] == 10
+
+def test_nothing_fits(database):
+    assert solve(database, CANDIDATES[:2], (4800,), 1) is None
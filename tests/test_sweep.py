@@ -0,0 +1,69 @@
+"""Parameter sweeps: grids, points, thresholds and output."""
+
+import csv
+
+import numpy as np
+import pytest
+
+import nmea_link
+import nmea_sweep
+
+def test_grid():
+    assert list(nmea_sweep.grid([1, 2])) == [1.0, 2.0]
+    assert list(nmea_sweep.grid(5)) == [5.0]
+    assert nmea_sweep.grid({'start': 1, 'stop': 100, 'steps': 3, 'scale': 'log'}) == \
+        pytest.approx([1, 10, 100])
+    for values in ([], [1, 0], {'start': -1, 'stop': 1}):
+        with pytest.raises(ValueError):
+            nmea_sweep.grid(values)
+
+def test_bad_specs(database):
+    with pytest.raises(ValueError):
+        nmea_sweep.Sweep(database, {})
+    with pytest.raises(KeyError):
+        nmea_sweep.Sweep(database, {'sentences': ['NOPE']})
+    with pytest.raises(ValueError):
+        nmea_sweep.Sweep(database, {'optional': [f"X{i}" for i in range(21)]})
+
+def test_points_match_the_link_model(database):
+    sweep = nmea_sweep.Sweep(database, {'sentences': ['GGA'], 'optional': ['RMC', 'HDT'],
+                                        'rate': [1, 2], 'rates': {'HDT': [5, 10]},
+                                        'bauds': [4800, '38400 7E1']})
+    assert sweep.num_points == 4 * 4 * 2
+    usage = sweep.evaluate(0, sweep.num_mixes)
+    lengths = {ID: database.wire_lengths(ID)[1] for ID in sweep.ids}
+    model = nmea_link.link_model('38400 7E1')
+    # Mix 3 sends RMC and HDT; plan 3 is rate 2 with HDT at 10 Hz
+    expected = model.seconds_per_byte * 100 * (2 * lengths['GGA'] + 2 * lengths['RMC']
+                                               + 10 * lengths['HDT'])
+    assert sweep.members(3) == ['GGA', 'HDT', 'RMC']
+    assert usage[3, 3, 1] == pytest.approx(expected)
+
+def test_thresholds_are_exact(database):
+    sweep = nmea_sweep.Sweep(database, {'sentences': ['GGA'], 'optional': ['RMC'],
+                                        'rate': [1], 'bauds': [4800], 'ceiling': 50})
+    best = sweep.thresholds(limit=1)[0]
+    assert best.members == ['GGA', 'RMC']
+    length = sum(database.wire_lengths(ID)[1] for ID in best.members)
+    assert best.ceiling_rate == pytest.approx(50 / (length * 10 / 4800 * 100))
+    assert best.saturation_rate == pytest.approx(2 * best.ceiling_rate)
+    # Sentences with their own rate can be over the ceiling already
+    over = nmea_sweep.Sweep(database, {'sentences': ['GGA'], 'rates': {'GGA': [100]},
+                                       'bauds': [4800]})
+    assert over.thresholds()[0].ceiling_rate is None
+
+def test_csv_holds_every_point(database, tmp_path):
+    sweep = nmea_sweep.Sweep(database, {'sentences': ['GGA'], 'optional': ['RMC'],
+                                        'rate': {'start': 1, 'stop': 4, 'steps': 4},
+                                        'bauds': [4800, 9600]})
+    path = tmp_path / 'sweep.csv'
+    assert nmea_sweep.write_sweep(sweep, path, workers=1) == sweep.num_points
+    with open(path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == sweep.num_points
+    assert list(rows[0]) == sweep.columns
+    usage = np.array([float(row['utilization']) for row in rows])
+    headroom = np.array([float(row['headroom']) for row in rows])
+    assert usage + headroom == pytest.approx(100)
+    with pytest.raises(ValueError):
+        nmea_sweep.write_sweep(sweep, path, fmt='xlsx')
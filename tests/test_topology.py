@@ -0,0 +1,87 @@
+"""Incremental topology updates against a network built from scratch."""
+
+import pytest
+
+from nmea_schedule import Stream
+from nmea_topology import Topology
+
+GPS = [Stream('GGA', 71, 10), Stream('RMC', 68, 1), Stream('GSV', 70, 1)]
+GYRO = [Stream('HDT', 17, 10), Stream('ROT', 16, 10)]
+WIND = [Stream('MWV', 28, 2)]
+
+DEFAULT = {
+    'streams': {'gps': GPS, 'gyro': GYRO, 'wind': WIND},
+    'buffers': {'mux1': 1024, 'mux2': 512},
+    'links': {('gps', 'mux1'): 4800, ('gyro', 'mux1'): 4800, ('wind', 'mux2'): 4800,
+              ('mux1', 'mux2'): 38400, ('mux1', 'autopilot'): 4800,
+              ('mux2', 'ecdis'): 38400, ('mux2', 'display'): 4800},
+    'filters': {('mux1', 'autopilot'): ['HDT', 'RMC']},
+}
+
+def build(config):
+    topology = Topology()
+    for name, streams in config['streams'].items():
+        topology.add_talker(name, streams)
+    for name, buffer in config['buffers'].items():
+        topology.add_multiplexer(name, buffer)
+    for name in ('autopilot', 'ecdis', 'display'):
+        topology.add_listener(name)
+    for (source, target), link in config['links'].items():
+        topology.connect(source, target, link, config['filters'].get((source, target)))
+    return topology
+
+def changed(**changes):
+    config = {key: dict(value) for key, value in DEFAULT.items()}
+    for key, value in changes.items():
+        config[key].update(value)
+    return config
+
+def assert_same(incremental, fresh):
+    assert incremental.ports() == fresh.ports()
+    for name in fresh.nodes:
+        assert incremental.received(name) == fresh.received(name)
+
+CHANGES = [
+    ('streams', 'gps', GPS + [Stream('ZDA', 36, 1)], lambda t, v: t.set_streams('gps', v)),
+    ('streams', 'gyro', [Stream('HDT', 17, 50)], lambda t, v: t.set_streams('gyro', v)),
+    ('buffers', 'mux2', 64, lambda t, v: t.set_buffer('mux2', v)),
+    ('links', ('mux1', 'mux2'), 4800, lambda t, v: t.set_link('mux1', 'mux2', v)),
+    ('links', ('mux2', 'display'), '9600 7E1', lambda t, v: t.set_link('mux2', 'display', v)),
+    ('filters', ('mux1', 'mux2'), ['GGA', 'MWV'], lambda t, v: t.set_filter('mux1', 'mux2', v)),
+    ('filters', ('mux1', 'autopilot'), None, lambda t, v: t.set_filter('mux1', 'autopilot', v)),
+]
+
+@pytest.mark.parametrize('key, name, value, apply', CHANGES)
+def test_single_change(key, name, value, apply):
+    topology = build(DEFAULT)
+    topology.ports()
+    apply(topology, value)
+    assert_same(topology, build(changed(**{key: {name: value}})))
+
+def test_changes_in_sequence():
+    topology = build(DEFAULT)
+    expected = changed()
+    for key, name, value, apply in CHANGES:
+        apply(topology, value)
+        expected[key][name] = value
+        assert_same(topology, build(expected))
+
+def test_overload_propagates():
+    # The gyro overloads its port; only what gets through reaches downstream
+    topology = build(DEFAULT)
+    topology.ports()
+    topology.set_streams('gyro', [Stream('HDT', 17, 100)])
+    assert_same(topology, build(changed(streams={'gyro': [Stream('HDT', 17, 100)]})))
+    assert topology.port('gyro', 'mux1').drop_risk == 'overflow'
+    assert topology.port('gyro', 'mux1').utilization == 100.0
+
+def test_only_downstream_nodes_recompute():
+    topology = build(DEFAULT)
+    assert topology.update() == len(topology.nodes)
+    assert topology.update() == 0
+    topology.set_link('mux2', 'display', 9600)
+    # mux2 and the display, whose input changed
+    assert topology.update() == 2
+    topology.set_buffer('mux2', 2048)
+    # The buffer changes the reports but not what is forwarded
+    assert topology.update() == 1